@@ -0,0 +1,326 @@
+"""Helpers for running benchmark cases and comparing results against a baseline.
+
+Each case runs in a fresh process, so peak RSS and compilation caches are not shared
+between cases.
+"""
+
+import concurrent.futures
+import dataclasses
+import enum
+import functools
+import json
+import multiprocessing
+import pathlib
+import platform
+import resource
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import jax
+import jaxlib
+
+import jaxfg
+
+# Dataset loaders live next to the example scripts.
+_SCRIPTS_DIR = pathlib.Path(__file__).absolute().parent.parent / "scripts"
+if str(_SCRIPTS_DIR) not in sys.path:
+    sys.path.append(str(_SCRIPTS_DIR))
+
+import _g2o_utils  # noqa: E402
+import _synthetic_graphs  # noqa: E402
+
+
+class SolverType(enum.Enum):
+    GAUSS_NEWTON = enum.auto()
+    LEVENBERG_MARQUARDT = enum.auto()
+    DOGLEG = enum.auto()
+    FIXED_ITERATION_GAUSS_NEWTON = enum.auto()
+
+    def get_solver(
+        self,
+        linear_solver: jaxfg.sparse.LinearSubproblemSolverBase,
+        max_iterations: Optional[int] = None,
+    ) -> jaxfg.solvers.NonlinearSolverBase:
+        """Get solver corresponding to an enum. If `max_iterations` is set, the
+        solver's iteration count is overridden."""
+        solver: jaxfg.solvers.NonlinearSolverBase = {
+            SolverType.GAUSS_NEWTON: jaxfg.solvers.GaussNewtonSolver,
+            SolverType.LEVENBERG_MARQUARDT: jaxfg.solvers.LevenbergMarquardtSolver,
+            SolverType.DOGLEG: jaxfg.solvers.DoglegSolver,
+            SolverType.FIXED_ITERATION_GAUSS_NEWTON: (
+                lambda **kwargs: jaxfg.solvers.FixedIterationGaussNewtonSolver(
+                    unroll=False, **kwargs
+                )
+            ),
+        }[self](verbose=False, linear_solver=linear_solver)
+
+        if max_iterations is None:
+            return solver
+        elif isinstance(solver, jaxfg.solvers.FixedIterationGaussNewtonSolver):
+            return dataclasses.replace(solver, iterations=max_iterations)
+        else:
+            return dataclasses.replace(solver, max_iterations=max_iterations)
+
+
+class LinearSolverType(enum.Enum):
+    CHOLMOD = enum.auto()
+    CONJUGATE_GRADIENT = enum.auto()
+    INEXACT_STEP_CONJUGATE_GRADIENT = enum.auto()
+    AUTO = enum.auto()
+
+    def get_linear_solver(
+        self, graph: jaxfg.core.StackedFactorGraph
+    ) -> jaxfg.sparse.LinearSubproblemSolverBase:
+        """Get linear solver corresponding to an enum."""
+        if self is LinearSolverType.AUTO:
+            return jaxfg.sparse.AutoLinearSolver.make(graph)
+        return {
+            LinearSolverType.CHOLMOD: jaxfg.sparse.CholmodSolver,
+            LinearSolverType.CONJUGATE_GRADIENT: jaxfg.sparse.ConjugateGradientSolver,
+            LinearSolverType.INEXACT_STEP_CONJUGATE_GRADIENT: (
+                jaxfg.sparse.InexactStepConjugateGradientSolver
+            ),
+        }[self]()
+
+
+ProblemLoader = Callable[
+    [], Tuple[jaxfg.core.StackedFactorGraph, jaxfg.core.VariableAssignments]
+]
+"""Builds a graph and initial assignments for a benchmark problem."""
+
+
+def g2o_loader(path: pathlib.Path) -> ProblemLoader:
+    """Problem loader for a g2o file. Loaders are sent to worker processes, so they
+    need to be picklable."""
+    return functools.partial(_load_g2o, path)
+
+
+def _load_g2o(
+    path: pathlib.Path,
+) -> Tuple[jaxfg.core.StackedFactorGraph, jaxfg.core.VariableAssignments]:
+    g2o = _g2o_utils.parse_g2o(path)
+    graph = jaxfg.core.StackedFactorGraph.make(g2o.make_factors())
+    return graph, g2o.make_initial_assignments()
+
+
+def synthetic_loader(generator_name: str, num_poses: int, **kwargs) -> ProblemLoader:
+    """Problem loader for a synthetic graph. See `_synthetic_graphs.py`.
+
+    Args:
+        generator_name: Key in `_synthetic_graphs.GENERATOR_FROM_NAME`.
+        num_poses: Pose count.
+        **kwargs: Forwarded to the generator.
+    """
+    assert generator_name in _synthetic_graphs.GENERATOR_FROM_NAME
+    return functools.partial(_load_synthetic, generator_name, num_poses, kwargs)
+
+
+def _load_synthetic(
+    generator_name: str, num_poses: int, kwargs: Dict[str, Any]
+) -> Tuple[jaxfg.core.StackedFactorGraph, jaxfg.core.VariableAssignments]:
+    data = _synthetic_graphs.GENERATOR_FROM_NAME[generator_name](num_poses, **kwargs)
+    graph = jaxfg.core.StackedFactorGraph.make(data.make_factors())
+    return graph, data.make_initial_assignments()
+
+
+@dataclasses.dataclass(frozen=True)
+class BenchmarkCase:
+    problem_name: str
+    solver_type: SolverType
+    linear_solver_type: LinearSolverType
+
+    @property
+    def key(self) -> str:
+        """Identifier used for matching results against a baseline."""
+        return "/".join(
+            [self.problem_name, self.solver_type.name, self.linear_solver_type.name]
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class BenchmarkResult:
+    key: str
+    problem_name: str
+    solver: str
+    linear_solver: str
+
+    build_seconds: float
+    """Time to load the problem and build the graph + initial assignments."""
+
+    compile_seconds: float
+    """Time to lower and compile the full solve."""
+
+    first_iteration_seconds: float
+    """Wall time of the first call to a (separately compiled) single-iteration solve.
+    Includes one-time dispatch and transfer overheads."""
+
+    steady_state_seconds: float
+    """Median wall time of a full solve, after warm-up."""
+
+    peak_rss_mb: float
+    """Peak resident set size of the benchmark process."""
+
+    initial_cost: float
+    final_cost: float
+
+    num_variables: Optional[int] = None
+    """Problem size. `None` for results written before sizes were recorded."""
+
+    num_factors: Optional[int] = None
+
+
+def run_case_in_subprocess(
+    case: BenchmarkCase, problem_loader: ProblemLoader, repeats: int
+) -> BenchmarkResult:
+    """Run a benchmark case in a fresh process."""
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        return executor.submit(run_case, case, problem_loader, repeats).result()
+
+
+def run_case(
+    case: BenchmarkCase, problem_loader: ProblemLoader, repeats: int
+) -> BenchmarkResult:
+    """Run a benchmark case in the current process."""
+    start_time = time.perf_counter()
+    graph, initial_assignments = problem_loader()
+    jax.block_until_ready(initial_assignments.storage)
+    build_seconds = time.perf_counter() - start_time
+
+    linear_solver = case.linear_solver_type.get_linear_solver(graph)
+
+    # Compile full solve
+    start_time = time.perf_counter()
+    compiled_solver = graph.compile_solver(case.solver_type.get_solver(linear_solver))
+    compile_seconds = time.perf_counter() - start_time
+
+    # First iteration; compilation is not timed
+    compiled_single_step = graph.compile_solver(
+        case.solver_type.get_solver(linear_solver, max_iterations=1)
+    )
+    start_time = time.perf_counter()
+    compiled_single_step.solve(initial_assignments).storage.block_until_ready()
+    first_iteration_seconds = time.perf_counter() - start_time
+
+    # Steady state
+    solution = compiled_solver.solve(initial_assignments)
+    solution.storage.block_until_ready()
+    durations: List[float] = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        compiled_solver.solve(initial_assignments).storage.block_until_ready()
+        durations.append(time.perf_counter() - start_time)
+
+    return BenchmarkResult(
+        key=case.key,
+        problem_name=case.problem_name,
+        solver=case.solver_type.name,
+        linear_solver=case.linear_solver_type.name,
+        num_variables=len(initial_assignments.get_variables()),
+        num_factors=sum(stack.num_factors for stack in graph.factor_stacks),
+        build_seconds=build_seconds,
+        compile_seconds=compile_seconds,
+        first_iteration_seconds=first_iteration_seconds,
+        steady_state_seconds=statistics.median(durations),
+        peak_rss_mb=_get_peak_rss_mb(),
+        initial_cost=float(graph.compute_cost(initial_assignments)[0]),
+        final_cost=float(graph.compute_cost(solution)[0]),
+    )
+
+
+def _get_peak_rss_mb() -> float:
+    """Peak RSS of the current process, in megabytes."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return max_rss / (1024.0**2 if sys.platform == "darwin" else 1024.0)
+
+
+def get_environment_metadata() -> Dict[str, Any]:
+    """Versions + platform information to store alongside results."""
+    return {
+        "python": platform.python_version(),
+        "jax": jax.__version__,
+        "jaxlib": jaxlib.__version__,
+        "backend": jax.default_backend(),
+        "device_count": jax.device_count(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def write_results(
+    path: pathlib.Path, results: List[BenchmarkResult], metadata: Dict[str, Any]
+) -> None:
+    """Write results to a JSON file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps(
+            {
+                "metadata": metadata,
+                "results": [dataclasses.asdict(result) for result in results],
+            },
+            indent=2,
+        )
+        + "\n"
+    )
+
+
+def read_results(path: pathlib.Path) -> List[BenchmarkResult]:
+    """Read results from a JSON file."""
+    return [
+        BenchmarkResult(**result) for result in json.loads(path.read_text())["results"]
+    ]
+
+
+_TIMING_FIELDS = (
+    "build_seconds",
+    "compile_seconds",
+    "first_iteration_seconds",
+    "steady_state_seconds",
+)
+
+
+def compare_results(
+    results: List[BenchmarkResult],
+    baseline: List[BenchmarkResult],
+    time_tolerance: float,
+    cost_tolerance: float,
+) -> List[str]:
+    """Compare results against a baseline. Prints a table of timing ratios, and
+    returns a list of regressions.
+
+    Args:
+        results: New results.
+        baseline: Baseline results.
+        time_tolerance: Relative slowdown that counts as a regression. For example,
+            `0.2` flags anything more than 20% slower than the baseline.
+        cost_tolerance: Relative final cost increase that counts as a regression.
+    """
+    baseline_from_key = {result.key: result for result in baseline}
+    regressions: List[str] = []
+
+    print(f"{'Case':<80}" + "".join(f"{field:>26}" for field in _TIMING_FIELDS))
+    for result in results:
+        if result.key not in baseline_from_key:
+            print(f"{result.key:<80} (not in baseline)")
+            continue
+        baseline_result = baseline_from_key[result.key]
+
+        ratios = []
+        for field in _TIMING_FIELDS:
+            ratio = getattr(result, field) / max(getattr(baseline_result, field), 1e-9)
+            ratios.append(ratio)
+            if ratio > 1.0 + time_tolerance:
+                regressions.append(f"{result.key}: {field} is {ratio:.2f}x baseline")
+        print(f"{result.key:<80}" + "".join(f"{ratio:>25.2f}x" for ratio in ratios))
+
+        if result.final_cost > baseline_result.final_cost * (1.0 + cost_tolerance):
+            regressions.append(
+                f"{result.key}: final cost {result.final_cost:.6g} vs"
+                f" {baseline_result.final_cost:.6g} in baseline"
+            )
+
+    return regressions
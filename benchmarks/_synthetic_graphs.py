@@ -0,0 +1,430 @@
+"""Parametric synthetic problems for scaling studies.
+
+All generators are vectorized: ground-truth trajectories, edges, noise, and outliers are
+produced with array operations, so graphs with millions of variables can be generated
+in seconds. Pose graphs are returned as `G2OData` objects, and can be used the same way
+as parsed g2o files.
+"""
+
+import dataclasses
+from typing import Callable, Dict, List, Literal, NamedTuple, Optional, Tuple, Union
+
+import jax
+import jax_dataclasses as jdc
+import jaxlie
+import numpy as onp
+from jax import numpy as jnp
+from overrides import overrides
+
+import jaxfg
+from _g2o_utils import G2OData
+
+LandmarkVariable = jaxfg.core.RealVectorVariable[2]
+
+
+class LandmarkObservationValueTuple(NamedTuple):
+    T_world_pose: jaxlie.SE2
+    landmark: jnp.ndarray
+
+
+@jdc.pytree_dataclass
+class LandmarkObservationFactor(jaxfg.core.FactorBase[LandmarkObservationValueTuple]):
+    """Position of a 2D landmark, observed in the local frame of a pose."""
+
+    observation: jnp.ndarray
+    """Observed landmark position, in the pose frame. Shape should be `(2,)`."""
+
+    @overrides
+    def compute_residual_vector(
+        self, variable_values: LandmarkObservationValueTuple
+    ) -> jnp.ndarray:
+        return (
+            variable_values.T_world_pose.inverse() @ variable_values.landmark
+            - self.observation
+        )
+
+
+@dataclasses.dataclass
+class LandmarkGraphData:
+    pose_graph: G2OData
+    """Odometry and loop closures between poses."""
+
+    landmark_variables: List[LandmarkVariable]
+    """Landmark variables."""
+
+    initial_landmarks: onp.ndarray
+    """Initial landmark positions. Shape should be `(num_landmarks, 2)`."""
+
+    observation_indices: onp.ndarray
+    """Pose and landmark indices for each observation. Shape should be
+    `(num_observations, 2)`."""
+
+    observations: onp.ndarray
+    """Landmark positions in pose frames. Shape should be `(num_observations, 2)`."""
+
+    observation_noise: float
+    """Standard deviation of observation noise."""
+
+    def make_factors(
+        self, huber_delta: Optional[float] = None
+    ) -> List[Union[jaxfg.core.FactorBase, jaxfg.core.FactorBatch]]:
+        """Create pose graph factors, plus one pre-stacked batch of landmark
+        observation factors."""
+        noise_model: jaxfg.noises.NoiseModelBase = jaxfg.noises.DiagonalGaussian(
+            onp.full(2, 1.0 / self.observation_noise)
+        )
+        if huber_delta is not None:
+            noise_model = jaxfg.noises.HuberWrapper(
+                wrapped=noise_model, delta=onp.asarray(huber_delta)
+            )
+        pose_variables = self.pose_graph.pose_variables
+        return self.pose_graph.make_factors(huber_delta=huber_delta) + [
+            jaxfg.core.FactorBatch(
+                factor=LandmarkObservationFactor(
+                    variables=(
+                        jaxfg.geometry.SE2Variable.canonical_instance(),
+                        LandmarkVariable.canonical_instance(),
+                    ),
+                    observation=self.observations,
+                    noise_model=noise_model,
+                ),
+                variables=(
+                    [pose_variables[i] for i in self.observation_indices[:, 0]],
+                    [
+                        self.landmark_variables[i]
+                        for i in self.observation_indices[:, 1]
+                    ],
+                ),
+                shared_fields=("noise_model",),
+            )
+        ]
+
+    def make_initial_assignments(self) -> jaxfg.core.VariableAssignments:
+        """Create initial assignments for pose and landmark variables."""
+        return jaxfg.core.VariableAssignments.make_from_stacked(
+            list(self.pose_graph.pose_variables) + self.landmark_variables,
+            {
+                jaxfg.geometry.SE2Variable: self.pose_graph.initial_poses,
+                LandmarkVariable: self.initial_landmarks,
+            },
+        )
+
+
+def make_manhattan_2d(
+    num_poses: int,
+    loop_closure_probability: float = 0.5,
+    translation_noise: float = 0.02,
+    rotation_noise: float = 0.01,
+    outlier_rate: float = 0.0,
+    seed: int = 0,
+) -> G2OData:
+    """Random walk on an integer grid, in the style of the M3500 dataset. Each step
+    moves one unit forward, occasionally turning by 90 degrees. Loop closures connect
+    non-consecutive visits to the same grid cell.
+
+    Args:
+        num_poses: Number of poses.
+        loop_closure_probability: Probability that each revisit becomes a loop closure.
+        translation_noise: Standard deviation of translation noise on edges.
+        rotation_noise: Standard deviation of rotation noise on edges, in radians.
+        outlier_rate: Fraction of loop closures to replace with random transforms.
+        seed: Random seed.
+    """
+    rng = onp.random.default_rng(seed)
+    xy, theta = _make_manhattan_trajectory(rng, num_poses)
+
+    # Loop closures: sort poses by grid cell, then connect consecutive visits
+    order = onp.lexsort((onp.arange(num_poses), xy[:, 1], xy[:, 0]))
+    same_cell = onp.all(xy[order[1:]] == xy[order[:-1]], axis=-1)
+    loop_closures = onp.stack([order[:-1][same_cell], order[1:][same_cell]], axis=-1)
+    loop_closures = loop_closures[
+        (loop_closures[:, 1] - loop_closures[:, 0] > 1)
+        & (rng.uniform(size=loop_closures.shape[0]) < loop_closure_probability)
+    ]
+
+    return _make_pose_graph(
+        rng,
+        T_world_pose=jaxlie.SE2(
+            unit_complex_xy=onp.concatenate(
+                [onp.cos(theta)[:, None], onp.sin(theta)[:, None], xy], axis=-1
+            )
+        ),
+        loop_closures=loop_closures,
+        translation_noise=translation_noise,
+        rotation_noise=rotation_noise,
+        outlier_rate=outlier_rate,
+    )
+
+
+def make_surface_3d(
+    num_poses: int,
+    surface: Literal["sphere", "torus"] = "sphere",
+    loop_closure_probability: float = 0.5,
+    translation_noise: float = 0.02,
+    rotation_noise: float = 0.01,
+    outlier_rate: float = 0.0,
+    seed: int = 0,
+) -> G2OData:
+    """Poses traveling in rings around a sphere or torus, in the style of the
+    sphere2500 and torus3D datasets. Loop closures connect poses in adjacent rings.
+
+    Args:
+        num_poses: Approximate number of poses. Rounded down to a whole number of
+            rings.
+        surface: Surface to generate poses on.
+        loop_closure_probability: Probability of a loop closure between each pair of
+            neighboring poses in adjacent rings.
+        translation_noise: Standard deviation of translation noise on edges.
+        rotation_noise: Standard deviation of rotation noise on edges, in radians.
+        outlier_rate: Fraction of loop closures to replace with random transforms.
+        seed: Random seed.
+    """
+    rng = onp.random.default_rng(seed)
+    poses_per_ring = max(int(onp.sqrt(num_poses)), 2)
+    num_rings = max(num_poses // poses_per_ring, 2)
+    num_poses = num_rings * poses_per_ring
+
+    ring_index, ring_position = onp.divmod(onp.arange(num_poses), poses_per_ring)
+    along_ring = 2.0 * onp.pi * ring_position / poses_per_ring
+    if surface == "sphere":
+        radius = 0.2 * poses_per_ring
+        latitude = onp.pi * (ring_index + 1) / (num_rings + 1) - onp.pi / 2.0
+        translation = radius * onp.stack(
+            [
+                onp.cos(latitude) * onp.cos(along_ring),
+                onp.cos(latitude) * onp.sin(along_ring),
+                onp.sin(latitude),
+            ],
+            axis=-1,
+        )
+        pitch = -latitude
+    elif surface == "torus":
+        major_radius = 0.4 * poses_per_ring
+        minor_radius = 0.2 * poses_per_ring
+        around_tube = 2.0 * onp.pi * ring_index / num_rings
+        translation = onp.stack(
+            [
+                (major_radius + minor_radius * onp.cos(around_tube))
+                * onp.cos(along_ring),
+                (major_radius + minor_radius * onp.cos(around_tube))
+                * onp.sin(along_ring),
+                minor_radius * onp.sin(around_tube),
+            ],
+            axis=-1,
+        )
+        pitch = -around_tube
+    else:
+        assert False, f"Unexpected surface: {surface}"
+
+    T_world_pose = jax.vmap(
+        lambda pitch, yaw, translation: jaxlie.SE3.from_rotation_and_translation(
+            jaxlie.SO3.from_rpy_radians(0.0, pitch, yaw), translation
+        )
+    )(pitch, along_ring + onp.pi / 2.0, translation)
+
+    # Loop closures between neighboring poses in adjacent rings; tori wrap around
+    poses_b = onp.arange(num_poses) + poses_per_ring
+    if surface == "torus":
+        poses_b = poses_b % num_poses
+    loop_closures = onp.stack([onp.arange(num_poses), poses_b], axis=-1)
+    loop_closures = loop_closures[
+        (poses_b < num_poses) & (rng.uniform(size=num_poses) < loop_closure_probability)
+    ]
+
+    return _make_pose_graph(
+        rng,
+        T_world_pose=jax.tree_map(onp.asarray, T_world_pose),
+        loop_closures=loop_closures,
+        translation_noise=translation_noise,
+        rotation_noise=rotation_noise,
+        outlier_rate=outlier_rate,
+    )
+
+
+def make_grid_landmarks_2d(
+    num_poses: int,
+    loop_closure_probability: float = 0.5,
+    translation_noise: float = 0.02,
+    rotation_noise: float = 0.01,
+    observation_noise: float = 0.05,
+    outlier_rate: float = 0.0,
+    seed: int = 0,
+) -> LandmarkGraphData:
+    """Manhattan-world trajectory, plus landmarks at the corners of each grid cell.
+    Every pose observes the four corners of its cell.
+
+    Args:
+        num_poses: Number of poses.
+        loop_closure_probability: Probability that each revisit becomes a loop closure.
+        translation_noise: Standard deviation of translation noise on edges.
+        rotation_noise: Standard deviation of rotation noise on edges, in radians.
+        observation_noise: Standard deviation of landmark observation noise.
+        outlier_rate: Fraction of loop closures and landmark observations to replace
+            with random values.
+        seed: Random seed.
+    """
+    pose_graph = make_manhattan_2d(
+        num_poses,
+        loop_closure_probability=loop_closure_probability,
+        translation_noise=translation_noise,
+        rotation_noise=rotation_noise,
+        outlier_rate=outlier_rate,
+        seed=seed,
+    )
+    rng = onp.random.default_rng(seed + 1)
+    xy, theta = _make_manhattan_trajectory(onp.random.default_rng(seed), num_poses)
+
+    # Landmarks: unique cell corners
+    corner_offsets = onp.array([[-0.5, -0.5], [-0.5, 0.5], [0.5, -0.5], [0.5, 0.5]])
+    corners = (xy[:, None, :] + corner_offsets[None, :, :]).reshape((-1, 2))
+    landmarks, landmark_indices = onp.unique(corners, axis=0, return_inverse=True)
+    landmark_indices = landmark_indices.reshape((-1,))
+
+    # Renumber landmarks by first observation. This matches the storage layout of the
+    # factor graph, which avoids permuting assignments at solve time.
+    _, first_observation = onp.unique(landmark_indices, return_index=True)
+    order = onp.argsort(first_observation)
+    new_index_from_old = onp.empty_like(order)
+    new_index_from_old[order] = onp.arange(order.shape[0])
+    landmarks = landmarks[order]
+    landmark_indices = new_index_from_old[landmark_indices]
+    pose_indices = onp.repeat(onp.arange(num_poses), 4)
+
+    # Observations, in local frames
+    delta = corners - xy[pose_indices]
+    cos = onp.cos(theta)[pose_indices]
+    sin = onp.sin(theta)[pose_indices]
+    observations = onp.stack(
+        [cos * delta[:, 0] + sin * delta[:, 1], -sin * delta[:, 0] + cos * delta[:, 1]],
+        axis=-1,
+    ) + rng.normal(scale=observation_noise, size=delta.shape)
+    outlier_mask = rng.uniform(size=observations.shape[0]) < outlier_rate
+    observations[outlier_mask] = rng.uniform(
+        low=-2.0, high=2.0, size=(int(onp.sum(outlier_mask)), 2)
+    )
+
+    return LandmarkGraphData(
+        pose_graph=pose_graph,
+        landmark_variables=[LandmarkVariable() for _ in range(landmarks.shape[0])],
+        initial_landmarks=landmarks
+        + rng.normal(scale=observation_noise, size=landmarks.shape),
+        observation_indices=onp.stack([pose_indices, landmark_indices], axis=-1),
+        observations=observations,
+        observation_noise=observation_noise,
+    )
+
+
+GENERATOR_FROM_NAME: Dict[str, Callable[..., Union[G2OData, LandmarkGraphData]]] = {
+    "manhattan2d": make_manhattan_2d,
+    "sphere3d": lambda num_poses, **kwargs: make_surface_3d(
+        num_poses, surface="sphere", **kwargs
+    ),
+    "torus3d": lambda num_poses, **kwargs: make_surface_3d(
+        num_poses, surface="torus", **kwargs
+    ),
+    "grid_landmarks2d": make_grid_landmarks_2d,
+}
+"""Generators by name. Each takes a pose count as its first argument."""
+
+
+def _make_manhattan_trajectory(
+    rng: onp.random.Generator, num_poses: int
+) -> Tuple[onp.ndarray, onp.ndarray]:
+    """Returns integer positions and headings for a grid-aligned random walk."""
+    turns = rng.choice([-1, 0, 1], p=[0.15, 0.7, 0.15], size=num_poses)
+    turns[0] = 0
+    heading = onp.cumsum(turns) % 4
+    steps = onp.array([[1, 0], [0, 1], [-1, 0], [0, -1]])[heading]
+    steps[0] = 0
+    return onp.cumsum(steps, axis=0).astype(onp.float64), heading * onp.pi / 2.0
+
+
+def _make_pose_graph(
+    rng: onp.random.Generator,
+    T_world_pose: jaxlie.MatrixLieGroup,
+    loop_closures: onp.ndarray,
+    translation_noise: float,
+    rotation_noise: float,
+    outlier_rate: float,
+) -> G2OData:
+    """Build noisy odometry + loop closure measurements from ground-truth poses."""
+    group_type = type(T_world_pose)
+    num_poses = T_world_pose.parameters().shape[0]
+    odometry = onp.stack([onp.arange(num_poses - 1), onp.arange(1, num_poses)], axis=-1)
+    edge_indices = onp.concatenate([odometry, loop_closures], axis=0)
+    num_edges = edge_indices.shape[0]
+
+    # Noise is applied in the tangent space; jaxlie orders translation terms first.
+    noise_stddev = onp.array(
+        [translation_noise] * group_type.space_dim
+        + [rotation_noise] * (group_type.tangent_dim - group_type.space_dim)
+    )
+    noise = rng.normal(size=(num_edges, group_type.tangent_dim)) * noise_stddev
+
+    # Outliers: loop closures replaced with random transforms
+    outlier_mask = onp.zeros(num_edges, dtype=bool)
+    outlier_mask[odometry.shape[0] :] = (
+        rng.uniform(size=loop_closures.shape[0]) < outlier_rate
+    )
+    outlier_count = int(onp.sum(outlier_mask))
+    outlier_tangents = onp.concatenate(
+        [
+            rng.uniform(low=-5.0, high=5.0, size=(outlier_count, group_type.space_dim)),
+            rng.uniform(
+                low=-onp.pi,
+                high=onp.pi,
+                size=(outlier_count, group_type.tangent_dim - group_type.space_dim),
+            ),
+        ],
+        axis=-1,
+    )
+
+    T_a_b = onp.array(
+        _compute_noisy_relative_parameters(
+            T_world_pose,
+            edge_indices[:, 0],
+            edge_indices[:, 1],
+            noise,
+        )
+    )
+    T_a_b[outlier_mask] = jax.vmap(group_type.exp)(outlier_tangents).parameters()
+
+    initial_poses = jax.vmap(jaxlie.manifold.rplus)(
+        T_world_pose,
+        rng.normal(size=(num_poses, group_type.tangent_dim)) * noise_stddev,
+    )
+
+    return G2OData(
+        pose_variables=[
+            {
+                jaxlie.SE2: jaxfg.geometry.SE2Variable,
+                jaxlie.SE3: jaxfg.geometry.SE3Variable,
+            }[group_type]()
+            for _ in range(num_poses)
+        ],
+        initial_poses=jax.tree_map(onp.asarray, initial_poses),
+        edge_indices=edge_indices,
+        T_a_b=group_type(T_a_b),
+        sqrt_precision_matrices=onp.broadcast_to(
+            onp.diag(1.0 / noise_stddev), (num_edges,) + (group_type.tangent_dim,) * 2
+        ),
+    )
+
+
+@jax.jit
+def _compute_noisy_relative_parameters(
+    T_world_pose: jaxlie.MatrixLieGroup,
+    indices_a: jnp.ndarray,
+    indices_b: jnp.ndarray,
+    noise: jnp.ndarray,
+) -> jnp.ndarray:
+    """Parameters of `(T_world_a.inverse() @ T_world_b) @ exp(noise)`, for each edge."""
+
+    def relative(T_world_a, T_world_b, noise):
+        return jaxlie.manifold.rplus(T_world_a.inverse() @ T_world_b, noise)
+
+    parameters = T_world_pose.parameters()
+    group_type = type(T_world_pose)
+    return jax.vmap(relative)(
+        group_type(parameters[indices_a]), group_type(parameters[indices_b]), noise
+    ).parameters()
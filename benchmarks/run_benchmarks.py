@@ -0,0 +1,115 @@
+"""Benchmark every solver and linear solver combination over the bundled datasets.
+
+Results are written as JSON, and can optionally be compared against a stored baseline:
+
+    python benchmarks/run_benchmarks.py --output-path results.json
+    python benchmarks/run_benchmarks.py --baseline-path results.json
+
+For a summary of options:
+
+    python benchmarks/run_benchmarks.py --help
+
+"""
+
+import dataclasses
+import pathlib
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import tyro
+
+import _benchmark_utils
+from _benchmark_utils import LinearSolverType, SolverType
+
+_DATA_DIR = pathlib.Path(__file__).absolute().parent.parent / "scripts" / "data"
+
+
+@dataclasses.dataclass
+class CliArgs:
+    datasets: Tuple[str, ...] = (
+        "input_M3500_g2o",
+        "sphere2500",
+        "torus3D",
+        "parking-garage",
+    )
+    """Names of g2o files to benchmark, from `scripts/data/`."""
+
+    solver_types: Tuple[SolverType, ...] = tuple(SolverType)
+    """Nonlinear solvers to benchmark."""
+
+    linear_solver_types: Tuple[LinearSolverType, ...] = tuple(LinearSolverType)
+    """Linear subproblem solvers to benchmark."""
+
+    repeats: int = 5
+    """Number of timed full solves per case, after warm-up."""
+
+    output_path: Optional[pathlib.Path] = None
+    """If set, results are written here as JSON."""
+
+    baseline_path: Optional[pathlib.Path] = None
+    """If set, results are compared against this JSON file. Exits with a nonzero
+    status if any regressions are found."""
+
+    time_tolerance: float = 0.2
+    """Relative slowdown that counts as a regression."""
+
+    cost_tolerance: float = 1e-3
+    """Relative final cost increase that counts as a regression."""
+
+
+def main() -> None:
+    cli_args = tyro.cli(CliArgs)
+
+    problem_loaders: Dict[str, _benchmark_utils.ProblemLoader] = {
+        name: _benchmark_utils.g2o_loader(_DATA_DIR / f"{name}.g2o")
+        for name in cli_args.datasets
+    }
+
+    results: List[_benchmark_utils.BenchmarkResult] = []
+    for problem_name, problem_loader in problem_loaders.items():
+        for solver_type in cli_args.solver_types:
+            for linear_solver_type in cli_args.linear_solver_types:
+                case = _benchmark_utils.BenchmarkCase(
+                    problem_name=problem_name,
+                    solver_type=solver_type,
+                    linear_solver_type=linear_solver_type,
+                )
+                print(f"Running {case.key}...", flush=True)
+                result = _benchmark_utils.run_case_in_subprocess(
+                    case, problem_loader, repeats=cli_args.repeats
+                )
+                print(
+                    f"    build={result.build_seconds:.3f}s"
+                    f" compile={result.compile_seconds:.3f}s"
+                    f" first_iteration={result.first_iteration_seconds:.3f}s"
+                    f" steady_state={result.steady_state_seconds:.3f}s"
+                    f" peak_rss={result.peak_rss_mb:.0f}MB"
+                    f" final_cost={result.final_cost:.6g}",
+                    flush=True,
+                )
+                results.append(result)
+
+    if cli_args.output_path is not None:
+        _benchmark_utils.write_results(
+            cli_args.output_path,
+            results,
+            metadata=_benchmark_utils.get_environment_metadata(),
+        )
+
+    if cli_args.baseline_path is not None:
+        regressions = _benchmark_utils.compare_results(
+            results,
+            baseline=_benchmark_utils.read_results(cli_args.baseline_path),
+            time_tolerance=cli_args.time_tolerance,
+            cost_tolerance=cli_args.cost_tolerance,
+        )
+        if len(regressions) > 0:
+            print(f"\nFound {len(regressions)} regression(s):")
+            for regression in regressions:
+                print(f"    {regression}")
+            sys.exit(1)
+        print("\nNo regressions found.")
+
+
+if __name__ == "__main__":
+    main()
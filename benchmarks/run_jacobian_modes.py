@@ -0,0 +1,256 @@
+"""Compare forward- and reverse-mode autodiff Jacobians over representative factors.
+
+For each factor type, residuals and Jacobians for a batch of factors are evaluated
+with each `jaxfg.core.JacobianMode`, and timings are printed next to the mode that
+`JacobianMode.AUTO` resolves to:
+
+    python benchmarks/run_jacobian_modes.py
+
+For a summary of options:
+
+    python benchmarks/run_jacobian_modes.py --help
+
+"""
+
+import dataclasses
+import statistics
+import time
+from typing import Callable, Dict, List, NamedTuple, Tuple, Type
+
+import jax
+import jax_dataclasses as jdc
+import jaxlie
+import numpy as onp
+import tyro
+from jax import numpy as jnp
+from overrides import overrides
+
+import _benchmark_utils  # noqa: F401 (adds `scripts/` to the path)
+import _bal_utils  # noqa: E402
+import jaxfg
+
+
+@dataclasses.dataclass
+class CliArgs:
+    num_factors: int = 20000
+    """Number of factors to evaluate per batch."""
+
+    repeats: int = 20
+    """Number of timed evaluations per mode, after warm-up."""
+
+
+class _PoseValueTuple(NamedTuple):
+    T_world_a: jaxlie.SE3
+
+
+@jdc.pytree_dataclass
+class _PriorFactor(jaxfg.core.FactorBase[_PoseValueTuple]):
+    """SE(3) prior, without analytical Jacobians."""
+
+    mu: jaxlie.SE3
+
+    @overrides
+    def compute_residual_vector(self, variable_values: _PoseValueTuple) -> jnp.ndarray:
+        return jaxlie.manifold.rminus(variable_values.T_world_a, self.mu)
+
+
+class _PosePairValueTuple(NamedTuple):
+    T_world_a: jaxlie.SE3
+    T_world_b: jaxlie.SE3
+
+
+@jdc.pytree_dataclass
+class _BetweenFactor(jaxfg.core.FactorBase[_PosePairValueTuple]):
+    """SE(3) relative pose, without analytical Jacobians."""
+
+    T_a_b: jaxlie.SE3
+
+    @overrides
+    def compute_residual_vector(
+        self, variable_values: _PosePairValueTuple
+    ) -> jnp.ndarray:
+        return jaxlie.manifold.rminus(
+            variable_values.T_world_a.inverse() @ variable_values.T_world_b, self.T_a_b
+        )
+
+
+@jdc.pytree_dataclass
+class _RangeFactor(jaxfg.core.FactorBase[_PosePairValueTuple]):
+    """Scalar range between two poses."""
+
+    distance: jnp.ndarray
+
+    @overrides
+    def compute_residual_vector(
+        self, variable_values: _PosePairValueTuple
+    ) -> jnp.ndarray:
+        return (
+            jnp.linalg.norm(
+                variable_values.T_world_a.translation()
+                - variable_values.T_world_b.translation(),
+                keepdims=True,
+            )
+            - self.distance
+        )
+
+
+class _CalibratedRangeValueTuple(NamedTuple):
+    T_world_a: jaxlie.SE3
+    T_world_b: jaxlie.SE3
+    T_body_sensor: jaxlie.SE3
+
+
+@jdc.pytree_dataclass
+class _CalibratedRangeFactor(jaxfg.core.FactorBase[_CalibratedRangeValueTuple]):
+    """Scalar range between sensors mounted on two poses, with shared extrinsics."""
+
+    distance: jnp.ndarray
+
+    @overrides
+    def compute_residual_vector(
+        self, variable_values: _CalibratedRangeValueTuple
+    ) -> jnp.ndarray:
+        T_body_sensor = variable_values.T_body_sensor
+        sensor_a = (variable_values.T_world_a @ T_body_sensor).translation()
+        sensor_b = (variable_values.T_world_b @ T_body_sensor).translation()
+        return jnp.linalg.norm(sensor_a - sensor_b, keepdims=True) - self.distance
+
+
+def _random_se3(rng: onp.random.Generator, count: int) -> jaxlie.SE3:
+    return jax.vmap(jaxlie.SE3.exp)(rng.normal(size=(count, 6)))
+
+
+def _make_cases(
+    rng: onp.random.Generator,
+) -> Dict[str, Tuple[jaxfg.core.FactorBase, Callable[[int], Tuple]]]:
+    """Factor instances, and functions for sampling stacked values of their
+    variables."""
+    se3_variable = jaxfg.geometry.SE3Variable()
+    return {
+        "SE(3) prior": (
+            _PriorFactor(
+                variables=(se3_variable,),
+                mu=jaxlie.SE3.exp(rng.normal(size=(6,))),
+                noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(6)),
+            ),
+            lambda count: (_random_se3(rng, count),),
+        ),
+        "SE(3) between": (
+            _BetweenFactor(
+                variables=(se3_variable, se3_variable),
+                T_a_b=jaxlie.SE3.exp(rng.normal(size=(6,))),
+                noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(6)),
+            ),
+            lambda count: (_random_se3(rng, count), _random_se3(rng, count)),
+        ),
+        "BAL reprojection": (
+            _bal_utils.ReprojectionFactor(
+                variables=(_bal_utils.BalCameraVariable(), _bal_utils.PointVariable()),
+                observation=jnp.zeros(2),
+                noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(2)),
+            ),
+            lambda count: (
+                _bal_utils.BalCamera(
+                    T_camera_world=jax.vmap(jaxlie.SE3.exp)(
+                        onp.concatenate(
+                            [
+                                rng.normal(size=(count, 3))
+                                + onp.array([0.0, 0.0, -10.0]),
+                                rng.normal(scale=0.1, size=(count, 3)),
+                            ],
+                            axis=-1,
+                        )
+                    ),
+                    intrinsics=jnp.tile(jnp.array([500.0, 0.0, 0.0]), (count, 1)),
+                ),
+                jnp.array(rng.normal(size=(count, 3))),
+            ),
+        ),
+        "Range": (
+            _RangeFactor(
+                variables=(se3_variable, se3_variable),
+                distance=jnp.ones(1),
+                noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(1)),
+            ),
+            lambda count: (_random_se3(rng, count), _random_se3(rng, count)),
+        ),
+        "Calibrated range": (
+            _CalibratedRangeFactor(
+                variables=(se3_variable, se3_variable, jaxfg.geometry.SE3Variable()),
+                distance=jnp.ones(1),
+                noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(1)),
+            ),
+            lambda count: tuple(_random_se3(rng, count) for _ in range(3)),
+        ),
+    }
+
+
+def _with_jacobian_mode(
+    factor: jaxfg.core.FactorBase, mode: jaxfg.core.JacobianMode
+) -> jaxfg.core.FactorBase:
+    """Copy of a factor, as an instance of a subclass with a fixed Jacobian mode."""
+    factor_type = jdc.pytree_dataclass(
+        type(type(factor).__name__, (type(factor),), {"jacobian_mode": mode})
+    )
+    return factor_type(
+        **{
+            field.name: getattr(factor, field.name)
+            for field in dataclasses.fields(factor)
+        }
+    )
+
+
+def _time_evaluation(
+    factor: jaxfg.core.FactorBase, variable_values: Tuple, repeats: int
+) -> float:
+    """Median seconds for evaluating residuals and Jacobians for a batch of factors."""
+    evaluate = jax.jit(jax.vmap(type(factor).compute_residual_vector_and_jacobians))
+    jax.block_until_ready(evaluate(factor, variable_values))
+    durations: List[float] = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        jax.block_until_ready(evaluate(factor, variable_values))
+        durations.append(time.perf_counter() - start_time)
+    return statistics.median(durations)
+
+
+def main() -> None:
+    cli_args = tyro.cli(CliArgs)
+    rng = onp.random.default_rng(0)
+
+    print(
+        f"{'Factor':<20} {'Residual dim':>13} {'Local dim':>10}"
+        f" {'Forward (ms)':>13} {'Reverse (ms)':>13} {'Auto':>8}"
+    )
+    for name, (factor, sample_values) in _make_cases(rng).items():
+        stacked_factor = jax.tree_map(
+            lambda leaf: jnp.broadcast_to(leaf, (cli_args.num_factors,) + leaf.shape),
+            factor,
+        )
+        stacked_values = factor.build_variable_value_tuple(
+            sample_values(cli_args.num_factors)
+        )
+
+        seconds_from_mode = {
+            mode: _time_evaluation(
+                _with_jacobian_mode(stacked_factor, mode),
+                stacked_values,
+                repeats=cli_args.repeats,
+            )
+            for mode in (
+                jaxfg.core.JacobianMode.FORWARD,
+                jaxfg.core.JacobianMode.REVERSE,
+            )
+        }
+        print(
+            f"{name:<20} {factor.get_residual_dim():>13}"
+            f" {sum(v.get_local_parameter_dim() for v in factor.variables):>10}"
+            f" {seconds_from_mode[jaxfg.core.JacobianMode.FORWARD] * 1e3:>13.3f}"
+            f" {seconds_from_mode[jaxfg.core.JacobianMode.REVERSE] * 1e3:>13.3f}"
+            f" {factor.get_jacobian_mode().name.lower():>8}",
+            flush=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Scaling study over synthetic graphs of increasing size.
+
+Runs one solver configuration over a sweep of problem sizes, writes results as JSON,
+and saves log-log plots of each timing and peak memory against variable count:
+
+    python benchmarks/run_scaling.py --generator manhattan2d --sizes 1000 10000 100000
+
+For a summary of options:
+
+    python benchmarks/run_scaling.py --help
+
+"""
+
+import dataclasses
+import pathlib
+from typing import List, Literal, Optional, Tuple
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import tyro  # noqa: E402
+
+import _benchmark_utils  # noqa: E402
+from _benchmark_utils import LinearSolverType, SolverType  # noqa: E402
+
+
+@dataclasses.dataclass
+class CliArgs:
+    generator: Literal["manhattan2d", "sphere3d", "torus3d", "grid_landmarks2d"] = (
+        "manhattan2d"
+    )
+    """Synthetic graph generator to use."""
+
+    sizes: Tuple[int, ...] = (1000, 3000, 10000, 30000, 100000)
+    """Pose counts to sweep over."""
+
+    solver_type: SolverType = SolverType.GAUSS_NEWTON
+    """Nonlinear solver to use."""
+
+    linear_solver_type: LinearSolverType = LinearSolverType.CONJUGATE_GRADIENT
+    """Linear subproblem solver to use."""
+
+    loop_closure_probability: float = 0.5
+    """Loop closure density."""
+
+    translation_noise: float = 0.02
+    """Standard deviation of translation noise on edges."""
+
+    rotation_noise: float = 0.01
+    """Standard deviation of rotation noise on edges, in radians."""
+
+    outlier_rate: float = 0.0
+    """Fraction of loop closures to replace with random transforms."""
+
+    repeats: int = 3
+    """Number of timed full solves per size, after warm-up."""
+
+    output_path: Optional[pathlib.Path] = None
+    """If set, results are written here as JSON."""
+
+    plot_path: pathlib.Path = pathlib.Path("scaling.png")
+    """Path to save log-log plots to."""
+
+
+_PLOTTED_FIELDS = (
+    "build_seconds",
+    "compile_seconds",
+    "first_iteration_seconds",
+    "steady_state_seconds",
+    "peak_rss_mb",
+)
+
+
+def main() -> None:
+    cli_args = tyro.cli(CliArgs)
+
+    results: List[_benchmark_utils.BenchmarkResult] = []
+    for size in cli_args.sizes:
+        case = _benchmark_utils.BenchmarkCase(
+            problem_name=f"{cli_args.generator}_{size}",
+            solver_type=cli_args.solver_type,
+            linear_solver_type=cli_args.linear_solver_type,
+        )
+        print(f"Running {case.key}...", flush=True)
+        result = _benchmark_utils.run_case_in_subprocess(
+            case,
+            _benchmark_utils.synthetic_loader(
+                cli_args.generator,
+                size,
+                loop_closure_probability=cli_args.loop_closure_probability,
+                translation_noise=cli_args.translation_noise,
+                rotation_noise=cli_args.rotation_noise,
+                outlier_rate=cli_args.outlier_rate,
+            ),
+            repeats=cli_args.repeats,
+        )
+        print(
+            f"    variables={result.num_variables} factors={result.num_factors}"
+            f" build={result.build_seconds:.3f}s"
+            f" compile={result.compile_seconds:.3f}s"
+            f" first_iteration={result.first_iteration_seconds:.3f}s"
+            f" steady_state={result.steady_state_seconds:.3f}s"
+            f" peak_rss={result.peak_rss_mb:.0f}MB",
+            flush=True,
+        )
+        results.append(result)
+
+    if cli_args.output_path is not None:
+        _benchmark_utils.write_results(
+            cli_args.output_path,
+            results,
+            metadata=_benchmark_utils.get_environment_metadata(),
+        )
+
+    # Log-log plots against variable count
+    fig, axes = plt.subplots(
+        1, len(_PLOTTED_FIELDS), figsize=(4 * len(_PLOTTED_FIELDS), 4)
+    )
+    num_variables = [result.num_variables for result in results]
+    for ax, field in zip(axes, _PLOTTED_FIELDS):
+        ax.loglog(
+            num_variables, [getattr(result, field) for result in results], marker="o"
+        )
+        ax.set_xlabel("Variables")
+        ax.set_title(field)
+        ax.grid(True, which="both", alpha=0.3)
+    fig.suptitle(
+        f"{cli_args.generator}: {cli_args.solver_type.name} +"
+        f" {cli_args.linear_solver_type.name}"
+    )
+    fig.tight_layout()
+    fig.savefig(cli_args.plot_path)
+    print(f"Saved plots to {cli_args.plot_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
-from . import core, experimental, geometry, hints, noises, solvers, sparse, utils
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+# Subpackages are loaded lazily, on first attribute access (PEP 562). This keeps
+# `import jaxfg` cheap for processes that only need part of the library.
+if TYPE_CHECKING:
+    from . import core, experimental, geometry, hints, noises, solvers, sparse, utils
 
 __all__ = [
     "core",
@@ -10,3 +16,13 @@ __all__ = [
     "sparse",
     "utils",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals().keys()) | set(__all__))
@@ -1,16 +1,28 @@
-from ._factor_base import FactorBase
-from ._factor_stack import FactorStack
+from ._compiled_solver import CompiledSolver
+from ._diagnostics import (
+    FactorStackDiagnostics,
+    ResourceEstimate,
+    format_factor_stack_diagnostics,
+)
+from ._factor_base import FactorBase, JacobianMode
+from ._factor_stack import FactorBatch, FactorStack
 from ._stacked_factor_graph import StackedFactorGraph
 from ._storage_layout import StorageLayout
 from ._variable_assignments import VariableAssignments
 from ._variables import RealVectorVariable, VariableBase
 
 __all__ = [
+    "CompiledSolver",
+    "FactorStackDiagnostics",
+    "FactorBatch",
     "FactorStack",
     "FactorBase",
+    "JacobianMode",
     "StackedFactorGraph",
     "StorageLayout",
     "VariableAssignments",
     "RealVectorVariable",
+    "ResourceEstimate",
     "VariableBase",
+    "format_factor_stack_diagnostics",
 ]
@@ -0,0 +1,121 @@
+import dataclasses
+from typing import TYPE_CHECKING, Any, Optional, Tuple
+
+import jax
+from jax import numpy as jnp
+
+from .. import hints
+from ._storage_layout import StorageLayout
+from ._variable_assignments import VariableAssignments
+
+if TYPE_CHECKING:
+    from ..solvers import NonlinearSolverBase
+    from ._stacked_factor_graph import StackedFactorGraph
+
+
+@dataclasses.dataclass(frozen=True)
+class CompiledSolver:
+    """Solve function that has already been lowered and compiled for a specific graph
+    structure and solver. Created via `StackedFactorGraph.compile_solver()`.
+
+    Calls skip pytree flattening of the graph, static argument hashing, and jit cache
+    lookups: inputs are a raw storage vector and (optionally) a flat tuple of graph
+    parameters.
+    """
+
+    storage_layout: StorageLayout
+    """Layout expected for input storage vectors. Matches the graph's layout."""
+
+    graph_leaves: Tuple[jnp.ndarray, ...]
+    """Flattened graph parameters used when none are passed in."""
+
+    graph_treedef: Any
+    """Treedef of the graph that the solve was compiled for."""
+
+    executable: jax.stages.Compiled
+    """Compiled solve. Maps `(storage, graph_leaves)` to a solution storage vector."""
+
+    donate_storage: bool
+    """Whether input storage vectors are donated to the solution. See `make()`."""
+
+    @staticmethod
+    def make(
+        graph: "StackedFactorGraph",
+        solver: "NonlinearSolverBase",
+        donate_storage: bool = False,
+    ) -> "CompiledSolver":
+        """Lower and compile a solve for a graph.
+
+        Args:
+            graph: Graph to compile a solve for.
+            solver: Nonlinear solver.
+            donate_storage: If set, buffers for input storage vectors are donated to
+                the solution, and can't be reused after each call. Reduces peak
+                memory for large problems.
+        """
+        leaves, treedef = jax.tree_util.tree_flatten(graph)
+        graph_leaves = tuple(jax.device_put(leaf) for leaf in leaves)
+        storage_layout = graph.storage_layout
+
+        def solve_storage(
+            storage: jnp.ndarray, graph_leaves: Tuple[jnp.ndarray, ...]
+        ) -> jnp.ndarray:
+            return solver.solve(
+                graph=jax.tree_util.tree_unflatten(treedef, graph_leaves),
+                initial_assignments=VariableAssignments(
+                    storage=storage, storage_layout=storage_layout
+                ),
+            ).storage
+
+        executable = (
+            jax.jit(solve_storage, donate_argnums=0 if donate_storage else ())
+            .lower(
+                jax.ShapeDtypeStruct(
+                    (storage_layout.dim,), jnp.zeros(0).dtype  # Default float dtype
+                ),
+                graph_leaves,
+            )
+            .compile()
+        )
+        return CompiledSolver(
+            storage_layout=storage_layout,
+            graph_leaves=graph_leaves,
+            graph_treedef=treedef,
+            executable=executable,
+            donate_storage=donate_storage,
+        )
+
+    def __call__(
+        self,
+        storage: hints.Array,
+        graph_leaves: Optional[Tuple[jnp.ndarray, ...]] = None,
+    ) -> jnp.ndarray:
+        """Solve from an initial storage vector, which should follow `storage_layout`.
+        Returns the solution storage vector.
+
+        Args:
+            storage: Initial storage vector.
+            graph_leaves: New graph parameters, from `flatten_graph()`. Optional.
+        """
+        return self.executable(
+            storage, self.graph_leaves if graph_leaves is None else graph_leaves
+        )
+
+    def flatten_graph(self, graph: "StackedFactorGraph") -> Tuple[jnp.ndarray, ...]:
+        """Flatten parameters from a graph with the same structure as the compiled one,
+        for example with updated factor parameters. Results can be reused across calls.
+        """
+        leaves, treedef = jax.tree_util.tree_flatten(graph)
+        assert treedef == self.graph_treedef, "Graph structure does not match!"
+        return tuple(jax.device_put(leaf) for leaf in leaves)
+
+    def solve(self, initial_assignments: VariableAssignments) -> VariableAssignments:
+        """Convenience wrapper that takes and returns assignment objects. Storage layout
+        mismatches are resolved, which adds some dispatch overhead."""
+        solution = VariableAssignments(
+            storage=self(
+                initial_assignments.update_storage_layout(self.storage_layout).storage
+            ),
+            storage_layout=self.storage_layout,
+        )
+        return solution.update_storage_layout(initial_assignments.storage_layout)
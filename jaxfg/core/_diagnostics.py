@@ -0,0 +1,267 @@
+import dataclasses
+import statistics
+import time
+from typing import TYPE_CHECKING, Optional, Sequence, Tuple, Type
+
+import jax
+import numpy as onp
+from jax import numpy as jnp
+
+from .. import hints, sparse
+from ._factor_base import FactorBase
+from ._factor_stack import FactorStack
+from ._storage_layout import StorageLayout
+from ._variable_assignments import VariableAssignments
+
+if TYPE_CHECKING:
+    import scipy.sparse
+
+
+@dataclasses.dataclass(frozen=True)
+class FactorStackDiagnostics:
+    """Cost and size statistics for one factor stack. Created via
+    `StackedFactorGraph.compute_factor_stack_diagnostics()`."""
+
+    index: int
+    """Index of the stack in `StackedFactorGraph.factor_stacks`."""
+
+    factor_type: Type[FactorBase]
+    """Type of the stacked factors."""
+
+    num_factors: int
+    """Number of factors in the stack."""
+
+    residual_dim: int
+    """Number of residual entries contributed by the stack."""
+
+    jacobian_nnz: int
+    """Number of structurally nonzero Jacobian entries contributed by the stack."""
+
+    cost: float
+    """Sum of squared whitened residuals."""
+
+    cost_fraction: float
+    """Fraction of the total graph cost."""
+
+    evaluation_seconds: Optional[float] = None
+    """Median wall-clock time for computing whitened residuals and Jacobians for the
+    stack. Only populated when timing is requested."""
+
+
+def format_factor_stack_diagnostics(
+    diagnostics: Sequence[FactorStackDiagnostics],
+) -> str:
+    """Format diagnostics as a table, sorted by cost."""
+    lines = [
+        f"{'#':>3} {'Factor type':<32} {'Factors':>9} {'Residuals':>10}"
+        f" {'Jacobian nnz':>13} {'Cost':>12} {'Cost %':>7} {'Eval (ms)':>10}"
+    ]
+    for d in sorted(diagnostics, key=lambda d: -d.cost):
+        evaluation_ms = (
+            "-" if d.evaluation_seconds is None else f"{d.evaluation_seconds * 1e3:.3f}"
+        )
+        lines.append(
+            f"{d.index:>3} {d.factor_type.__name__:<32} {d.num_factors:>9}"
+            f" {d.residual_dim:>10} {d.jacobian_nnz:>13} {d.cost:>12.6g}"
+            f" {d.cost_fraction * 100.0:>6.2f}% {evaluation_ms:>10}"
+        )
+    return "\n".join(lines)
+
+
+def compute_jacobian_nnz(
+    stacked_factor: FactorStack,
+    jacobian_factor_indices: Sequence[Optional[hints.Array]],
+) -> int:
+    """Number of Jacobian entries for a factor stack. Each factor contributes a dense
+    block for each connected non-constant variable."""
+    return stacked_factor.factor.get_residual_dim() * sum(
+        variable.get_local_parameter_dim()
+        * (stacked_factor.num_factors if indices is None else len(indices))
+        for variable, indices in zip(
+            stacked_factor.factor.variables, jacobian_factor_indices
+        )
+    )
+
+
+def measure_evaluation_seconds(
+    stacked_factor: FactorStack, assignments: VariableAssignments, repeats: int
+) -> float:
+    """Median wall-clock time for evaluating whitened residuals and Jacobians for a
+    factor stack. Compilation is excluded."""
+    jax.block_until_ready(_evaluate_factor_stack(stacked_factor, assignments))
+    durations = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        jax.block_until_ready(_evaluate_factor_stack(stacked_factor, assignments))
+        durations.append(time.perf_counter() - start_time)
+    return statistics.median(durations)
+
+
+@jax.jit
+def _evaluate_factor_stack(
+    stacked_factor: FactorStack, assignments: VariableAssignments
+) -> Tuple[jnp.ndarray, Tuple[jnp.ndarray, ...]]:
+    residual_vector = stacked_factor.whiten_residual_vector(
+        stacked_factor.compute_residual_vector(assignments)
+    )
+    jacobians = tuple(
+        stacked_factor.whiten_jacobian(jacobian, residual_vector)
+        for jacobian in stacked_factor.compute_residual_jacobian(assignments)
+    )
+    return residual_vector, jacobians
+
+
+@dataclasses.dataclass(frozen=True)
+class ResourceEstimate:
+    """Problem size, memory, and compute estimates for solving a graph. Created via
+    `StackedFactorGraph.estimate_resources()`."""
+
+    num_variables: int
+    """Number of non-constant variables in the graph."""
+
+    residual_dim: int
+    """Number of rows in the Jacobian."""
+
+    local_dim: int
+    """Number of columns in the Jacobian; the dimension of each linear subproblem."""
+
+    jacobian_nnz: int
+    """Number of nonzero Jacobian entries."""
+
+    jacobian_bytes: int
+    """Memory used for Jacobian values and coordinates."""
+
+    normal_matrix_nnz: int
+    """Number of nonzero entries in `A^T A`, counted symmetrically."""
+
+    cholesky_factor_nnz: int
+    """Estimated number of nonzero entries in the Cholesky factor of `A^T A`. Computed
+    via a block-level symbolic factorization, using the better of the natural and
+    reverse Cuthill-McKee variable orderings. CHOLMOD's fill-reducing orderings
+    typically do at least as well, so this is usually an upper bound."""
+
+    cholesky_fill_in: int
+    """Estimated Cholesky factor entries that are not in the lower triangle of
+    `A^T A`."""
+
+    jacobian_peak_bytes: int
+    """Peak memory of `compute_whitened_residual_jacobian()`: arguments, outputs, and
+    temporary buffers, as reported by XLA. Backends that don't report memory statistics
+    fall back to argument and output sizes, which is a lower bound."""
+
+    step_flops: Optional[float]
+    """XLA's FLOP count for one solver step. Host callbacks, which include
+    `CholmodSolver` factorizations, are not counted. `None` if unavailable."""
+
+    step_bytes_accessed: Optional[float]
+    """XLA's count of bytes accessed in one solver step. `None` if unavailable."""
+
+
+def compute_block_sparsity(
+    jacobian_coords: sparse.SparseCooCoordinates,
+    local_storage_layout: StorageLayout,
+) -> Tuple["scipy.sparse.csr_matrix", onp.ndarray]:
+    """Compute the variable-level sparsity pattern of `A^T A`.
+
+    Returns:
+        Tuple[scipy.sparse.csr_matrix, onp.ndarray]: Symmetric pattern with shape
+        `(num_variables, num_variables)`, and the local dimension of each variable.
+    """
+    dims = onp.array(
+        [
+            variable.get_local_parameter_dim()
+            for variable in local_storage_layout.get_variables()
+        ],
+        dtype=onp.int64,
+    )
+    import scipy.sparse
+
+    block_from_col = onp.repeat(onp.arange(len(dims)), dims)
+    rows = onp.asarray(jacobian_coords.rows)
+    B = scipy.sparse.csr_matrix(
+        (
+            onp.ones(len(rows), dtype=onp.int32),
+            (rows, block_from_col[onp.asarray(jacobian_coords.cols)]),
+        ),
+        shape=(int(rows.max()) + 1 if len(rows) > 0 else 0, len(dims)),
+    )
+    B.data[:] = 1
+    pattern = (B.T @ B).tocsr()
+    pattern.sort_indices()
+    return pattern, dims
+
+
+def estimate_cholesky_factor_nnz(
+    pattern: "scipy.sparse.csr_matrix", dims: onp.ndarray
+) -> int:
+    """Estimate scalar nonzeros in the Cholesky factor of a matrix with a block
+    sparsity pattern. Uses the better of the natural and reverse Cuthill-McKee
+    orderings.
+
+    Args:
+        pattern: Symmetric block sparsity pattern.
+        dims: Dimension of each block.
+    """
+    import scipy.sparse.csgraph
+
+    return min(
+        count_cholesky_factor_nnz(pattern, dims),
+        count_cholesky_factor_nnz(
+            pattern,
+            dims,
+            permutation=scipy.sparse.csgraph.reverse_cuthill_mckee(
+                pattern, symmetric_mode=True
+            ),
+        ),
+    )
+
+
+def count_cholesky_factor_nnz(
+    pattern: "scipy.sparse.csr_matrix",
+    dims: onp.ndarray,
+    permutation: Optional[onp.ndarray] = None,
+) -> int:
+    """Count scalar nonzeros in the Cholesky factor of a matrix with a block sparsity
+    pattern, by building the elimination tree and walking row subtrees. Runtime is
+    linear in the number of nonzero blocks in the factor.
+
+    Args:
+        pattern: Symmetric block sparsity pattern.
+        dims: Dimension of each block.
+        permutation: Optional elimination ordering.
+    """
+    if permutation is not None:
+        pattern = pattern[permutation, :][:, permutation].tocsr()
+        pattern.sort_indices()
+        dims = dims[permutation]
+
+    n = pattern.shape[0]
+    indptr = pattern.indptr.tolist()
+    indices = pattern.indices.tolist()
+    dims_list = dims.tolist()
+
+    parent = [-1] * n
+    ancestor = [-1] * n
+    mark = [-1] * n
+    nnz = 0
+    for i in range(n):
+        mark[i] = i
+        nnz += dims_list[i] * (dims_list[i] + 1) // 2
+        for j in indices[indptr[i] : indptr[i + 1]]:
+            if j >= i:
+                break
+
+            # Elimination tree, with path compression.
+            r = j
+            while ancestor[r] != -1 and ancestor[r] != i:
+                ancestor[r], r = i, ancestor[r]
+            if ancestor[r] == -1:
+                ancestor[r] = i
+                parent[r] = i
+
+            # Row subtree: every node on the path from j to i is nonzero in row i.
+            while mark[j] != i:
+                mark[j] = i
+                nnz += dims_list[i] * dims_list[j]
+                j = parent[j]
+    return nnz
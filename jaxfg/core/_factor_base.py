@@ -1,8 +1,24 @@
 import abc
-from typing import Generic, Tuple, Type, TypeVar, cast, get_args, get_type_hints
+import enum
+import functools
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Generic,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    cast,
+    get_args,
+    get_type_hints,
+)
 
 import jax
 import jax_dataclasses as jdc
+import numpy as onp
 from jax import numpy as jnp
 from overrides import EnforceOverrides, final
 
@@ -20,6 +36,29 @@ VariableValueTuple = TypeVar(
 T = TypeVar("T")
 
 
+class JacobianMode(enum.Enum):
+    """Autodiff mode used for computing factor Jacobians. See
+    `FactorBase.jacobian_mode`."""
+
+    AUTO = enum.auto()
+    """Reverse mode if the residual is much narrower than the local parameters of all
+    connected variables, forward mode otherwise."""
+
+    FORWARD = enum.auto()
+    """Push one tangent per local parameter through the residual computation."""
+
+    REVERSE = enum.auto()
+    """Pull one cotangent per residual dimension back through the residual
+    computation."""
+
+
+_REVERSE_MODE_DIM_RATIO = 16
+"""`JacobianMode.AUTO` picks reverse mode when the total local parameter dimension is at
+least this many times the residual dimension. Reverse mode has a much higher cost per
+basis vector than forward mode, so the threshold is high; see
+`benchmarks/run_jacobian_modes.py`."""
+
+
 @jdc.pytree_dataclass
 class _FactorBase:
     # For why we have two classes:
@@ -34,6 +73,10 @@ class _FactorBase:
 
 
 class FactorBase(_FactorBase, Generic[VariableValueTuple], abc.ABC, EnforceOverrides):
+    jacobian_mode: ClassVar[JacobianMode] = JacobianMode.AUTO
+    """Autodiff mode for Jacobians. Only used when `compute_residual_jacobians()` is
+    not overridden. Can be set in subclasses to override the automatic choice."""
+
     # (1) Functions that must be overriden in subclasses.
 
     @abc.abstractmethod
@@ -55,44 +98,181 @@ class FactorBase(_FactorBase, Generic[VariableValueTuple], abc.ABC, EnforceOverr
         composing the residual computation Jacobian with the manifold retraction
         Jacobian.
 
+        In forward mode, the residual computation is linearized once, and tangent
+        vectors from the retraction Jacobians are pushed through it directly. This
+        produces Jacobians with respect to local parameterizations without
+        materializing (typically wider) Jacobians with respect to the variable
+        parameters. In reverse mode, one cotangent per residual dimension is pulled
+        back to the variable parameters, then mapped to local parameterizations. See
+        `jacobian_mode`.
+
         There are two options for specifying analytical Jacobians:
         1) Override this method directly,
         2) Override `manifold_retract_jacobian()` for variables and define a custom JVP
           method for `compute_residual_vector`.
         """
+        return self._linearize_in_local_coordinates(variable_values)[1]
+
+    # (3) Shared implementations.
+
+    @final
+    def compute_residual_vector_and_jacobians(
+        self, variable_values: VariableValueTuple
+    ) -> Tuple[jnp.ndarray, Tuple[jnp.ndarray, ...]]:
+        """Compute factor error and Jacobians with respect to local parameterizations
+        in one pass. When Jacobians are computed via autodiff, the residual computed
+        during linearization is reused.
+
+        Args:
+            variable_values: Values of self.variables
+        """
+        if (
+            type(self).compute_residual_jacobians
+            is FactorBase.compute_residual_jacobians
+        ):
+            return self._linearize_in_local_coordinates(variable_values)
+        return (
+            self.compute_residual_vector(variable_values),
+            self.compute_residual_jacobians(variable_values),
+        )
 
-        # Some helpers for reshaping + concatenating Jacobians
-        def reshape_leaves(tree: hints.Pytree, shape: Tuple[int, ...]) -> hints.Pytree:
-            return jax.tree_map(lambda leaf: leaf.reshape(shape), tree)
+    @final
+    def get_jacobian_mode(self) -> JacobianMode:
+        """Autodiff mode for Jacobians, with `JacobianMode.AUTO` resolved from the
+        residual and local parameter dimensions."""
+        if self.jacobian_mode is not JacobianMode.AUTO:
+            return self.jacobian_mode
+        total_local_dim = sum(v.get_local_parameter_dim() for v in self.variables)
+        return (
+            JacobianMode.REVERSE
+            if total_local_dim >= _REVERSE_MODE_DIM_RATIO * self.get_residual_dim()
+            else JacobianMode.FORWARD
+        )
 
-        # To compute the Jacobian of the residual wrt the local parameters, we compose
-        # (1) the residual wrt the variable parameters and (2) the variable parameters
-        # wrt the local parameterization.
+    @final
+    def _linearize_in_local_coordinates(
+        self, variable_values: VariableValueTuple
+    ) -> Tuple[jnp.ndarray, Tuple[jnp.ndarray, ...]]:
+        """Compute factor error and autodiff Jacobians with respect to local
+        parameterizations. See `compute_residual_jacobians()`."""
         assert len(self.variables) == len(variable_values)
-        jacobians = jax.tree_map(
-            jnp.dot,
-            tuple(
-                jnp.concatenate(jax.tree_leaves(tree), axis=-1)
-                for tree in reshape_leaves(
-                    jax.jacfwd(self.compute_residual_vector)(variable_values),
-                    (self.get_residual_dim(), -1),
+        if self.get_jacobian_mode() is JacobianMode.REVERSE:
+            return self._linearize_in_local_coordinates_reverse(variable_values)
+        else:
+            return self._linearize_in_local_coordinates_forward(variable_values)
+
+    @final
+    def _linearize_in_local_coordinates_forward(
+        self, variable_values: VariableValueTuple
+    ) -> Tuple[jnp.ndarray, Tuple[jnp.ndarray, ...]]:
+        """Forward-mode implementation of `_linearize_in_local_coordinates()`."""
+
+        # Single linearization, batched over tangents. Output shape is
+        # `(residual_dim, total_local_dim)`.
+        residual_vector, residual_jvp = jax.linearize(
+            self.compute_residual_vector, variable_values
+        )
+        jacobian = jax.vmap(residual_jvp, out_axes=-1)(
+            self._get_local_tangents(variable_values)
+        )
+        return residual_vector, self._split_local_jacobian(jacobian)
+
+    @final
+    def _get_local_tangents(
+        self, variable_values: VariableValueTuple
+    ) -> VariableValueTuple:
+        """Tangent basis for forward-mode Jacobians: one tangent for each local
+        parameter of each variable, mapped to the parameter space of its variable via
+        the retraction Jacobian. Tangents for other variables are zero. Each leaf has a
+        leading axis of size `total_local_dim`."""
+        local_dims = tuple(v.get_local_parameter_dim() for v in self.variables)
+        total_local_dim = sum(local_dims)
+
+        tangent_leaves: List[jnp.ndarray] = []
+        local_offset = 0
+        for variable, value, local_dim in zip(
+            self.variables, variable_values, local_dims
+        ):
+            leaves = jax.tree_leaves(value)
+            retract_jacobian_leaves = jax.tree_leaves(
+                variable.manifold_retract_jacobian(value)
+            )
+            assert len(leaves) == len(retract_jacobian_leaves)
+            for leaf, retract_jacobian in zip(leaves, retract_jacobian_leaves):
+                tangent = jnp.moveaxis(
+                    retract_jacobian.reshape(leaf.shape + (local_dim,)), -1, 0
+                ).astype(leaf.dtype)
+                tangent_leaves.append(
+                    jnp.pad(
+                        tangent,
+                        [(local_offset, total_local_dim - local_offset - local_dim)]
+                        + [(0, 0)] * leaf.ndim,
+                    )
                 )
-            ),
-            tuple(
+            local_offset += local_dim
+        return jax.tree_unflatten(jax.tree_structure(variable_values), tangent_leaves)
+
+    @final
+    def _split_local_jacobian(self, jacobian: jnp.ndarray) -> Tuple[jnp.ndarray, ...]:
+        """Split a Jacobian with respect to the local parameters of all variables,
+        which are along the last axis, into one Jacobian per variable."""
+        split_indices = onp.cumsum(
+            [v.get_local_parameter_dim() for v in self.variables]
+        )[:-1]
+        return tuple(jnp.split(jacobian, split_indices, axis=-1))
+
+    @final
+    def _linearize_in_local_coordinates_reverse(
+        self, variable_values: VariableValueTuple
+    ) -> Tuple[jnp.ndarray, Tuple[jnp.ndarray, ...]]:
+        """Reverse-mode implementation of `_linearize_in_local_coordinates()`."""
+
+        # Jacobians with respect to variable parameters: one cotangent per residual
+        # dimension.
+        residual_vector, residual_vjp = jax.vjp(
+            self.compute_residual_vector, variable_values
+        )
+        (cotangents,) = jax.vmap(residual_vjp)(
+            jnp.eye(residual_vector.shape[-1], dtype=residual_vector.dtype)
+        )
+        return residual_vector, self._compose_local_jacobians(
+            variable_values, cotangents
+        )
+
+    @final
+    def _compose_local_jacobians(
+        self, variable_values: VariableValueTuple, cotangents: VariableValueTuple
+    ) -> Tuple[jnp.ndarray, ...]:
+        """Map cotangents of variable parameters, with one cotangent per residual
+        dimension along a leading axis, to Jacobians with respect to local
+        parameterizations."""
+
+        # Compose with retraction Jacobians. Parameter leaves are flattened and
+        # concatenated in the same order for both.
+        jacobians: List[jnp.ndarray] = []
+        for variable, value, cotangent in zip(
+            self.variables, variable_values, cotangents
+        ):
+            local_dim = variable.get_local_parameter_dim()
+            jacobians.append(
                 jnp.concatenate(
-                    reshape_leaves(
-                        self.variables[i].manifold_retract_jacobian(variable_values[i]),
-                        (-1, v.get_local_parameter_dim()),
-                    ),
+                    [
+                        leaf.reshape((leaf.shape[0], -1))
+                        for leaf in jax.tree_leaves(cotangent)
+                    ],
+                    axis=-1,
+                )
+                @ jnp.concatenate(
+                    [
+                        leaf.reshape((-1, local_dim))
+                        for leaf in jax.tree_leaves(
+                            variable.manifold_retract_jacobian(value)
+                        )
+                    ],
                     axis=0,
                 )
-                for i, v in enumerate(self.variables)
-            ),
-        )
-
-        return jacobians
-
-    # (3) Shared implementations.
+            )
+        return tuple(jacobians)
 
     @final
     def get_residual_dim(self) -> int:
@@ -110,28 +290,24 @@ class FactorBase(_FactorBase, Generic[VariableValueTuple], abc.ABC, EnforceOverr
             tuple(assignments.get_value(v) for v in self.variables)
         )
 
-    @final
-    def build_variable_value_tuple(
-        self, variable_values: Tuple[hints.VariableValue, ...]
-    ) -> VariableValueTuple:
-        """Prepares and validates a raw tuple of variable values to be passed into
-        `compute_residual_vector` or `compute_residual_jacobians`.
-
-        Slightly sketchy: checks the type hinting on `compute_residual_vector` and if
-        the user expects a named tuple, we wrap the input accordingly. Otherwise, we
-        just cast and return the input."""
-
-        assert isinstance(variable_values, tuple)
-
-        output: VariableValueTuple
-
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _get_value_tuple_info(
+        cls,
+    ) -> Tuple[Optional[Callable[..., VariableValueTuple]], Tuple[Any, ...]]:
+        """Determine the value tuple constructor and expected value types from the
+        type hints on `compute_residual_vector`. Computed once per factor class, and
+        lazily, so hints can reference types defined after the factor class.
+
+        Slightly sketchy: if the user expects a named tuple, the constructor is the
+        named tuple type. Otherwise, it's `None` and raw tuples are passed through."""
         try:
             value_type: Type[VariableValueTuple] = get_type_hints(
-                self.compute_residual_vector
+                cls.compute_residual_vector
             )["variable_values"]
         except KeyError as e:
             raise NotImplementedError(
-                f"Missing type hints for {type(self).__name__}.compute_residual_vector"
+                f"Missing type hints for {cls.__name__}.compute_residual_vector"
             ) from e
 
         # Function should be hinted with a tuple of some kind, but not `tuple` itself
@@ -142,28 +318,52 @@ class FactorBase(_FactorBase, Generic[VariableValueTuple], abc.ABC, EnforceOverr
         # work for NamedTuple types.
         if type(value_type) is type:
             # Hint is `NamedTuple`
-            tuple_content_types = tuple(get_type_hints(value_type).values())
-            output = value_type(*variable_values)
+            return value_type, tuple(get_type_hints(value_type).values())
         else:
             # Hint is `typing.Tuple` annotation
-            tuple_content_types = get_args(value_type)
-            output = cast(VariableValueTuple, variable_values)
+            return None, get_args(value_type)
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _validate_value_types(cls, value_types: Tuple[type, ...]) -> None:
+        """Check a tuple of variable value types against type hints. Cached, so each
+        combination of types is only validated once per factor class; failures are
+        not cached."""
+        _, tuple_content_types = cls._get_value_tuple_info()
 
         # Handle Ellipsis in type hints, eg `Tuple[SomeType, ...]`
         if len(tuple_content_types) == 2 and tuple_content_types[1] is Ellipsis:
-            tuple_content_types = tuple_content_types[0:1] * len(variable_values)
+            tuple_content_types = tuple_content_types[0:1] * len(value_types)
 
         # Validate expected and received types
-        assert len(variable_values) == len(tuple_content_types)
-        for i, (value, expected_type) in enumerate(
-            zip(variable_values, tuple_content_types)
+        assert len(value_types) == len(tuple_content_types)
+        for i, (value_type, expected_type) in enumerate(
+            zip(value_types, tuple_content_types)
         ):
-            assert isinstance(value, expected_type), (
+            assert issubclass(value_type, expected_type), (
                 f"Variable value type hint inconsistency: expected {expected_type} at, "
-                f"position {i} but got {type(value)}."
+                f"position {i} but got {value_type}."
             )
 
-        return output
+    @final
+    def build_variable_value_tuple(
+        self, variable_values: Tuple[hints.VariableValue, ...]
+    ) -> VariableValueTuple:
+        """Prepares and validates a raw tuple of variable values to be passed into
+        `compute_residual_vector` or `compute_residual_jacobians`.
+
+        Checks the type hinting on `compute_residual_vector` and if the user expects a
+        named tuple, we wrap the input accordingly. Otherwise, we just cast and return
+        the input. Type hints are only inspected once per factor class."""
+
+        assert isinstance(variable_values, tuple)
+
+        value_tuple_constructor, _ = self._get_value_tuple_info()
+        self._validate_value_types(tuple(type(value) for value in variable_values))
+
+        if value_tuple_constructor is None:
+            return cast(VariableValueTuple, variable_values)
+        return value_tuple_constructor(*variable_values)
 
     @final
     def anonymize_variables(self: FactorType) -> FactorType:
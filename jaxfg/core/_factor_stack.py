@@ -1,4 +1,16 @@
-from typing import Generic, List, Sequence, Tuple, Type, TypeVar
+import dataclasses
+import functools
+from typing import (
+    Callable,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    get_type_hints,
+)
 
 import jax
 import jax_dataclasses as jdc
@@ -6,13 +18,172 @@ import numpy as onp
 from jax import numpy as jnp
 
 from .. import hints, sparse
-from ._factor_base import FactorBase
+from ._factor_base import FactorBase, JacobianMode
 from ._variable_assignments import StorageLayout, VariableAssignments
 from ._variables import VariableBase
 
 FactorType = TypeVar("FactorType", bound=FactorBase)
 
 
+@dataclasses.dataclass(frozen=True)
+class FactorBatch(Generic[FactorType]):
+    """A batch of factors of the same type, with parameters already stacked. Can be
+    passed to `StackedFactorGraph.make()` alongside individual factors; this skips the
+    per-factor overhead of grouping and stacking, which dominates graph construction
+    time for large problems.
+
+    Note that this is a vanilla dataclass -- not a PyTree."""
+
+    factor: FactorType
+    """Factor with each parameter stacked along a leading batch axis, except for fields
+    in `shared_fields`. Only the types of `factor.variables` are used."""
+
+    variables: Tuple[Sequence[VariableBase], ...]
+    """Variables connected to each factor in the batch. One sequence per variable
+    slot, each of length `num_factors`."""
+
+    shared_fields: Tuple[str, ...] = ()
+    """Names of fields of `factor` that are shared by every factor in the batch, for
+    example `("noise_model",)`. These are stored once, without a batch axis, and
+    broadcast during vectorized computations."""
+
+    def __post_init__(self):
+        assert len(self.variables) == len(self.factor.variables)
+        for slot_variables, slot_variable in zip(self.variables, self.factor.variables):
+            assert len(slot_variables) == self.num_factors
+            assert all(
+                type(v) is type(slot_variable) for v in slot_variables
+            ), "Variable types of stacked factors must match"
+        for name in self.shared_fields:
+            assert name in _get_shareable_field_names(
+                self.factor
+            ), f"{name} is not a shareable field of {type(self.factor).__name__}"
+
+    @property
+    def num_factors(self) -> int:
+        return len(self.variables[0])
+
+    @staticmethod
+    def make(
+        factors: Sequence[FactorType], use_onp: bool = True
+    ) -> "FactorBatch[FactorType]":
+        """Stack a sequence of individual factors. Fields holding the same object for
+        every factor, like shared noise models, are stored once.
+
+        Sharing is decided by object identity rather than by comparing values, so the
+        structure of the resulting stack doesn't depend on measurement data."""
+
+        # For one-off computations, onp has much less overhead than jnp.
+        jnp = onp if use_onp else globals()["jnp"]
+
+        # Fields holding the same object for every factor don't need to be stacked.
+        shared_fields = tuple(
+            name
+            for name in _get_shareable_field_names(factors[0])
+            if all(
+                getattr(factor, name) is getattr(factors[0], name) for factor in factors
+            )
+        )
+
+        # Stack factors in our group, field by field.
+        # This requires that the treedefs of each factor match, which won't be
+        # the case when factors are connected to different variables!
+        field_names = _get_field_names(type(factors[0]))
+        if field_names is None:
+            stacked_factor: FactorType = jdc.replace(
+                jax.tree_map(
+                    lambda *arrays: jnp.stack(arrays, axis=0),
+                    *map(FactorBase.anonymize_variables, factors),  # type: ignore
+                    # > https://github.com/python/mypy/issues/1317
+                ),
+                **{name: getattr(factors[0], name) for name in shared_fields},
+            )
+        else:
+            stacked_factor = jdc.replace(
+                factors[0].anonymize_variables(),
+                **{
+                    name: jax.tree_map(
+                        lambda *arrays: jnp.stack(arrays, axis=0),
+                        *[getattr(factor, name) for factor in factors],
+                    )
+                    for name in field_names[0]
+                    if name not in shared_fields
+                },
+            )
+
+        return FactorBatch(
+            factor=stacked_factor,
+            variables=tuple(
+                [factor.variables[i] for factor in factors]
+                for i in range(len(stacked_factor.variables))
+            ),
+            shared_fields=shared_fields,
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _get_field_names(
+    dataclass_type: type,
+) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+    """Names of the child and static fields of a pytree dataclass type, excluding
+    `variables`. Follows `jdc.pytree_dataclass()`: fields are static if annotated with
+    `jdc.Static[]` or created with `jdc.static_field()`. Returns `None` if type hints
+    can't be resolved."""
+    static_markers = getattr(jdc.Static, "__metadata__", ())
+    try:
+        type_from_name = get_type_hints(dataclass_type, include_extras=True)
+    except NameError:
+        return None
+
+    child_field_names: List[str] = []
+    static_field_names: List[str] = []
+    for field in dataclasses.fields(dataclass_type):
+        if not field.init or field.name == "variables":
+            continue
+        if any(
+            marker in getattr(type_from_name[field.name], "__metadata__", ())
+            or field.metadata.get(marker, False)
+            for marker in static_markers
+        ):
+            static_field_names.append(field.name)
+        else:
+            child_field_names.append(field.name)
+    return tuple(child_field_names), tuple(static_field_names)
+
+
+def _get_shareable_field_names(factor: FactorBase) -> Tuple[str, ...]:
+    """Names of factor fields that can be shared across a batch: fields containing
+    only array leaves. Excludes `variables` and other static fields."""
+    return tuple(
+        field.name
+        for field in dataclasses.fields(factor)
+        if len(jax.tree_leaves(getattr(factor, field.name))) > 0
+        and all(
+            hasattr(leaf, "shape")
+            for leaf in jax.tree_leaves(getattr(factor, field.name))
+        )
+    )
+
+
+def _compute_storage_indices(
+    variables: Sequence[VariableBase], storage_layout: StorageLayout
+) -> onp.ndarray:
+    """Get storage indices of a sequence of variables of the same type. Output shape
+    should be `(N, parameter_dim)`, or `(N, local parameter dim)` for local layouts."""
+    variable_type: Type[VariableBase] = type(variables[0])
+    dim = (
+        variable_type.get_local_parameter_dim()
+        if storage_layout.local_flag
+        else variable_type.get_parameter_dim()
+    )
+    start_indices = onp.fromiter(
+        map(storage_layout.index_from_variable.__getitem__, variables),
+        dtype=onp.int64,
+        count=len(variables),
+    )
+    return start_indices[:, None] + onp.arange(dim)[None, :]
+
+
 @jdc.pytree_dataclass
 class FactorStack(Generic[FactorType]):
     """A set of factors, with their parameters stacked."""
@@ -26,6 +197,10 @@ class FactorStack(Generic[FactorType]):
     storage_layout: jdc.Static[StorageLayout]
     """The layout used to compute the value indices."""
 
+    shared_fields: jdc.Static[Tuple[str, ...]] = ()
+    """Fields of `factor` that are shared by all factors in the stack, and stored
+    without a leading batch axis. See `FactorBatch.shared_fields`."""
+
     def __post_init__(self):
         # There should be one set of indices for each variable type.
         assert len(self.value_indices) == len(self.factor.variables)
@@ -47,44 +222,25 @@ class FactorStack(Generic[FactorType]):
         use_onp: bool,
     ) -> "FactorStack[FactorType]":
         """Make a stacked factor."""
-
-        # For one-off computations, onp has much less overhead than jnp.
-        jnp = onp if use_onp else globals()["jnp"]
-
-        # Stack factors in our group.
-        # This requires that the treedefs of each factor match, which won't be
-        # the case when factors are connected to different variables!
-        stacked_factor: FactorType = jax.tree_map(
-            lambda *arrays: jnp.stack(arrays, axis=0),
-            *map(FactorBase.anonymize_variables, factors),  # type: ignore
-            # > https://github.com/python/mypy/issues/1317
-        )
-
-        # Get indices for each variable of each factor.
-        value_indices_list: Tuple[List[onp.ndarray], ...] = tuple(
-            [] for _ in range(len(stacked_factor.variables))
-        )
-        for factor in factors:
-            for i, variable in enumerate(factor.variables):
-                assert isinstance(
-                    variable, type(factors[0].variables[i])
-                ), "Variable types of stacked factors must match"
-                storage_pos = storage_layout.index_from_variable[variable]
-                value_indices_list[i].append(
-                    onp.arange(storage_pos, storage_pos + variable.get_parameter_dim())
-                )
-
-        # Stack: end result should be Tuple[array of shape (N, parameter_dim), ...].
-        value_indices_stacked: Tuple[onp.ndarray, ...] = tuple(
-            onp.array(indices) for indices in value_indices_list
+        return FactorStack.make_from_batch(
+            FactorBatch.make(factors, use_onp=use_onp), storage_layout
         )
 
-        # Record values.
+    @staticmethod
+    def make_from_batch(
+        batch: "FactorBatch[FactorType]",
+        storage_layout: StorageLayout,
+    ) -> "FactorStack[FactorType]":
+        """Make a stacked factor from a batch of factors with pre-stacked parameters."""
         return FactorStack(
-            num_factors=len(factors),
-            factor=stacked_factor,
-            value_indices=value_indices_stacked,
+            num_factors=batch.num_factors,
+            factor=batch.factor.anonymize_variables(),
+            value_indices=tuple(
+                _compute_storage_indices(variables, storage_layout)
+                for variables in batch.variables
+            ),
             storage_layout=storage_layout,
+            shared_fields=batch.shared_fields,
         )
 
     @staticmethod
@@ -95,59 +251,70 @@ class FactorStack(Generic[FactorType]):
     ) -> List[sparse.SparseCooCoordinates]:
         """Computes Jacobian coordinates for a factor stack. One array of indices per
         variable."""
-
-        variable_types: List[Type[VariableBase]] = [
-            type(v) for v in factors[0].variables
-        ]
-
-        # Get indices for each variable.
-        local_value_indices_list: Tuple[List[onp.ndarray], ...] = tuple(
-            [] for _ in range(len(variable_types))
+        return FactorStack.compute_jacobian_coords_from_batch(
+            FactorBatch.make(factors, use_onp=True), local_storage_layout, row_offset
         )
-        for factor in factors:
-            for i, variable in enumerate(factor.variables):
-                # Record local parameterization indices.
-                storage_pos = local_storage_layout.index_from_variable[variable]
-                local_value_indices_list[i].append(
-                    onp.arange(
-                        storage_pos,
-                        storage_pos + variable.get_local_parameter_dim(),
-                    )
-                )
 
-        # Stack: end result should be Tuple[array of shape (N, parameter_dim), ...].
-        local_value_indices_stacked: Tuple[onp.ndarray, ...] = tuple(
-            onp.array(indices) for indices in local_value_indices_list
-        )
+    @staticmethod
+    def compute_jacobian_coords_from_batch(
+        batch: "FactorBatch[FactorType]",
+        local_storage_layout: StorageLayout,
+        row_offset: int,
+    ) -> List[sparse.SparseCooCoordinates]:
+        """Computes Jacobian coordinates for a batch of factors. One array of indices
+        per variable. Blocks for variables that are missing from the local storage
+        layout (constants) are omitted; see `compute_jacobian_factor_indices()`."""
 
         # Get residual indices.
-        num_factors = len(factors)
-        residual_dim = factors[0].get_residual_dim()
+        num_factors = batch.num_factors
+        residual_dim = batch.factor.get_residual_dim()
         residual_indices = onp.arange(num_factors * residual_dim).reshape(
             (num_factors, residual_dim)
         )
 
         # Get Jacobian coordinates.
         jacobian_coords: List[sparse.SparseCooCoordinates] = []
-        for variable_index, variable_type in enumerate(variable_types):
-            variable_dim = variable_type.get_local_parameter_dim()
+        for variables, factor_indices in zip(
+            batch.variables,
+            FactorStack.compute_jacobian_factor_indices(batch, local_storage_layout),
+        ):
+            if factor_indices is not None:
+                variables = [variables[i] for i in factor_indices]
+                slot_residual_indices = residual_indices[factor_indices]
+            else:
+                slot_residual_indices = residual_indices
+            num_blocks = len(variables)
+            if num_blocks == 0:
+                jacobian_coords.append(
+                    sparse.SparseCooCoordinates(
+                        rows=onp.zeros(0, dtype=onp.int64),
+                        cols=onp.zeros(0, dtype=onp.int64),
+                    )
+                )
+                continue
+
+            # Local parameterization indices: shape should be (N, local parameter dim).
+            local_value_indices = _compute_storage_indices(
+                variables, local_storage_layout
+            )
+            variable_dim = local_value_indices.shape[-1]
 
             coords = onp.stack(
                 (
                     # Row indices.
                     onp.broadcast_to(
-                        residual_indices[:, :, None],
-                        (num_factors, residual_dim, variable_dim),
+                        slot_residual_indices[:, :, None],
+                        (num_blocks, residual_dim, variable_dim),
                     )
                     + row_offset,
                     # Column indices.
                     onp.broadcast_to(
-                        local_value_indices_stacked[variable_index][:, None, :],
-                        (num_factors, residual_dim, variable_dim),
+                        local_value_indices[:, None, :],
+                        (num_blocks, residual_dim, variable_dim),
                     ),
                 ),
                 axis=-1,
-            ).reshape((num_factors * residual_dim * variable_dim, 2))
+            ).reshape((num_blocks * residual_dim * variable_dim, 2))
 
             jacobian_coords.append(
                 sparse.SparseCooCoordinates(
@@ -158,9 +325,73 @@ class FactorStack(Generic[FactorType]):
 
         return jacobian_coords
 
+    @staticmethod
+    def compute_jacobian_factor_indices(
+        batch: "FactorBatch[FactorType]",
+        local_storage_layout: StorageLayout,
+    ) -> Tuple[Optional[onp.ndarray], ...]:
+        """Determine which Jacobian blocks of a batch of factors are kept. One entry per
+        variable slot: indices of the factors whose variable in that slot is present
+        in the local storage layout, or `None` if every variable is."""
+        factor_indices: List[Optional[onp.ndarray]] = []
+        for variables in batch.variables:
+            mask = onp.fromiter(
+                map(local_storage_layout.index_from_variable.__contains__, variables),
+                dtype=bool,
+                count=len(variables),
+            )
+            factor_indices.append(None if mask.all() else onp.flatnonzero(mask))
+        return tuple(factor_indices)
+
     def get_residual_dim(self) -> int:
         return self.factor.get_residual_dim() * self.num_factors
 
+    def get_factor_axes(self) -> FactorType:
+        """Batch axes of `factor`, for use as `in_axes` in `jax.vmap()`: `0` for
+        stacked fields, and `None` for shared fields."""
+        return jdc.replace(
+            self.factor,
+            **{
+                name: None if name in self.shared_fields else 0
+                for name in _get_shareable_field_names(self.factor)
+            },
+        )
+
+    def get_unshared_factor(self) -> FactorType:
+        """Returns `factor` with shared fields broadcast along a leading batch axis, so
+        that every field has one entry per factor."""
+        return jdc.replace(
+            self.factor,
+            **{
+                name: jax.tree_map(
+                    lambda leaf: jnp.broadcast_to(
+                        leaf, (self.num_factors,) + leaf.shape
+                    ),
+                    getattr(self.factor, name),
+                )
+                for name in self.shared_fields
+            },
+        )
+
+    def whiten_residual_vector(self, residual_vector: jnp.ndarray) -> jnp.ndarray:
+        """Whiten stacked residual vectors with our noise model."""
+        noise_model = self.factor.noise_model
+        return jax.vmap(
+            type(noise_model).whiten_residual_vector,
+            in_axes=(self.get_factor_axes().noise_model, 0),
+        )(noise_model, residual_vector)
+
+    def whiten_jacobian(
+        self, jacobian: jnp.ndarray, residual_vector: jnp.ndarray
+    ) -> jnp.ndarray:
+        """Whiten stacked Jacobian matrices with our noise model. Residual vectors
+        should be whitened."""
+        noise_model = self.factor.noise_model
+        return jax.vmap(
+            type(noise_model).whiten_jacobian,
+            in_axes=(self.get_factor_axes().noise_model, 0, 0),
+        )(noise_model, jacobian, residual_vector)
+
     def compute_residual_vector(self, assignments: VariableAssignments) -> jnp.ndarray:
         """Compute stacked residual vectors.
 
@@ -177,7 +408,10 @@ class FactorStack(Generic[FactorType]):
 
         # Vectorized residual computation.
         # The type of `values_stacked` should match `FactorVariableValues`.
-        residual_vector = jax.vmap(type(self.factor).compute_residual_vector)(
+        residual_vector = jax.vmap(
+            type(self.factor).compute_residual_vector,
+            in_axes=(self.get_factor_axes(), 0),
+        )(
             self.factor,
             self.factor.build_variable_value_tuple(values_stacked),
         )
@@ -202,8 +436,96 @@ class FactorStack(Generic[FactorType]):
 
         # Compute Jacobians wrt local parameterizations.
         # The type of `values_stacked` should match `FactorVariableValues`.
-        jacobians = jax.vmap(type(self.factor).compute_residual_jacobians)(
+        jacobians = jax.vmap(
+            type(self.factor).compute_residual_jacobians,
+            in_axes=(self.get_factor_axes(), 0),
+        )(
             self.factor,
             self.factor.build_variable_value_tuple(values_stacked),
         )
         return jacobians
+
+    def compute_residual_vector_and_jacobian(
+        self,
+        assignments: VariableAssignments,
+    ) -> Tuple[jnp.ndarray, Tuple[jnp.ndarray, ...]]:
+        """Compute stacked residual vectors and Jacobian matrices in one pass. See
+        `compute_residual_vector()` and `compute_residual_jacobian()` for shapes."""
+        residual_vector, compute_jacobians = self.linearize(assignments)
+        return residual_vector, compute_jacobians()
+
+    def linearize(
+        self,
+        assignments: VariableAssignments,
+    ) -> Tuple[jnp.ndarray, Callable[[], Tuple[jnp.ndarray, ...]]]:
+        """Compute stacked residual vectors, and a function that computes Jacobians at
+        the same assignments. Jacobians are only computed when the function is called,
+        which can be deferred to a branch of `jax.lax.cond()`. For autodiff Jacobians,
+        intermediate values from the residual computation are reused instead of
+        recomputed.
+
+        See `compute_residual_vector()` and `compute_residual_jacobian()` for shapes.
+        """
+
+        assert assignments.storage_layout == self.storage_layout
+
+        # Stack inputs to our factors.
+        # The type of `values_stacked` should match `FactorVariableValues`.
+        values_stacked = self.factor.build_variable_value_tuple(
+            tuple(
+                jax.vmap(variable.unflatten)(assignments.storage[indices])
+                for indices, variable in zip(self.value_indices, self.factor.variables)
+            )
+        )
+        factor_type = type(self.factor)
+        factor_axes = self.get_factor_axes()
+
+        def compute_residual_vector(values_stacked: hints.Pytree) -> jnp.ndarray:
+            return jax.vmap(
+                factor_type.compute_residual_vector, in_axes=(factor_axes, 0)
+            )(self.factor, values_stacked)
+
+        # Analytical Jacobians.
+        if (
+            factor_type.compute_residual_jacobians
+            is not FactorBase.compute_residual_jacobians
+        ):
+            return compute_residual_vector(values_stacked), lambda: jax.vmap(
+                factor_type.compute_residual_jacobians, in_axes=(factor_axes, 0)
+            )(self.factor, values_stacked)
+
+        # Autodiff Jacobians. Factors are evaluated independently, so basis vectors
+        # can be pushed through all factors in the stack at once. This matches
+        # `FactorBase._linearize_in_local_coordinates()`, with a batch axis.
+        if self.factor.get_jacobian_mode() is JacobianMode.REVERSE:
+            residual_vector, residual_vjp = jax.vjp(
+                compute_residual_vector, values_stacked
+            )
+
+            def compute_jacobians() -> Tuple[jnp.ndarray, ...]:
+                residual_dim = residual_vector.shape[-1]
+                (cotangents,) = jax.vmap(residual_vjp)(
+                    jnp.broadcast_to(
+                        jnp.eye(residual_dim, dtype=residual_vector.dtype)[:, None, :],
+                        (residual_dim,) + residual_vector.shape,
+                    )
+                )
+                return jax.vmap(
+                    factor_type._compose_local_jacobians,
+                    in_axes=(factor_axes, 0, 1),
+                )(self.factor, values_stacked, cotangents)
+
+        else:
+            residual_vector, residual_jvp = jax.linearize(
+                compute_residual_vector, values_stacked
+            )
+
+            def compute_jacobians() -> Tuple[jnp.ndarray, ...]:
+                tangents = jax.vmap(
+                    factor_type._get_local_tangents, in_axes=(factor_axes, 0)
+                )(self.factor, values_stacked)
+                return self.factor._split_local_jacobian(
+                    jax.vmap(residual_jvp, in_axes=1, out_axes=-1)(tangents)
+                )
+
+        return residual_vector, compute_jacobians
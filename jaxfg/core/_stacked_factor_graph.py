@@ -1,5 +1,25 @@
+import dataclasses
+import hashlib
+import itertools
+import operator
 from collections import defaultdict
-from typing import Collection, DefaultDict, Dict, Hashable, Iterable, List, Tuple, cast
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    DefaultDict,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
 import jax
 import jax_dataclasses as jdc
@@ -8,14 +28,25 @@ from jax import numpy as jnp
 
 from .. import hints, noises, sparse
 from ..solvers import GaussNewtonSolver, NonlinearSolverBase
+from ._compiled_solver import CompiledSolver
+from ._diagnostics import (
+    FactorStackDiagnostics,
+    ResourceEstimate,
+    compute_block_sparsity,
+    compute_jacobian_nnz,
+    estimate_cholesky_factor_nnz,
+    measure_evaluation_seconds,
+)
 from ._factor_base import FactorBase
-from ._factor_stack import FactorStack
+from ._factor_stack import FactorBatch, FactorStack, _get_field_names
 from ._variable_assignments import StorageLayout, VariableAssignments
 from ._variables import VariableBase
 
 # Key for determining which factors are grouped for stacking
 GroupKey = Hashable
 
+T = TypeVar("T")
+
 
 @jdc.pytree_dataclass
 class StackedFactorGraph:
@@ -26,9 +57,18 @@ class StackedFactorGraph:
 
     factor_stacks: List[FactorStack]
     jacobian_coords: sparse.SparseCooCoordinates
+    jacobian_factor_indices: Tuple[Optional[hints.Array], ...]
+    """For each factor stack and variable slot, indices of the factors whose Jacobian
+    blocks are kept. `None` if all blocks are kept; blocks for constant variables are
+    dropped."""
     storage_layout: jdc.Static[StorageLayout]
     local_storage_layout: jdc.Static[StorageLayout]
+    """Layout of local deltas. Excludes constant variables."""
     residual_dim: jdc.Static[int]
+    factor_mesh: jdc.Static[Optional[jax.sharding.Mesh]] = None
+    """Device mesh for sharded factor evaluation. When set, residual and Jacobian
+    computations are partitioned along the factor axis of each stack. See
+    `shard_factor_evaluation()`."""
 
     # Shape checks break under vmap
     # def __post_init__(self):
@@ -42,70 +82,178 @@ class StackedFactorGraph:
     #             assert value_indices.shape == (N, variable.get_parameter_dim())
 
     def get_variables(self) -> Collection[VariableBase]:
-        return self.local_storage_layout.get_variables()
+        return self.storage_layout.get_variables()
+
+    def _get_jacobian_factor_indices(
+        self, stack_index: int
+    ) -> Tuple[Optional[hints.Array], ...]:
+        """Entries of `jacobian_factor_indices` for one factor stack."""
+        start = sum(
+            len(stacked_factor.factor.variables)
+            for stacked_factor in self.factor_stacks[:stack_index]
+        )
+        return self.jacobian_factor_indices[
+            start : start + len(self.factor_stacks[stack_index].factor.variables)
+        ]
+
+    def shard_factor_evaluation(
+        self, devices: Optional[Sequence[jax.Device]] = None
+    ) -> "StackedFactorGraph":
+        """Returns a copy of this graph with sharded factor evaluation enabled. Residual
+        and Jacobian evaluation for each stack is partitioned across `devices` along
+        the factor axis; variable assignments are replicated to each device, and
+        stacked outputs are gathered before they're returned.
+
+        Only factor evaluation is sharded. The gathered residual vector and Jacobian
+        are replicated, so linear solves, including normal-equation products like
+        `A^T A` and `A^T b`, are repeated on every device. This helps when factor
+        evaluation dominates solve time, and costs an all-gather per linearization
+        otherwise.
+
+        For multi-core CPU machines, multiple host devices can be created by setting
+        `XLA_FLAGS=--xla_force_host_platform_device_count=N` before importing JAX.
+
+        Args:
+            devices: Devices to shard across. Defaults to `jax.devices()`.
+        """
+        if devices is None:
+            devices = jax.devices()
+        return jdc.replace(
+            self,
+            factor_mesh=jax.sharding.Mesh(onp.array(devices), axis_names=("factors",)),
+        )
+
+    def _shard_factor_axis(self, tree: T) -> T:
+        """Constrain the leading (factor) axis of each leaf in a pytree to be sharded
+        across our mesh. No-op if sharding is disabled."""
+        if self.factor_mesh is None:
+            return tree
+        sharding = jax.sharding.NamedSharding(
+            self.factor_mesh, jax.sharding.PartitionSpec("factors")
+        )
+        return jax.tree_map(
+            lambda leaf: jax.lax.with_sharding_constraint(leaf, sharding), tree
+        )
+
+    def _shard_factor_stack(self, stacked_factor: FactorStack) -> FactorStack:
+        """Constrain a factor stack to be sharded along its factor axis. Shared factor
+        fields have no factor axis, so they're replicated instead."""
+        if self.factor_mesh is None:
+            return stacked_factor
+        return jdc.replace(
+            stacked_factor,
+            factor=jax.tree_map(
+                lambda axis, subtree: (
+                    self._replicate(subtree)
+                    if axis is None
+                    else self._shard_factor_axis(subtree)
+                ),
+                stacked_factor.get_factor_axes(),
+                stacked_factor.factor,
+                is_leaf=lambda axis: axis is None,
+            ),
+            value_indices=self._shard_factor_axis(stacked_factor.value_indices),
+        )
+
+    def _replicate(self, tree: T) -> T:
+        """Constrain each leaf in a pytree to be replicated across our mesh. No-op if
+        sharding is disabled."""
+        if self.factor_mesh is None:
+            return tree
+        sharding = jax.sharding.NamedSharding(
+            self.factor_mesh, jax.sharding.PartitionSpec()
+        )
+        return jax.tree_map(
+            lambda leaf: jax.lax.with_sharding_constraint(leaf, sharding), tree
+        )
 
     @staticmethod
     def make(
-        factors: Iterable[FactorBase],
+        factors: Iterable[Union[FactorBase, FactorBatch]],
         use_onp: bool = True,
+        constant_variables: Iterable[VariableBase] = (),
     ) -> "StackedFactorGraph":
-        """Create a factor graph from a set of factors."""
+        """Create a factor graph from a set of factors. For large problems, factors of
+        the same type can also be passed in with parameters pre-stacked, as a
+        `FactorBatch`.
+
+        Variables in `constant_variables` are held fixed during optimization. Their
+        values are kept in `storage_layout`, but they're excluded from
+        `local_storage_layout` and their Jacobian columns are dropped, so linear
+        subproblems only include non-constant variables."""
 
         # Start by grouping our factors and grabbing a list of (ordered!) variables
         factors_from_group: DefaultDict[GroupKey, List[FactorBase]] = defaultdict(list)
+        group_key_cache = _GroupKeyCache()
+        prestacked_batches: List[FactorBatch] = []
         variables_ordered_set: Dict[VariableBase, None] = {}
         for factor in factors:
+            # Pre-stacked factors don't need to be grouped
+            if isinstance(factor, FactorBatch):
+                prestacked_batches.append(factor)
+                variables_ordered_set.update(
+                    dict.fromkeys(itertools.chain.from_iterable(zip(*factor.variables)))
+                )
+                continue
+
             # Each factor is ultimately just a pytree node; in order for a set of
-            # factors to be batchable, they must share the same:
-            group_key: GroupKey = (
-                # (1) Treedef. Note that variables can be different as long as their
-                # types are the same.
-                jax.tree_structure(factor.anonymize_variables()),
-                # (2) Leaf shapes: contained array shapes must match
-                tuple(
-                    leaf.shape if hasattr(leaf, "shape") else ()
-                    for leaf in jax.tree_leaves(factor)
-                ),
-            )
+            # factors to be batchable, their treedefs (up to variable instances) and
+            # leaf shapes must match
+            group_key = _compute_group_key(factor, group_key_cache)
 
             # Record factor and variables
             factors_from_group[group_key].append(factor)
             for v in factor.variables:
                 variables_ordered_set[v] = None
-        variables = list(variables_ordered_set.keys())
+        # Constant variables are stored after all other variables of the same type,
+        # which lets retractions skip them with a slice
+        constant_variables_set = set(constant_variables)
+        variables = [
+            v for v in variables_ordered_set.keys() if v not in constant_variables_set
+        ]
+        local_variables = list(variables)
+        variables.extend(
+            v for v in variables_ordered_set.keys() if v in constant_variables_set
+        )
+
+        # Stack parameters of grouped factors
+        factor_batches: List[FactorBatch] = [
+            FactorBatch.make(group, use_onp=use_onp)
+            for group in factors_from_group.values()
+        ] + prestacked_batches
 
         # Fields we want to populate
         stacked_factors: List[FactorStack] = []
         jacobian_coords: List[sparse.SparseCooCoordinates] = []
+        jacobian_factor_indices: List[Optional[onp.ndarray]] = []
 
         # Create storage layout: this describes which parts of our storage object is
         # allocated to each variable
         storage_layout = StorageLayout.make(variables, local=False)
-        local_storage_layout = StorageLayout.make(variables, local=True)
+        local_storage_layout = StorageLayout.make(local_variables, local=True)
 
         # Prepare each factor group
         residual_offset = 0
-        for group_key, group in factors_from_group.items():
+        for batch in factor_batches:
             # Make factor stack
-            stacked_factors.append(
-                FactorStack.make(
-                    group,
-                    storage_layout,
-                    use_onp=use_onp,
-                )
-            )
+            stacked_factors.append(FactorStack.make_from_batch(batch, storage_layout))
 
             # Compute Jacobian coordinates
             #
             # These should be N pairs of (row, col) indices, where rows correspond to
             # residual indices and columns correspond to local parameter indices
             jacobian_coords.extend(
-                FactorStack.compute_jacobian_coords(
-                    factors=group,
+                FactorStack.compute_jacobian_coords_from_batch(
+                    batch=batch,
                     local_storage_layout=local_storage_layout,
                     row_offset=residual_offset,
                 )
             )
+            jacobian_factor_indices.extend(
+                FactorStack.compute_jacobian_factor_indices(
+                    batch=batch, local_storage_layout=local_storage_layout
+                )
+            )
             residual_offset += stacked_factors[-1].get_residual_dim()
 
         jacobian_coords_concat: sparse.SparseCooCoordinates = jax.tree_map(
@@ -115,11 +263,86 @@ class StackedFactorGraph:
         return StackedFactorGraph(
             factor_stacks=stacked_factors,
             jacobian_coords=jacobian_coords_concat,
+            jacobian_factor_indices=tuple(jacobian_factor_indices),
             storage_layout=storage_layout,
             local_storage_layout=local_storage_layout,
             residual_dim=residual_offset,
         )
 
+    def compute_structure_fingerprint(
+        self, solver: Optional[NonlinearSolverBase] = None
+    ) -> str:
+        """Compute a hash that summarizes everything that affects how graph
+        computations are traced and compiled: factor types, stack sizes, leaf shapes and
+        dtypes, storage layout dimensions, and (optionally) solver configuration.
+
+        Graphs with matching fingerprints will produce identical XLA programs, so this
+        can be used to key a persistent compilation cache or precompiled executables;
+        see `jaxfg.utils.initialize_compilation_cache()`. Unlike `hash()`, fingerprints
+        are stable across processes.
+        """
+
+        def describe_variable_type(variable_type: Type[VariableBase]) -> Tuple:
+            return (
+                variable_type.__module__,
+                variable_type.__qualname__,
+                variable_type.get_parameter_dim(),
+                variable_type.get_local_parameter_dim(),
+            )
+
+        def describe_leaves(tree: hints.Pytree) -> Tuple:
+            return tuple(
+                (onp.shape(leaf), str(onp.result_type(leaf)))
+                for leaf in jax.tree_leaves(tree)
+            )
+
+        description = (
+            tuple(
+                (
+                    # Note that variables are omitted from the treedef, since their
+                    # string representations are not stable across processes.
+                    str(
+                        jax.tree_structure(
+                            jdc.replace(stacked_factor.factor, variables=())
+                        )
+                    ),
+                    tuple(
+                        describe_variable_type(type(v))
+                        for v in stacked_factor.factor.variables
+                    ),
+                    stacked_factor.num_factors,
+                    stacked_factor.shared_fields,
+                    describe_leaves(stacked_factor),
+                )
+                for stacked_factor in self.factor_stacks
+            ),
+            tuple(
+                (
+                    describe_variable_type(variable_type),
+                    self.storage_layout.count_from_variable_type[variable_type],
+                    self.local_storage_layout.index_from_variable_type.get(
+                        variable_type
+                    ),
+                    self.local_storage_layout.count_from_variable_type.get(
+                        variable_type
+                    ),
+                )
+                for variable_type in self.storage_layout.get_variable_types()
+            ),
+            self.storage_layout.dim,
+            self.local_storage_layout.dim,
+            self.residual_dim,
+            describe_leaves(self.jacobian_coords),
+            describe_leaves(self.jacobian_factor_indices),
+            None if self.factor_mesh is None else self.factor_mesh.devices.shape,
+            (
+                None
+                if solver is None
+                else (str(jax.tree_structure(solver)), describe_leaves(solver))
+            ),
+        )
+        return hashlib.sha256(repr(description).encode()).hexdigest()
+
     @jdc.jit
     def compute_whitened_residual_vector(
         self, assignments: VariableAssignments
@@ -135,24 +358,30 @@ class StackedFactorGraph:
 
         # Resolve storage layout mismatches. Factor stack computations will raise an
         # assertion error if the storage layout is incorrect.
-        assignments = assignments.update_storage_layout(self.storage_layout)
+        assignments = self._replicate(
+            assignments.update_storage_layout(self.storage_layout)
+        )
 
         # Flatten and concatenate residuals from all groups.
-        stacked_factor: FactorStack
-        residual_vector = jnp.concatenate(
-            [
-                jax.vmap(
-                    type(stacked_factor.factor.noise_model).whiten_residual_vector
-                )(
-                    stacked_factor.factor.noise_model,
-                    stacked_factor.compute_residual_vector(assignments),
-                ).flatten()
-                for stacked_factor in self.factor_stacks
-            ],
-            axis=0,
-        )
+        residual_vectors: List[jnp.ndarray] = []
+        with jax.named_scope("residuals"):
+            for i, stacked_factor in enumerate(
+                map(self._shard_factor_stack, self.factor_stacks)
+            ):
+                with jax.named_scope(_stack_scope_name(i, stacked_factor)):
+                    stacked_residual_vector = stacked_factor.compute_residual_vector(
+                        assignments
+                    )
+                    with jax.named_scope("whiten"):
+                        stacked_residual_vector = stacked_factor.whiten_residual_vector(
+                            stacked_residual_vector
+                        )
+                residual_vectors.append(
+                    self._shard_factor_axis(stacked_residual_vector).flatten()
+                )
+            residual_vector = jnp.concatenate(residual_vectors, axis=0)
         assert residual_vector.shape == (self.residual_dim,)
-        return residual_vector
+        return self._replicate(residual_vector)
 
     @jdc.jit
     def compute_cost(
@@ -171,6 +400,79 @@ class StackedFactorGraph:
         cost = jnp.sum(residual_vector**2)
         return cost, residual_vector
 
+    @jdc.jit
+    def compute_factor_stack_costs(
+        self, assignments: VariableAssignments
+    ) -> jnp.ndarray:
+        """Compute the sum of squared whitened residuals for each factor stack.
+
+        Args:
+            assignments (VariableAssignments): Variable assignments.
+
+        Returns:
+            jnp.ndarray: Costs. Shape should be `(len(factor_stacks),)`.
+        """
+        residual_vector = self.compute_whitened_residual_vector(assignments)
+        residual_boundaries = onp.cumsum(
+            [0]
+            + [
+                stacked_factor.get_residual_dim()
+                for stacked_factor in self.factor_stacks
+            ]
+        )
+        return jnp.stack(
+            [
+                jnp.sum(residual_vector[start:end] ** 2)
+                for start, end in zip(residual_boundaries[:-1], residual_boundaries[1:])
+            ]
+        )
+
+    def compute_factor_stack_diagnostics(
+        self,
+        assignments: VariableAssignments,
+        measure_time: bool = False,
+        timing_repeats: int = 10,
+    ) -> List[FactorStackDiagnostics]:
+        """Break down cost and problem size by factor stack. Useful for finding which
+        factors dominate a solve; `jaxfg.core.format_factor_stack_diagnostics()` can be
+        used to print results.
+
+        Costs for all stacks are computed in one jitted pass. Optionally, whitened
+        residual and Jacobian evaluation is also timed for each stack individually.
+
+        Args:
+            assignments: Variable assignments.
+            measure_time: Whether to measure evaluation time for each stack.
+            timing_repeats: Number of timed evaluations per stack, after warm-up.
+        """
+        costs = onp.asarray(self.compute_factor_stack_costs(assignments))
+        total_cost = float(onp.sum(costs))
+
+        if measure_time:
+            assignments = assignments.update_storage_layout(self.storage_layout)
+
+        return [
+            FactorStackDiagnostics(
+                index=i,
+                factor_type=type(stacked_factor.factor),
+                num_factors=stacked_factor.num_factors,
+                residual_dim=stacked_factor.get_residual_dim(),
+                jacobian_nnz=compute_jacobian_nnz(
+                    stacked_factor, self._get_jacobian_factor_indices(i)
+                ),
+                cost=float(costs[i]),
+                cost_fraction=float(costs[i]) / total_cost if total_cost > 0.0 else 0.0,
+                evaluation_seconds=(
+                    measure_evaluation_seconds(
+                        stacked_factor, assignments, repeats=timing_repeats
+                    )
+                    if measure_time
+                    else None
+                ),
+            )
+            for i, stacked_factor in enumerate(self.factor_stacks)
+        ]
+
     @jdc.jit
     def compute_joint_nll(
         self,
@@ -218,7 +520,11 @@ class StackedFactorGraph:
                 )
             else:
                 assert False, f"Joint NLL not supported  for {type(noise_model)}"
-            assert cov_determinants.shape == (stacked_factor.num_factors,)
+
+            # Shared noise models have a single determinant.
+            cov_determinants = jnp.broadcast_to(
+                cov_determinants, (stacked_factor.num_factors,)
+            )
 
             joint_nll = joint_nll + jnp.sum(cov_determinants)
 
@@ -236,43 +542,295 @@ class StackedFactorGraph:
 
         # Resolve storage layout mismatches. Factor stack computations will raise an
         # assertion error if the storage layout is incorrect.
-        assignments = assignments.update_storage_layout(self.storage_layout)
+        assignments = self._replicate(
+            assignments.update_storage_layout(self.storage_layout)
+        )
 
         # Linearize factors by group.
         A_values_list: List[jnp.ndarray] = []
         residual_start = 0
         residual_end = 0
-        for stacked_factor in self.factor_stacks:
-            residual_end = residual_start + stacked_factor.get_residual_dim()
-            stacked_residual_vector = residual_vector[
-                residual_start:residual_end
-            ].reshape(
-                (
-                    stacked_factor.num_factors,
-                    stacked_factor.factor.get_residual_dim(),
+        with jax.named_scope("jacobians"):
+            for i, stacked_factor in enumerate(
+                map(self._shard_factor_stack, self.factor_stacks)
+            ):
+                residual_end = residual_start + stacked_factor.get_residual_dim()
+                stacked_residual_vector = self._shard_factor_axis(
+                    residual_vector[residual_start:residual_end].reshape(
+                        (
+                            stacked_factor.num_factors,
+                            stacked_factor.factor.get_residual_dim(),
+                        )
+                    )
                 )
-            )
 
-            # Compute all Jacobians and whiten.
-            for jacobian in stacked_factor.compute_residual_jacobian(assignments):
-                A_values_list.append(
-                    jax.vmap(type(stacked_factor.factor.noise_model).whiten_jacobian)(
-                        stacked_factor.factor.noise_model,
-                        jacobian,
-                        residual_vector=stacked_residual_vector,
+                # Compute all Jacobians and whiten.
+                with jax.named_scope(_stack_scope_name(i, stacked_factor)):
+                    jacobians = stacked_factor.compute_residual_jacobian(assignments)
+                    A_values_list.extend(
+                        self._whiten_jacobians(
+                            stacked_factor, jacobians, stacked_residual_vector
+                        )
                     )
-                )
-            residual_start = residual_end
+                residual_start = residual_end
         assert residual_end != 0
         assert residual_end == self.residual_dim
 
-        # Build Jacobian.
-        A = sparse.SparseCooMatrix(
-            values=jnp.concatenate([A.flatten() for A in A_values_list]),
-            coords=self.jacobian_coords,
-            shape=(self.residual_dim, self.local_storage_layout.dim),
+        return self._assemble_jacobian(A_values_list)
+
+    @jdc.jit
+    def compute_whitened_residual_and_jacobian(
+        self, assignments: VariableAssignments
+    ) -> Tuple[jnp.ndarray, sparse.SparseCooMatrix]:
+        """Compute the whitened residual vector and its Jacobian with respect to the
+        stacked local delta vectors, in a single pass over each factor stack. Cheaper
+        than calling `compute_whitened_residual_vector()` and
+        `compute_whitened_residual_jacobian()` separately, which evaluates residuals
+        twice.
+
+        Args:
+            assignments (VariableAssignments): Variable assignments.
+
+        Returns:
+            Tuple[jnp.ndarray, sparse.SparseCooMatrix]: Residual vector, Jacobian.
+        """
+
+        residual_vector, compute_jacobian = self.linearize(assignments)
+        return residual_vector, compute_jacobian()
+
+    def linearize(
+        self, assignments: VariableAssignments
+    ) -> Tuple[jnp.ndarray, Callable[[], sparse.SparseCooMatrix]]:
+        """Compute the whitened residual vector, and a function that computes its
+        Jacobian with respect to the stacked local delta vectors at the same
+        assignments.
+
+        Useful for solvers that only need some Jacobians, like those of accepted steps:
+        the function can be called in a branch of `jax.lax.cond()`, and reuses values
+        from the residual computation. Unlike `compute_whitened_residual_and_jacobian()`,
+        this isn't jitted, and should be called from traced code.
+
+        Args:
+            assignments (VariableAssignments): Variable assignments.
+
+        Returns:
+            Tuple[jnp.ndarray, Callable[[], sparse.SparseCooMatrix]]: Residual vector,
+            function that computes the Jacobian.
+        """
+
+        # Resolve storage layout mismatches. Factor stack computations will raise an
+        # assertion error if the storage layout is incorrect.
+        assignments = self._replicate(
+            assignments.update_storage_layout(self.storage_layout)
+        )
+
+        stacked_residual_vectors, compute_A_values_list = self._linearize_factor_stacks(
+            assignments
+        )
+        with jax.named_scope("linearize"):
+            residual_vector = jnp.concatenate(
+                [
+                    stacked_residual_vector.flatten()
+                    for stacked_residual_vector in stacked_residual_vectors
+                ],
+                axis=0,
+            )
+        assert residual_vector.shape == (self.residual_dim,)
+
+        return self._replicate(residual_vector), lambda: self._assemble_jacobian(
+            compute_A_values_list()
+        )
+
+    def _linearize_factor_stacks(
+        self, assignments: VariableAssignments
+    ) -> Tuple[List[jnp.ndarray], Callable[[], List[jnp.ndarray]]]:
+        """Compute whitened residuals for each factor stack, and a function that
+        computes whitened Jacobians, before they're gathered. When sharded, outputs are
+        partitioned along the factor axis.
+
+        Returns:
+            Tuple[List[jnp.ndarray], Callable[[], List[jnp.ndarray]]]: Stacked residual
+            vectors, one per factor stack, and a function that computes stacked
+            Jacobians, one per factor stack and variable slot.
+        """
+        stacked_factors = list(map(self._shard_factor_stack, self.factor_stacks))
+        stacked_residual_vectors: List[jnp.ndarray] = []
+        compute_jacobians_list: List[Callable[[], Tuple[jnp.ndarray, ...]]] = []
+        with jax.named_scope("linearize"):
+            for i, stacked_factor in enumerate(stacked_factors):
+                with jax.named_scope(_stack_scope_name(i, stacked_factor)):
+                    (
+                        stacked_residual_vector,
+                        compute_jacobians,
+                    ) = stacked_factor.linearize(assignments)
+                    with jax.named_scope("whiten"):
+                        stacked_residual_vector = self._shard_factor_axis(
+                            stacked_factor.whiten_residual_vector(
+                                stacked_residual_vector
+                            )
+                        )
+                stacked_residual_vectors.append(stacked_residual_vector)
+                compute_jacobians_list.append(compute_jacobians)
+
+        def compute_A_values_list() -> List[jnp.ndarray]:
+            A_values_list: List[jnp.ndarray] = []
+            with jax.named_scope("linearize"):
+                for i, (
+                    stacked_factor,
+                    stacked_residual_vector,
+                    compute_jacobians,
+                ) in enumerate(
+                    zip(
+                        stacked_factors,
+                        stacked_residual_vectors,
+                        compute_jacobians_list,
+                    )
+                ):
+                    with jax.named_scope(_stack_scope_name(i, stacked_factor)):
+                        A_values_list.extend(
+                            self._whiten_jacobians(
+                                stacked_factor,
+                                compute_jacobians(),
+                                stacked_residual_vector,
+                            )
+                        )
+            return A_values_list
+
+        return stacked_residual_vectors, compute_A_values_list
+
+    def _whiten_jacobians(
+        self,
+        stacked_factor: FactorStack,
+        jacobians: Tuple[jnp.ndarray, ...],
+        stacked_residual_vector: jnp.ndarray,
+    ) -> List[jnp.ndarray]:
+        """Whiten stacked Jacobians for one factor stack."""
+        with jax.named_scope("whiten"):
+            return [
+                self._shard_factor_axis(
+                    stacked_factor.whiten_jacobian(jacobian, stacked_residual_vector)
+                )
+                for jacobian in jacobians
+            ]
+
+    def _assemble_jacobian(
+        self, A_values_list: List[jnp.ndarray]
+    ) -> sparse.SparseCooMatrix:
+        """Build a sparse Jacobian from whitened Jacobians, one array per factor stack
+        and variable slot. Blocks for constant variables are dropped."""
+        assert len(A_values_list) == len(self.jacobian_factor_indices)
+        with jax.named_scope("assemble_jacobian"):
+            return sparse.SparseCooMatrix(
+                values=self._replicate(
+                    jnp.concatenate(
+                        [
+                            (
+                                A if factor_indices is None else A[factor_indices]
+                            ).flatten()
+                            for A, factor_indices in zip(
+                                A_values_list, self.jacobian_factor_indices
+                            )
+                        ]
+                    )
+                ),
+                coords=self.jacobian_coords,
+                shape=(self.residual_dim, self.local_storage_layout.dim),
+            )
+
+    def estimate_resources(
+        self, solver: NonlinearSolverBase = GaussNewtonSolver()
+    ) -> ResourceEstimate:
+        """Estimate the cost of solving this graph, without running a solve. Useful for
+        choosing a linear solver or rejecting problems that won't fit in memory.
+
+        Sparsity statistics are computed on the host from `jacobian_coords` and the
+        storage layouts. Memory and FLOP counts come from XLA: the Jacobian computation
+        and a single solver step are lowered and compiled, but not executed.
+
+        Args:
+            solver: Solver to analyze steps for.
+        """
+        # Sparsity of A, A^T A, and the Cholesky factor of A^T A.
+        jacobian_nnz = len(self.jacobian_coords.rows)
+        pattern, dims = compute_block_sparsity(
+            self.jacobian_coords, self.local_storage_layout
+        )
+        pattern_coo = pattern.tocoo()
+        block_nnz = dims[pattern_coo.row] * dims[pattern_coo.col]
+        normal_matrix_nnz = int(onp.sum(block_nnz))
+        normal_matrix_lower_nnz = int(
+            onp.sum(block_nnz[pattern_coo.row > pattern_coo.col])
+            + onp.sum(dims * (dims + 1) // 2)
+        )
+        cholesky_factor_nnz = estimate_cholesky_factor_nnz(pattern, dims)
+
+        # Lower and compile, but don't run.
+        dtype = jnp.zeros(0).dtype  # Default float dtype
+        assignments = VariableAssignments(
+            storage=jax.ShapeDtypeStruct((self.storage_layout.dim,), dtype),
+            storage_layout=self.storage_layout,
+        )
+        residual_vector = jax.ShapeDtypeStruct((self.residual_dim,), dtype)
+        jacobian_memory = (
+            jax.jit(type(self).compute_whitened_residual_jacobian)
+            .lower(self, assignments, residual_vector)
+            .compile()
+            .memory_analysis()
+        )
+        if jacobian_memory is not None and jacobian_memory.argument_size_in_bytes > 0:
+            jacobian_peak_bytes = (
+                jacobian_memory.argument_size_in_bytes
+                + jacobian_memory.output_size_in_bytes
+                + jacobian_memory.temp_size_in_bytes
+                - jacobian_memory.alias_size_in_bytes
+            )
+        else:
+            # Memory statistics aren't reported by all backends. Fall back to
+            # argument and output sizes.
+            jacobian_peak_bytes = sum(
+                onp.prod(leaf.shape, dtype=onp.int64) * onp.dtype(leaf.dtype).itemsize
+                for leaf in jax.tree_leaves(
+                    (
+                        self,
+                        assignments,
+                        residual_vector,
+                        jax.eval_shape(
+                            type(self).compute_whitened_residual_jacobian,
+                            self,
+                            assignments,
+                            residual_vector,
+                        ),
+                    )
+                )
+            )
+
+        state = jax.eval_shape(solver._initialize_state, self, assignments)
+        step_costs = (
+            jax.jit(lambda graph, state: solver._step(graph, state))
+            .lower(self, state)
+            .compile()
+            .cost_analysis()
+        )
+        if isinstance(step_costs, list):
+            step_costs = step_costs[0] if len(step_costs) > 0 else None
+
+        values_itemsize = onp.dtype(dtype).itemsize
+        coords_itemsize = onp.asarray(self.jacobian_coords.rows).dtype.itemsize
+        return ResourceEstimate(
+            num_variables=len(dims),
+            residual_dim=self.residual_dim,
+            local_dim=self.local_storage_layout.dim,
+            jacobian_nnz=jacobian_nnz,
+            jacobian_bytes=jacobian_nnz * (values_itemsize + 2 * coords_itemsize),
+            normal_matrix_nnz=normal_matrix_nnz,
+            cholesky_factor_nnz=cholesky_factor_nnz,
+            cholesky_fill_in=cholesky_factor_nnz - normal_matrix_lower_nnz,
+            jacobian_peak_bytes=int(jacobian_peak_bytes),
+            step_flops=None if step_costs is None else step_costs.get("flops"),
+            step_bytes_accessed=(
+                None if step_costs is None else step_costs.get("bytes accessed")
+            ),
         )
-        return A
 
     def solve(
         self,
@@ -282,3 +840,198 @@ class StackedFactorGraph:
         """Solve MAP inference problem."""
         # Note that the solver will handle storage layout mismatches.
         return solver.solve(graph=self, initial_assignments=initial_assignments)
+
+    def compile_solver(
+        self,
+        solver: NonlinearSolverBase = GaussNewtonSolver(),
+        donate_storage: bool = False,
+    ) -> CompiledSolver:
+        """Lower and compile a solve for this graph's structure ahead of time. Useful
+        for high-rate workloads, where per-call dispatch overhead of `solve()` can
+        exceed the cost of the solve itself.
+
+        Example:
+            compiled_solver = graph.compile_solver(solver)
+            solution_storage = compiled_solver(initial_assignments.storage)
+
+        Set `donate_storage=True` to reuse input storage buffers for solutions; inputs
+        then can't be reused after each call.
+        """
+        return CompiledSolver.make(
+            graph=self, solver=solver, donate_storage=donate_storage
+        )
+
+
+def _make_attribute_getter(
+    paths: Sequence[Tuple[str, ...]]
+) -> Callable[[Any], Tuple[Any, ...]]:
+    """Returns a function that reads a tuple of (nested) attributes from an object."""
+    if len(paths) == 0:
+        return lambda value: ()
+    if paths == [()]:
+        return lambda value: (value,)
+    getter = operator.attrgetter(*(".".join(path) for path in paths))
+    if len(paths) == 1:
+        return lambda value: (getter(value),)
+    return getter
+
+
+_get_shape = operator.attrgetter("shape")
+_get_dtype = operator.attrgetter("dtype")
+
+
+@dataclasses.dataclass(frozen=True)
+class _FieldTemplate:
+    """Structure of a factor field value that contains only pytree dataclasses and
+    arrays. Other values can be matched against it by reading their nodes and leaves
+    directly, which is much cheaper than flattening them."""
+
+    key: Hashable
+    """Field key of values that match this template."""
+
+    root_type: type
+    signature: Tuple[Any, ...]
+    """Types of nested nodes and leaves, leaf shapes, leaf dtypes, and static field
+    values. See `_compute_signature()`."""
+
+    get_nodes: Callable[[Any], Tuple[Any, ...]]
+    get_leaves: Callable[[Any], Tuple[Any, ...]]
+    get_static_values: Callable[[Any], Tuple[Any, ...]]
+
+    @staticmethod
+    def make(value: hints.Pytree, key: Hashable) -> Optional["_FieldTemplate"]:
+        """Make a template from a field value and its key. Returns `None` if the
+        value contains anything other than pytree dataclasses and arrays."""
+        node_paths: List[Tuple[str, ...]] = []
+        leaf_paths: List[Tuple[str, ...]] = []
+        static_paths: List[Tuple[str, ...]] = []
+
+        def visit(node: Any, path: Tuple[str, ...]) -> bool:
+            if isinstance(node, (onp.ndarray, jax.Array)):
+                leaf_paths.append(path)
+                return True
+            if not dataclasses.is_dataclass(node) or jax.tree_util.treedef_is_leaf(
+                jax.tree_util.tree_structure(node)
+            ):
+                return False
+            field_names = _get_field_names(type(node))
+            if field_names is None:
+                return False
+            if len(path) > 0:
+                node_paths.append(path)
+            child_field_names, static_field_names = field_names
+            static_paths.extend(path + (name,) for name in static_field_names)
+            return all(
+                visit(getattr(node, name), path + (name,)) for name in child_field_names
+            )
+
+        if not visit(value, ()):
+            return None
+
+        template = _FieldTemplate(
+            key=key,
+            root_type=type(value),
+            signature=(),
+            get_nodes=_make_attribute_getter(node_paths),
+            get_leaves=_make_attribute_getter(leaf_paths),
+            get_static_values=_make_attribute_getter(static_paths),
+        )
+        return dataclasses.replace(
+            template, signature=template._compute_signature(value)
+        )
+
+    def _compute_signature(self, value: hints.Pytree) -> Tuple[Any, ...]:
+        leaves = self.get_leaves(value)
+        return (
+            tuple(map(type, self.get_nodes(value))),
+            tuple(map(type, leaves)),
+            tuple(map(_get_shape, leaves)),
+            tuple(map(_get_dtype, leaves)),
+            self.get_static_values(value),
+        )
+
+    def matches(self, value: hints.Pytree) -> bool:
+        """Check if a value has the same treedef, leaf shapes, and leaf dtypes as the
+        value this template was made from."""
+        if type(value) is not self.root_type:
+            return False
+        try:
+            return self._compute_signature(value) == self.signature
+        except AttributeError:
+            # Nested nodes of a different type.
+            return False
+
+
+@dataclasses.dataclass
+class _GroupKeyCache:
+    """Caches used when computing group keys in `StackedFactorGraph.make()`."""
+
+    template_from_field: Dict[Tuple[type, str], Optional[_FieldTemplate]] = (
+        dataclasses.field(default_factory=dict)
+    )
+    """Template for the first value seen for each (factor type, field name) pair."""
+
+    key_from_value_id: Dict[int, Tuple[hints.Pytree, Hashable]] = dataclasses.field(
+        default_factory=dict
+    )
+    """Keys of flattened field values, memoized by object identity. Each entry holds a
+    reference to its value, so IDs aren't reused."""
+
+
+def _compute_group_key(factor: FactorBase, cache: _GroupKeyCache) -> GroupKey:
+    """Compute a key for grouping factors for stacking. Factors with matching keys have
+    the same treedef, up to variable instances, and the same leaf shapes.
+
+    Keys are built field by field, which avoids copying and flattening each factor.
+    The treedef and leaf shapes of the first value seen for each field are cached as
+    a `_FieldTemplate`; values that match it only have their nodes, leaf shapes, and
+    leaf dtypes checked. Other values are flattened, and their keys memoized by
+    object identity, since values like noise models are often shared by many
+    factors."""
+    factor_type = type(factor)
+    field_names = _get_field_names(factor_type)
+    if field_names is None:
+        # Fallback: full treedef of a copy with anonymized variables.
+        return (
+            jax.tree_structure(factor.anonymize_variables()),
+            tuple(onp.shape(leaf) for leaf in jax.tree_leaves(factor)),
+        )
+
+    child_field_names, static_field_names = field_names
+    child_field_keys: List[Hashable] = []
+    for name in child_field_names:
+        value = getattr(factor, name)
+
+        # Values that have already been seen, like shared noise models.
+        cached = cache.key_from_value_id.get(id(value))
+        if cached is not None:
+            child_field_keys.append(cached[1])
+            continue
+
+        # Values with the same structure as the first value seen for this field.
+        template = cache.template_from_field.get((factor_type, name))
+        if template is not None and template.matches(value):
+            child_field_keys.append(template.key)
+            continue
+
+        # Otherwise, flatten.
+        leaves, treedef = jax.tree_util.tree_flatten(value)
+        cached = (value, (treedef, tuple(onp.shape(leaf) for leaf in leaves)))
+        cache.key_from_value_id[id(value)] = cached
+        if (factor_type, name) not in cache.template_from_field:
+            cache.template_from_field[(factor_type, name)] = _FieldTemplate.make(
+                value, key=cached[1]
+            )
+        child_field_keys.append(cached[1])
+
+    return (
+        factor_type,
+        tuple(type(v) for v in factor.variables),
+        tuple(getattr(factor, name) for name in static_field_names),
+        tuple(child_field_keys),
+    )
+
+
+def _stack_scope_name(index: int, stacked_factor: FactorStack) -> str:
+    """Name for profiler scopes associated with a factor stack."""
+    return f"stack_{index}_{type(stacked_factor.factor).__name__}"
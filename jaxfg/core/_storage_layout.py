@@ -1,5 +1,6 @@
 import dataclasses
-from typing import Collection, DefaultDict, Dict, Iterable, List, Mapping, Type
+import weakref
+from typing import Collection, DefaultDict, Dict, Iterable, List, Mapping, Tuple, Type
 
 # We could also use flax.core.FrozenDict, but are trying to keep flax out of our
 # dependencies.
@@ -8,13 +9,18 @@ from frozendict import frozendict  # type: ignore
 from ._variables import VariableBase
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, eq=False)
 class StorageLayout:
     """Contains information about how the values of variables are stored in a flattened
     storage vector.
 
     Note that this is a vanilla dataclass -- not a PyTree. (in other words: all contents
     are static)
+
+    Layouts are passed as static arguments to most jitted functions, so hashing and
+    equality checks are made cheap: the hash is computed once at construction, and
+    layouts created via `make()` are interned, which lets equality checks usually
+    short-circuit on identity.
     """
 
     local_flag: bool
@@ -34,6 +40,41 @@ class StorageLayout:
     count_from_variable_type: Mapping[Type[VariableBase], int]
     """Number of variables of each type."""
 
+    _hash: int = dataclasses.field(init=False, repr=False)
+    """Cached structural hash. Set automatically in `__post_init__`."""
+
+    def __post_init__(self):
+        object.__setattr__(
+            self,
+            "_hash",
+            hash(
+                (
+                    self.local_flag,
+                    self.dim,
+                    tuple(self.index_from_variable.items()),
+                    tuple(self.index_from_variable_type.items()),
+                    tuple(self.count_from_variable_type.items()),
+                )
+            ),
+        )
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        # Fast paths: identity (common for interned layouts) and hash mismatches.
+        if self is other:
+            return True
+        if not isinstance(other, StorageLayout) or self._hash != other._hash:
+            return False
+        return (
+            self.local_flag == other.local_flag
+            and self.dim == other.dim
+            and self.index_from_variable == other.index_from_variable
+            and self.index_from_variable_type == other.index_from_variable_type
+            and self.count_from_variable_type == other.count_from_variable_type
+        )
+
     def get_variables(self) -> Collection[VariableBase]:
         """Variables. Storage indices are guaranteed to be in ascending order."""
         # Dictionaries from Python 3.7 retain insertion order
@@ -68,7 +109,7 @@ class StorageLayout:
                     else variable.get_parameter_dim()
                 )
 
-        return StorageLayout(
+        layout = StorageLayout(
             local_flag=local,
             dim=storage_index,
             index_from_variable=frozendict(index_from_variable),
@@ -77,3 +118,14 @@ class StorageLayout:
                 {k: len(v) for k, v in variables_from_type.items()}
             ),
         )
+
+        # Intern: a layout is fully determined by its variables (in storage order) and
+        # local flag.
+        return _interned_layouts.setdefault(
+            (local, tuple(layout.index_from_variable.keys())), layout
+        )
+
+
+_interned_layouts: (
+    "weakref.WeakValueDictionary[Tuple[bool, Tuple[VariableBase, ...]], StorageLayout]"
+) = weakref.WeakValueDictionary()
@@ -1,8 +1,9 @@
 import functools
-from typing import Collection, Dict, Iterable, Type, TypeVar
+from typing import Collection, Dict, Iterable, List, Mapping, Type, TypeVar
 
 import jax
 import jax_dataclasses as jdc
+import numpy as onp
 from jax import numpy as jnp
 
 from .. import hints
@@ -66,18 +67,80 @@ class VariableAssignments:
         # Figure out how variables are stored
         storage_layout = StorageLayout.make(variables, local=False)
 
-        # Stack variable values in order
-        storage = jnp.concatenate(
-            [
-                jax.jit(variable.flatten)(
-                    assignments[variable]
-                    if assignments is not None and variable in assignments
-                    else variable.get_default_value()
-                )
-                for variable in storage_layout.get_variables()
-            ],
-            axis=0,
+        # Stack values on the host, so we flatten once per variable type instead of
+        # once per variable
+        values_from_type: Dict[Type[VariableBase], List[hints.VariableValue]] = {
+            variable_type: [] for variable_type in storage_layout.get_variable_types()
+        }
+        for variable in storage_layout.get_variables():
+            values_from_type[type(variable)].append(
+                assignments[variable]
+                if assignments is not None and variable in assignments
+                else variable.get_default_value()
+            )
+
+        return VariableAssignments.make_from_stacked(
+            storage_layout.get_variables(),
+            {
+                variable_type: jax.tree_map(_stack_leaves, *values)
+                for variable_type, values in values_from_type.items()
+            },
         )
+
+    @staticmethod
+    def make_from_stacked(
+        variables: Iterable[VariableBase],
+        stacked_values: Mapping[Type[VariableBase], hints.VariableValue],
+    ) -> "VariableAssignments":
+        """Create an assignment object from values stacked by variable type. Storage is
+        built with one flatten and concatenate per type, which is much faster than
+        per-variable assignment for large problems.
+
+        Example:
+            poses = [SE3Variable() for _ in range(N)]
+            assignments = VariableAssignments.make_from_stacked(
+                poses,
+                {SE3Variable: T_world_poses},  # jaxlie.SE3 with batch axis of size N
+            )
+
+        Args:
+            variables: Variables to assign.
+            stacked_values: Values for each variable type, stacked along a leading axis
+                in the order that variables of that type appear in `variables`. Values
+                can also be flattened parameters, as an array of shape `(N,
+                parameter_dim)`. Missing types are assigned default values.
+        """
+
+        # Figure out how variables are stored
+        storage_layout = StorageLayout.make(variables, local=False)
+
+        # Flatten each type's values, and concatenate in storage order
+        flat_values: List[hints.Array] = []
+        for variable_type in storage_layout.get_variable_types():
+            count = storage_layout.count_from_variable_type[variable_type]
+            dim = variable_type.get_parameter_dim()
+
+            if variable_type not in stacked_values:
+                flat_values.append(
+                    jnp.tile(
+                        variable_type.flatten(variable_type.get_default_value()),
+                        reps=(count,),
+                    )
+                )
+                continue
+
+            value = stacked_values[variable_type]
+            if isinstance(value, (onp.ndarray, jnp.ndarray)):
+                flat = value.reshape((count, dim))
+            else:
+                flat = jax.vmap(variable_type.flatten)(value)
+            assert flat.shape == (count, dim), (
+                f"Expected {count} stacked values for {variable_type.__name__}, but got"
+                f" shape {flat.shape}"
+            )
+            flat_values.append(flat.reshape((-1,)))
+
+        storage = jnp.concatenate(flat_values, axis=0)
         assert storage.shape == (storage_layout.dim,)
 
         return VariableAssignments(storage=storage, storage_layout=storage_layout)
@@ -97,29 +160,10 @@ class VariableAssignments:
         if self.storage_layout == storage_layout:
             return self
 
-        assert self.storage_layout.dim == storage_layout.dim
-        assert self.storage_layout.local_flag == storage_layout.local_flag
-        assert set(self.storage_layout.get_variables()) == set(
-            storage_layout.get_variables()
-        )
-        dim = storage_layout.dim
-        variables = storage_layout.get_variables()
-        local_flag = storage_layout.local_flag
-
-        shuffle_indices = jnp.zeros(dim, dtype=jnp.int32)
-        for variable in variables:
-            source_index = self.storage_layout.index_from_variable[variable]
-            target_index = storage_layout.index_from_variable[variable]
-            variable_dim = (
-                variable.get_local_parameter_dim()
-                if local_flag
-                else variable.get_parameter_dim()
-            )
-            shuffle_indices = shuffle_indices.at[
-                target_index : target_index + variable_dim
-            ].set(jnp.arange(source_index, source_index + variable_dim))
-
-        new_storage = self.storage[shuffle_indices]
+        # Single gather, using a permutation computed on the host.
+        new_storage = self.storage[
+            _compute_storage_permutation(self.storage_layout, storage_layout)
+        ]
         assert new_storage.shape == self.storage.shape
         return VariableAssignments(storage=new_storage, storage_layout=storage_layout)
 
@@ -127,6 +171,15 @@ class VariableAssignments:
         """Grab assignments as a variable -> value dictionary."""
         return {v: self.get_value(v) for v in self.get_variables()}
 
+    def as_stacked_dict(self) -> Dict[Type[VariableBase], hints.VariableValue]:
+        """Grab assignments as a variable type -> stacked value dictionary. Values are
+        stacked in storage order; see `get_variables()`. Inverse of
+        `make_from_stacked()`."""
+        return {
+            variable_type: self.get_stacked_value(variable_type)
+            for variable_type in self.storage_layout.get_variable_types()
+        }
+
     def __repr__(self) -> str:
         value_from_variable = {
             variable: self.get_value(variable) for variable in self.get_variables()
@@ -177,42 +230,62 @@ class VariableAssignments:
         return output
 
     @jdc.jit
+    @jax.named_scope("manifold_retract")
     def manifold_retract(
         self, local_delta_assignments: "VariableAssignments"
     ) -> "VariableAssignments":
-        """Update variables on manifold."""
+        """Update variables on manifold.
+
+        Variables that are missing from the local delta layout are treated as
+        constants, and left untouched. Within each type, these must be stored after
+        all non-constant variables; this is the case for layouts created by
+        `StackedFactorGraph.make()`."""
 
         # Check that inputs make sense
         assert not self.storage_layout.local_flag
         assert local_delta_assignments.storage_layout.local_flag
+        assert _is_local_prefix(
+            self.storage_layout, local_delta_assignments.storage_layout
+        ), "Constant variables must be stored after non-constant ones of the same type"
 
-        # On-manifold retractions, one variable type at a time!
-        new_storage = jnp.zeros_like(self.storage)
+        # On-manifold retractions, one variable type at a time! Types are stored
+        # contiguously and in order, so the results can be concatenated directly.
+        new_storage_list: List[jnp.ndarray] = []
         variable_type: Type[VariableBase]
         for variable_type in self.storage_layout.index_from_variable_type.keys():
             # Get locations
             count = self.storage_layout.count_from_variable_type[variable_type]
             storage_index = self.storage_layout.index_from_variable_type[variable_type]
+            dim = variable_type.get_parameter_dim()
+            local_dim = variable_type.get_local_parameter_dim()
+
+            # Number of variables to retract; the rest are constant
+            local_count = (
+                local_delta_assignments.storage_layout.count_from_variable_type.get(
+                    variable_type, 0
+                )
+            )
+            if local_count == 0:
+                new_storage_list.append(
+                    self.storage[storage_index : storage_index + dim * count]
+                )
+                continue
             local_storage_index = (
                 local_delta_assignments.storage_layout.index_from_variable_type[
                     variable_type
                 ]
             )
-            dim = variable_type.get_parameter_dim()
-            local_dim = variable_type.get_local_parameter_dim()
 
             # Get batched variables
             batched_values_flat = self.storage[
-                storage_index : storage_index + dim * count
-            ].reshape((count, dim))
+                storage_index : storage_index + dim * local_count
+            ].reshape((local_count, dim))
             batched_deltas = local_delta_assignments.storage[
-                local_storage_index : local_storage_index + local_dim * count
-            ].reshape((count, local_dim))
+                local_storage_index : local_storage_index + local_dim * local_count
+            ].reshape((local_count, local_dim))
 
             # Batched variable update
-            new_storage = new_storage.at[
-                storage_index : storage_index + dim * count
-            ].set(
+            new_storage_list.append(
                 jax.vmap(variable_type.flatten)(
                     jax.vmap(variable_type.manifold_retract)(
                         jax.vmap(variable_type.unflatten)(batched_values_flat),
@@ -220,5 +293,76 @@ class VariableAssignments:
                     )
                 ).flatten()
             )
+            if local_count < count:
+                new_storage_list.append(
+                    self.storage[
+                        storage_index + dim * local_count : storage_index + dim * count
+                    ]
+                )
 
+        new_storage = jnp.concatenate(new_storage_list, axis=0)
+        assert new_storage.shape == self.storage.shape
         return jdc.replace(self, storage=new_storage)
+
+
+def _stack_leaves(*leaves: hints.Array) -> hints.Array:
+    """Stack leaves along a new leading axis. Uses NumPy unless we're tracing."""
+    if any(isinstance(leaf, jax.core.Tracer) for leaf in leaves):
+        return jnp.stack(leaves, axis=0)
+    return onp.stack(leaves, axis=0)
+
+
+@functools.lru_cache(maxsize=32)
+def _compute_storage_permutation(
+    source: StorageLayout, target: StorageLayout
+) -> onp.ndarray:
+    """Compute indices that map storage vectors from a source layout to a target layout:
+    `target_storage = source_storage[permutation]`. Memoized, since the same pair of
+    layouts is typically converted between repeatedly."""
+    assert source.dim == target.dim
+    assert source.local_flag == target.local_flag
+    assert source.index_from_variable.keys() == target.index_from_variable.keys()
+
+    variables = target.get_variables()
+    source_indices = onp.fromiter(
+        (source.index_from_variable[v] for v in variables),
+        dtype=onp.int32,
+        count=len(variables),
+    )
+    target_indices = onp.fromiter(
+        target.index_from_variable.values(), dtype=onp.int32, count=len(variables)
+    )
+    dims = onp.fromiter(
+        (
+            v.get_local_parameter_dim() if target.local_flag else v.get_parameter_dim()
+            for v in variables
+        ),
+        dtype=onp.int32,
+        count=len(variables),
+    )
+
+    # Target storage is laid out contiguously in variable order, so each variable's
+    # block is shifted by a constant offset.
+    return onp.arange(target.dim, dtype=onp.int32) + onp.repeat(
+        source_indices - target_indices, dims
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _is_local_prefix(
+    storage_layout: StorageLayout, local_storage_layout: StorageLayout
+) -> bool:
+    """Check that, for each variable type, the variables in a local storage layout are
+    the first variables of that type in a (global) storage layout."""
+    variables_from_type: Dict[Type[VariableBase], List[VariableBase]] = {}
+    for variable in storage_layout.get_variables():
+        variables_from_type.setdefault(type(variable), []).append(variable)
+    local_variables_from_type: Dict[Type[VariableBase], List[VariableBase]] = {}
+    for variable in local_storage_layout.get_variables():
+        local_variables_from_type.setdefault(type(variable), []).append(variable)
+
+    return all(
+        variables_from_type.get(variable_type, [])[: len(local_variables)]
+        == local_variables
+        for variable_type, local_variables in local_variables_from_type.items()
+    )
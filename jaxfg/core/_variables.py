@@ -1,7 +1,6 @@
 import abc
 import functools
-import inspect
-from typing import Callable, ClassVar, Generic, Mapping, Tuple, Type, TypeVar
+from typing import Callable, Generic, Mapping, Tuple, Type, TypeVar
 
 import jax
 import numpy as onp
@@ -68,39 +67,29 @@ class VariableBase(abc.ABC, Generic[VariableValueType], EnforceOverrides):
 
     # (4) Shared implementation details.
 
-    _parameter_dim: ClassVar[int]
-    """Parameter dimensionality. Set automatically in `__init_subclass__`."""
-
-    _unflatten: Callable[[hints.Array], VariableValueType]
-    """Helper for unflattening variable values. Implemented in `__init_subclass__`."""
-    # ^Note that `_unflatten` should really be annotated as a ClassVar, but this raises
-    # a mypy error due to an unnecessarily limiting spec in PEP 526:
-    # https://github.com/python/mypy/issues/5144
-
     def __init__(self):
         """Variable constructor. Should take no arguments."""
         super().__init__()
 
-    def __init_subclass__(cls):
-        """For non-abstract subclasses, we determine the parameter dimensionality and
-        unflattening procedure from the example provided by `get_default_value()`."""
-
-        if inspect.isabstract(cls):
-            return
-
-        example = cls.get_default_value()
-
-        flat, unflatten = flatten_util.ravel_pytree(example)
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _get_flattening_info(
+        cls,
+    ) -> Tuple[int, Callable[[hints.Array], VariableValueType]]:
+        """Determine the parameter dimensionality and unflattening procedure from the
+        example provided by `get_default_value()`. Computed lazily, because creating
+        example values initializes the JAX backend; this shouldn't happen at import
+        time."""
+        with jax.ensure_compile_time_eval():
+            flat, unflatten = flatten_util.ravel_pytree(cls.get_default_value())
         (parameter_dim,) = flat.shape
-
-        cls._parameter_dim = parameter_dim
-        cls._unflatten = unflatten
+        return parameter_dim, unflatten
 
     @classmethod
     @final
     def get_parameter_dim(cls) -> int:
         """Dimensionality of underlying parameterization."""
-        return cls._parameter_dim
+        return cls._get_flattening_info()[0]
 
     @staticmethod
     @final
@@ -128,7 +117,7 @@ class VariableBase(abc.ABC, Generic[VariableValueType], EnforceOverrides):
         Returns:
             VariableValueType: Variable value.
         """
-        return cls._unflatten(flat)
+        return cls._get_flattening_info()[1](flat)
 
     @classmethod
     @functools.lru_cache(maxsize=None)
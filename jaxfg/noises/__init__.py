@@ -1,10 +1,12 @@
 from ._gaussians import DiagonalGaussian, Gaussian
+from ._geman_mcclure import GemanMcClureWrapper
 from ._huber import HuberWrapper
 from ._noise_model_base import NoiseModelBase
 
 __all__ = [
     "DiagonalGaussian",
     "Gaussian",
+    "GemanMcClureWrapper",
     "HuberWrapper",
     "NoiseModelBase",
 ]
@@ -0,0 +1,60 @@
+import jax_dataclasses as jdc
+from jax import numpy as jnp
+from overrides import overrides
+
+from .. import hints
+from ._noise_model_base import NoiseModelBase
+
+
+@jdc.pytree_dataclass
+class GemanMcClureWrapper(NoiseModelBase):
+    """Wrapper for applying a scaled Geman-McClure loss to standard (eg Gaussian) noise
+    models. For a wrapped residual `r`, the loss is `mu c^2 |r|^2 / (mu c^2 + |r|^2)`.
+
+    The `mu` parameter controls convexity: as `mu` grows the loss approaches a standard
+    least-squares objective, and `mu=1` recovers the vanilla Geman-McClure loss. This is
+    the control parameter annealed by `jaxfg.solvers.GNCSolver`.
+
+    Unlike `HuberWrapper`, whitened residuals are scaled such that the squared norm
+    matches the loss exactly, so `StackedFactorGraph.compute_cost()` is accurate."""
+
+    wrapped: NoiseModelBase
+    """Underlying noise model."""
+
+    c: hints.Scalar
+    """Threshold parameter. Applied _after_ the wrapped noise model."""
+
+    mu: hints.Scalar = 1.0
+    """Graduated non-convexity control parameter. Should be `>= 1`."""
+
+    @overrides
+    def get_residual_dim(self) -> int:
+        return self.wrapped.get_residual_dim()
+
+    @overrides
+    def whiten_residual_vector(self, residual_vector: hints.Array) -> hints.Array:
+        residual_vector = self.wrapped.whiten_residual_vector(residual_vector)
+
+        mu_c_sq = self.mu * self.c**2
+        return residual_vector * jnp.sqrt(
+            mu_c_sq / (mu_c_sq + jnp.sum(residual_vector**2))
+        )
+
+    @overrides
+    def whiten_jacobian(
+        self,
+        jacobian: hints.Array,
+        residual_vector: hints.Array,
+    ) -> hints.Array:
+        jacobian = self.wrapped.whiten_jacobian(jacobian, residual_vector)
+
+        # `residual_vector` is the output of `whiten_residual_vector()`; the scaling
+        # term and its derivative can both be recovered from it directly.
+        mu_c_sq = self.mu * self.c**2
+        sqrt_weight = jnp.sqrt(
+            jnp.maximum(1.0 - jnp.sum(residual_vector**2) / mu_c_sq, 0.0)
+        )
+        return sqrt_weight * (
+            jacobian
+            - residual_vector[:, None] @ (residual_vector[None, :] @ jacobian) / mu_c_sq
+        )
@@ -1,6 +1,7 @@
 from ._dogleg_solver import DoglegSolver
 from ._fixed_iteration_gauss_newton_solver import FixedIterationGaussNewtonSolver
 from ._gauss_newton_solver import GaussNewtonSolver
+from ._gnc_solver import GNCSolver
 from ._levenberg_marquardt_solver import LevenbergMarquardtSolver
 from ._nonlinear_solver_base import NonlinearSolverBase, NonlinearSolverState
 
@@ -8,6 +9,7 @@ __all__ = [
     "DoglegSolver",
     "FixedIterationGaussNewtonSolver",
     "GaussNewtonSolver",
+    "GNCSolver",
     "LevenbergMarquardtSolver",
     "NonlinearSolverBase",
     "NonlinearSolverState",
@@ -1,5 +1,6 @@
 from typing import TYPE_CHECKING
 
+import jax
 import jax_dataclasses as jdc
 from jax import numpy as jnp
 from overrides import overrides
@@ -7,14 +8,14 @@ from overrides import overrides
 from .. import hints, sparse
 from ..core._variable_assignments import VariableAssignments
 from ._mixins import _TerminationCriteriaMixin, _TrustRegionMixin
-from ._nonlinear_solver_base import NonlinearSolverBase, NonlinearSolverState
+from ._nonlinear_solver_base import NonlinearSolverBase, _LinearizedSolverState
 
 if TYPE_CHECKING:
     from ..core._stacked_factor_graph import StackedFactorGraph
 
 
 @jdc.pytree_dataclass
-class _DoglegState(NonlinearSolverState):
+class _DoglegState(_LinearizedSolverState):
     """State passed between dogleg iterations."""
 
     radius: hints.Scalar
@@ -37,13 +38,16 @@ class DoglegSolver(
         initial_assignments: VariableAssignments,
     ) -> _DoglegState:
         # Initialize
-        cost, residual_vector = graph.compute_cost(initial_assignments)
+        residual_vector, A = graph.compute_whitened_residual_and_jacobian(
+            initial_assignments
+        )
         return _DoglegState(
             iterations=0,
             assignments=initial_assignments,
-            cost=cost,
+            cost=jnp.sum(residual_vector**2),
             residual_vector=residual_vector,
             done=False,
+            jacobian_values=A.values,
             radius=self.radius_initial,
         )
 
@@ -53,8 +57,8 @@ class DoglegSolver(
         graph: "StackedFactorGraph",
         state_prev: _DoglegState,
     ) -> _DoglegState:
-        # There's currently some redundancy here: we only need to re-linearize and
-        # compute new GN/SD update steps when updates are actually accepted
+        # There's currently some redundancy here: we only need to compute new GN/SD
+        # update steps when updates are actually accepted
         self._hcb_print(
             lambda i, max_i, cost, radius: f"Iteration #{i}/{max_i}: cost={str(cost).ljust(15)} radius={str(radius)}",
             i=state_prev.iterations,
@@ -63,12 +67,10 @@ class DoglegSolver(
             radius=state_prev.radius,
         )
 
-        # Linearize graph
-        A: sparse.SparseCooMatrix = graph.compute_whitened_residual_jacobian(
-            assignments=state_prev.assignments,
-            residual_vector=state_prev.residual_vector,
-        )
-        ATb = A.T @ -state_prev.residual_vector
+        # Linearization is computed alongside the residual vector
+        A: sparse.SparseCooMatrix = state_prev.get_jacobian(graph)
+        with jax.named_scope("ATb"):
+            ATb = A.T @ -state_prev.residual_vector
 
         def compute_dogleg_step() -> jnp.ndarray:
             # Gauss-Newton step
@@ -130,7 +132,11 @@ class DoglegSolver(
         assignments_proposed = state_prev.assignments.manifold_retract(
             local_delta_assignments=local_delta_assignments
         )
-        proposed_cost, residual_vector = graph.compute_cost(assignments_proposed)
+        (
+            proposed_residual_vector,
+            compute_proposed_jacobian,
+        ) = graph.linearize(assignments_proposed)
+        proposed_cost = jnp.sum(proposed_residual_vector**2)
         step_quality = self.compute_step_quality(
             A=A,
             proposed_cost=proposed_cost,
@@ -176,6 +182,16 @@ class DoglegSolver(
             ),
         )
 
+        # Only accepted proposals are linearized, and only if we're not done;
+        # otherwise, the previous Jacobian is kept. Residuals aren't recomputed:
+        # `compute_proposed_jacobian()` reuses values from the residual computation
+        # used for the acceptance test.
+        jacobian_values = jax.lax.cond(
+            jnp.logical_and(accept_flag, jnp.logical_not(done)),
+            lambda: compute_proposed_jacobian().values,
+            lambda: state_prev.jacobian_values,
+        )
+
         return _DoglegState(
             iterations=state_prev.iterations + 1,
             assignments=assignments,
@@ -183,6 +199,9 @@ class DoglegSolver(
             cost=jnp.where(
                 accept_flag, proposed_cost, state_prev.cost
             ),  # Use old cost if update is rejected
-            residual_vector=residual_vector,
+            residual_vector=jnp.where(
+                accept_flag, proposed_residual_vector, state_prev.residual_vector
+            ),
             done=done,
+            jacobian_values=jacobian_values,
         )
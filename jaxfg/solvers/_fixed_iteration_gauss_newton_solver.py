@@ -8,14 +8,14 @@ from overrides import overrides
 
 from .. import sparse
 from ..core._variable_assignments import VariableAssignments
-from ._nonlinear_solver_base import NonlinearSolverBase, NonlinearSolverState
+from ._nonlinear_solver_base import NonlinearSolverBase, _LinearizedSolverState
 
 if TYPE_CHECKING:
     from ..core._stacked_factor_graph import StackedFactorGraph
 
 
 @jdc.pytree_dataclass
-class FixedIterationGaussNewtonSolver(NonlinearSolverBase[NonlinearSolverState]):
+class FixedIterationGaussNewtonSolver(NonlinearSolverBase[_LinearizedSolverState]):
     """Alternative version of Gauss-Newton solver, which ignores convergence checks."""
 
     unroll: jdc.Static[bool] = True
@@ -28,23 +28,26 @@ class FixedIterationGaussNewtonSolver(NonlinearSolverBase[NonlinearSolverState])
         self,
         graph: "StackedFactorGraph",
         initial_assignments: VariableAssignments,
-    ) -> NonlinearSolverState:
+    ) -> _LinearizedSolverState:
         # Initialize
-        cost, residual_vector = graph.compute_cost(initial_assignments)
-        return NonlinearSolverState(
+        residual_vector, A = graph.compute_whitened_residual_and_jacobian(
+            initial_assignments
+        )
+        return _LinearizedSolverState(
             iterations=0,
             assignments=initial_assignments,
-            cost=cost,
+            cost=jnp.sum(residual_vector**2),
             residual_vector=residual_vector,
             done=False,
+            jacobian_values=A.values,
         )
 
     @overrides
     def _step(
         self,
         graph: "StackedFactorGraph",
-        state_prev: NonlinearSolverState,
-    ) -> NonlinearSolverState:
+        state_prev: _LinearizedSolverState,
+    ) -> _LinearizedSolverState:
         """Linearize, solve linear subproblem, and update on manifold."""
 
         self._hcb_print(
@@ -53,12 +56,10 @@ class FixedIterationGaussNewtonSolver(NonlinearSolverBase[NonlinearSolverState])
             cost=state_prev.cost,
         )
 
-        # Linearize graph
-        A: sparse.SparseCooMatrix = graph.compute_whitened_residual_jacobian(
-            assignments=state_prev.assignments,
-            residual_vector=state_prev.residual_vector,
-        )
-        ATb = -(A.T @ state_prev.residual_vector)
+        # Linearization is computed alongside the residual vector
+        A: sparse.SparseCooMatrix = state_prev.get_jacobian(graph)
+        with jax.named_scope("ATb"):
+            ATb = -(A.T @ state_prev.residual_vector)
 
         # Solve linear subproblem
         local_delta_assignments = VariableAssignments(
@@ -76,16 +77,26 @@ class FixedIterationGaussNewtonSolver(NonlinearSolverBase[NonlinearSolverState])
             local_delta_assignments=local_delta_assignments,
         )
 
-        # Check for convergence
-        cost, residual_vector = graph.compute_cost(assignments)
+        # Evaluate residuals at updated assignments, and check for convergence
+        residual_vector, compute_jacobian = graph.linearize(assignments)
+        cost = jnp.sum(residual_vector**2)
         done = state_prev.iterations >= (self.iterations - 1)
 
-        return NonlinearSolverState(
+        # Linearize for the next step. Skipped once we're done, since the Jacobian
+        # would go unused
+        jacobian_values = jax.lax.cond(
+            done,
+            lambda: state_prev.jacobian_values,
+            lambda: compute_jacobian().values,
+        )
+
+        return _LinearizedSolverState(
             iterations=state_prev.iterations + 1,
             assignments=assignments,
             cost=cost,
             residual_vector=residual_vector,
             done=done,
+            jacobian_values=jacobian_values,
         )
 
     @jax.jit
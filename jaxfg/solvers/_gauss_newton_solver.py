@@ -1,5 +1,6 @@
 from typing import TYPE_CHECKING
 
+import jax
 import jax_dataclasses as jdc
 from jax import numpy as jnp
 from overrides import overrides
@@ -7,7 +8,7 @@ from overrides import overrides
 from .. import sparse
 from ..core._variable_assignments import VariableAssignments
 from ._mixins import _TerminationCriteriaMixin
-from ._nonlinear_solver_base import NonlinearSolverBase, NonlinearSolverState
+from ._nonlinear_solver_base import NonlinearSolverBase, _LinearizedSolverState
 
 if TYPE_CHECKING:
     from ..core._stacked_factor_graph import StackedFactorGraph
@@ -15,7 +16,7 @@ if TYPE_CHECKING:
 
 @jdc.pytree_dataclass
 class GaussNewtonSolver(
-    NonlinearSolverBase[NonlinearSolverState],
+    NonlinearSolverBase[_LinearizedSolverState],
     _TerminationCriteriaMixin,
 ):
     @overrides
@@ -23,23 +24,26 @@ class GaussNewtonSolver(
         self,
         graph: "StackedFactorGraph",
         initial_assignments: VariableAssignments,
-    ) -> NonlinearSolverState:
+    ) -> _LinearizedSolverState:
         # Initialize
-        cost, residual_vector = graph.compute_cost(initial_assignments)
-        return NonlinearSolverState(
+        residual_vector, A = graph.compute_whitened_residual_and_jacobian(
+            initial_assignments
+        )
+        return _LinearizedSolverState(
             iterations=0,
             assignments=initial_assignments,
-            cost=cost,
+            cost=jnp.sum(residual_vector**2),
             residual_vector=residual_vector,
             done=False,
+            jacobian_values=A.values,
         )
 
     @overrides
     def _step(
         self,
         graph: "StackedFactorGraph",
-        state_prev: NonlinearSolverState,
-    ) -> NonlinearSolverState:
+        state_prev: _LinearizedSolverState,
+    ) -> _LinearizedSolverState:
         """Linearize, solve linear subproblem, and update on manifold."""
 
         self._hcb_print(
@@ -49,12 +53,10 @@ class GaussNewtonSolver(
             cost=state_prev.cost,
         )
 
-        # Linearize graph
-        A: sparse.SparseCooMatrix = graph.compute_whitened_residual_jacobian(
-            assignments=state_prev.assignments,
-            residual_vector=state_prev.residual_vector,
-        )
-        ATb = -(A.T @ state_prev.residual_vector)
+        # Linearization is computed alongside the residual vector
+        A: sparse.SparseCooMatrix = state_prev.get_jacobian(graph)
+        with jax.named_scope("ATb"):
+            ATb = -(A.T @ state_prev.residual_vector)
 
         # Solve linear subproblem
         local_delta_assignments = VariableAssignments(
@@ -72,8 +74,9 @@ class GaussNewtonSolver(
             local_delta_assignments=local_delta_assignments,
         )
 
-        # Check for convergence
-        cost, residual_vector = graph.compute_cost(assignments)
+        # Evaluate residuals at updated assignments, and check for convergence
+        residual_vector, compute_jacobian = graph.linearize(assignments)
+        cost = jnp.sum(residual_vector**2)
         done = jnp.logical_or(
             self.check_exceeded_max_iterations(state_prev=state_prev),
             self.check_convergence(
@@ -84,10 +87,19 @@ class GaussNewtonSolver(
             ),
         )
 
-        return NonlinearSolverState(
+        # Linearize for the next step. Skipped once we're done, since the Jacobian
+        # would go unused
+        jacobian_values = jax.lax.cond(
+            done,
+            lambda: state_prev.jacobian_values,
+            lambda: compute_jacobian().values,
+        )
+
+        return _LinearizedSolverState(
             iterations=state_prev.iterations + 1,
             assignments=assignments,
             cost=cost,
             residual_vector=residual_vector,
             done=done,
+            jacobian_values=jacobian_values,
         )
@@ -0,0 +1,137 @@
+from typing import TYPE_CHECKING
+
+import jax_dataclasses as jdc
+from jax import numpy as jnp
+from overrides import overrides
+
+from .. import hints, noises
+from ..core._variable_assignments import VariableAssignments
+from ._levenberg_marquardt_solver import LevenbergMarquardtSolver
+from ._nonlinear_solver_base import NonlinearSolverBase, NonlinearSolverState
+
+if TYPE_CHECKING:
+    from ..core._stacked_factor_graph import StackedFactorGraph
+
+
+@jdc.pytree_dataclass
+class _GNCState(NonlinearSolverState):
+    """State passed between GNC outer iterations."""
+
+    mu: hints.Scalar
+
+
+@jdc.pytree_dataclass
+class GNCSolver(NonlinearSolverBase[_GNCState]):
+    """Graduated non-convexity wrapper around another nonlinear solver.
+
+    Each outer iteration runs a full inner solve, warm-started from the previous
+    assignments, with the `mu` control parameter of every `GemanMcClureWrapper` noise
+    model in the graph set from an annealing schedule. `mu` starts at `mu_initial`,
+    where the loss is nearly quadratic, and is divided by `mu_factor` until it reaches
+    1. The outer loop is a `jax.lax.while_loop`, so the inner solve is traced and
+    compiled once and reused for the whole schedule.
+
+    Linear subproblems are handled by `inner_solver`; the `linear_solver` field of the
+    GNC solver itself is unused.
+
+    Reference:
+    > Graduated Non-Convexity for Robust Spatial Perception, Yang et al 2020.
+    """
+
+    inner_solver: NonlinearSolverBase = jdc.field(
+        default_factory=lambda: LevenbergMarquardtSolver(verbose=False)
+    )
+    """Solver to use for each step of the annealing schedule."""
+
+    mu_initial: hints.Scalar = 1e4
+    """Initial value of the control parameter."""
+
+    mu_factor: hints.Scalar = 1.4
+    """Control parameter is divided by this factor after each outer iteration."""
+
+    max_iterations: int = 100
+    """Maximum number of outer iterations."""
+
+    def _anneal(
+        self, graph: "StackedFactorGraph", mu: hints.Scalar
+    ) -> "StackedFactorGraph":
+        """Returns a copy of a graph with all GNC control parameters set to `mu`."""
+        factor_stacks = []
+        found_robust_noise_model = False
+        for stacked_factor in graph.factor_stacks:
+            noise_model = stacked_factor.factor.noise_model
+            if isinstance(noise_model, noises.GemanMcClureWrapper):
+                found_robust_noise_model = True
+                stacked_factor = jdc.replace(
+                    stacked_factor,
+                    factor=jdc.replace(
+                        stacked_factor.factor,
+                        noise_model=jdc.replace(
+                            noise_model, mu=jnp.full_like(noise_model.mu, mu)
+                        ),
+                    ),
+                )
+            factor_stacks.append(stacked_factor)
+
+        assert (
+            found_robust_noise_model
+        ), "GNC requires at least one factor with a GemanMcClureWrapper noise model!"
+        return jdc.replace(graph, factor_stacks=factor_stacks)
+
+    @overrides
+    def _initialize_state(
+        self,
+        graph: "StackedFactorGraph",
+        initial_assignments: VariableAssignments,
+    ) -> _GNCState:
+        # Initialize
+        cost, residual_vector = self._anneal(graph, self.mu_initial).compute_cost(
+            initial_assignments
+        )
+        return _GNCState(
+            iterations=0,
+            assignments=initial_assignments,
+            cost=cost,
+            residual_vector=residual_vector,
+            done=False,
+            mu=jnp.maximum(self.mu_initial, 1.0),
+        )
+
+    @overrides
+    def _step(
+        self,
+        graph: "StackedFactorGraph",
+        state_prev: _GNCState,
+    ) -> _GNCState:
+        """Run an inner solve at the current control parameter, then anneal."""
+
+        self._hcb_print(
+            lambda i, max_i, cost, mu: f"Iteration #{i}/{max_i}: cost={str(cost).ljust(15)} mu={str(mu)}",
+            i=state_prev.iterations,
+            max_i=self.max_iterations,
+            cost=state_prev.cost,
+            mu=state_prev.mu,
+        )
+
+        # Warm-started inner solve
+        graph_annealed = self._anneal(graph, state_prev.mu)
+        assignments = self.inner_solver.solve(
+            graph=graph_annealed,
+            initial_assignments=state_prev.assignments,
+        )
+        cost, residual_vector = graph_annealed.compute_cost(assignments)
+
+        # Terminate after the solve with the original (mu=1) loss
+        done = jnp.logical_or(
+            state_prev.mu <= 1.0,
+            state_prev.iterations >= (self.max_iterations - 1),
+        )
+
+        return _GNCState(
+            iterations=state_prev.iterations + 1,
+            assignments=assignments,
+            cost=cost,
+            residual_vector=residual_vector,
+            done=done,
+            mu=jnp.maximum(state_prev.mu / self.mu_factor, 1.0),
+        )
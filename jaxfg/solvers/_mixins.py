@@ -49,6 +49,7 @@ class _TerminationCriteriaMixin:
     """We terminate if `norm_2(linear delta) < (norm2(x) + parameter_tolerance) * parameter_tolerance`."""
 
     @jax.jit
+    @jax.named_scope("convergence_check")
     def check_exceeded_max_iterations(
         self,
         state_prev: NonlinearSolverState,
@@ -57,6 +58,7 @@ class _TerminationCriteriaMixin:
         return state_prev.iterations >= (self.max_iterations - 1)  # type: ignore
 
     @jax.jit
+    @jax.named_scope("convergence_check")
     def check_convergence(
         self,
         state_prev: NonlinearSolverState,
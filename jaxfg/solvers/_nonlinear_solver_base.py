@@ -5,10 +5,9 @@ from typing import TYPE_CHECKING, Callable, Generic, TypeVar, Union
 import jax
 import jax_dataclasses as jdc
 from jax import numpy as jnp
-from jax.experimental import host_callback as hcb
 from overrides import EnforceOverrides
 
-from .. import hints, sparse
+from .. import hints, sparse, utils
 from ..core._variable_assignments import VariableAssignments
 
 if TYPE_CHECKING:
@@ -29,6 +28,25 @@ class NonlinearSolverState:
     done: Boolean
 
 
+@jdc.pytree_dataclass
+class _LinearizedSolverState(NonlinearSolverState):
+    """Solver state that also carries a linearization of the graph, so residuals and
+    Jacobians can be computed together each time assignments are updated."""
+
+    jacobian_values: hints.Array
+    """Values of the whitened Jacobian of `residual_vector`, evaluated at
+    `assignments`. Coordinates are fixed for a graph, so they aren't carried between
+    iterations; see `get_jacobian()`."""
+
+    def get_jacobian(self, graph: "StackedFactorGraph") -> sparse.SparseCooMatrix:
+        """Rebuild the Jacobian from its values and the sparsity pattern of a graph."""
+        return sparse.SparseCooMatrix(
+            values=self.jacobian_values,
+            coords=graph.jacobian_coords,
+            shape=(graph.residual_dim, graph.local_storage_layout.dim),
+        )
+
+
 NonlinearSolverStateType = TypeVar(
     "NonlinearSolverStateType", bound=NonlinearSolverState
 )
@@ -103,6 +121,20 @@ class NonlinearSolverBase(
             initial_assignments.storage_layout
         )
 
+    @jdc.jit(donate_argnums=2)
+    def solve_in_place(
+        self,
+        graph: "StackedFactorGraph",
+        initial_assignments: VariableAssignments,
+    ) -> VariableAssignments:
+        """Run MAP inference on a factor graph, donating the storage buffer of
+        `initial_assignments` to the solution. This avoids keeping the input and output
+        storage vectors alive at the same time, which reduces peak memory for large
+        problems.
+
+        `initial_assignments` should not be used after calling this method."""
+        return self.solve(graph=graph, initial_assignments=initial_assignments)
+
     def _hcb_print(
         self,
         string_from_args: Callable[..., str],
@@ -114,6 +146,9 @@ class NonlinearSolverBase(
 
         if not self.verbose:
             return
+        utils.warn_if_host_callback_is_uncached("Printing with `verbose=True`")
+
+        from jax.experimental import host_callback as hcb
 
         hcb.id_tap(
             lambda args_kwargs, _unused_transforms: print(
@@ -1,4 +1,5 @@
 from ._linear_solve import (
+    AutoLinearSolver,
     CholmodSolver,
     ConjugateGradientSolver,
     InexactStepConjugateGradientSolver,
@@ -7,6 +8,7 @@ from ._linear_solve import (
 from ._sparse_matrix import SparseCooCoordinates, SparseCooMatrix
 
 __all__ = [
+    "AutoLinearSolver",
     "CholmodSolver",
     "ConjugateGradientSolver",
     "InexactStepConjugateGradientSolver",
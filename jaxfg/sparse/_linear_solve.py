@@ -1,17 +1,23 @@
 import abc
-from typing import Dict, Hashable, NamedTuple
+import logging
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, NamedTuple, Optional, Tuple
 
 import jax
-import jax.experimental.host_callback as hcb
 import jax_dataclasses as jdc
 import numpy as onp
-import sksparse.cholmod
 from jax import numpy as jnp
 from overrides import EnforceOverrides, overrides
 
-from .. import hints
+from .. import hints, utils
 from ._sparse_matrix import SparseCooMatrix
 
+if TYPE_CHECKING:
+    import sksparse.cholmod
+
+    from ..core._stacked_factor_graph import StackedFactorGraph
+
+_logger = logging.getLogger(__name__)
+
 
 class LinearSubproblemSolverBase(abc.ABC, EnforceOverrides):
     """Linear solver base class."""
@@ -33,7 +39,7 @@ class _LinearSolverArgs(NamedTuple):
     lambd: hints.Scalar
 
 
-_cholmod_analyze_cache: Dict[Hashable, sksparse.cholmod.Factor] = {}
+_cholmod_analyze_cache: Dict[Hashable, "sksparse.cholmod.Factor"] = {}
 
 
 @jdc.pytree_dataclass
@@ -56,6 +62,7 @@ class CholmodSolver(LinearSubproblemSolverBase):
     is written in vanilla JAX should be less caveat-y.
     """
 
+    @jax.named_scope("linear_subproblem")
     @overrides
     def solve_subproblem(
         self,
@@ -66,9 +73,16 @@ class CholmodSolver(LinearSubproblemSolverBase):
     ) -> jnp.ndarray:
         # JAX-compatible sparse Cholesky factorization with a host callback. Similar to:
         #     self._solve(_LinearSolverArgs(A, ATb, lambd))
+        import jax.experimental.host_callback as hcb
+
+        utils.warn_if_host_callback_is_uncached("`CholmodSolver`")
+
         return hcb.call(self._solve, _LinearSolverArgs(A, ATb, lambd), result_shape=ATb)
 
     def _solve(self, args: _LinearSolverArgs) -> jnp.ndarray:
+        # Deferred: scikit-sparse is only needed when CHOLMOD is actually used.
+        import sksparse.cholmod
+
         # Convert our custom sparse matrix format to a scipy CSC matrix
         # This could likely be optimized!
         A_T = args.A.T
@@ -92,6 +106,7 @@ class _ConjugateGradientSolver(LinearSubproblemSolverBase, abc.ABC):
     @abc.abstractmethod
     def _get_cg_tolerance(self, iteration: hints.Scalar): ...
 
+    @jax.named_scope("linear_subproblem")
     @overrides
     def solve_subproblem(
         self,
@@ -158,3 +173,156 @@ class InexactStepConjugateGradientSolver(_ConjugateGradientSolver):
     @overrides
     def _get_cg_tolerance(self, iteration: hints.Scalar):
         return self.inexact_step_eta / (iteration + 1)
+
+
+@jdc.pytree_dataclass
+class AutoLinearSolver(LinearSubproblemSolverBase):
+    """Linear solver that dispatches to `CholmodSolver` or `ConjugateGradientSolver`
+    based on problem structure. Choices are made at trace time, and logged at the INFO
+    level via the `logging` module:
+
+    - Conjugate gradient is used when a sparse Cholesky factorization is expected to
+      be too expensive: the linear subproblem dimension exceeds `max_cholmod_dim`, or
+      the predicted Cholesky factor exceeds `max_cholmod_factor_nnz` entries. Fill-in is
+      only predicted for solvers created via `make()`.
+    - Otherwise, CHOLMOD is used. CHOLMOD doesn't support `vmap` or autodiff, so
+      conjugate gradient is substituted automatically when either is applied.
+    """
+
+    cholmod_solver: CholmodSolver = jdc.field(default_factory=CholmodSolver)
+    """Solver for problems that are small enough to factorize."""
+
+    cg_solver: ConjugateGradientSolver = jdc.field(
+        default_factory=ConjugateGradientSolver
+    )
+    """Solver for large, batched, or differentiated problems."""
+
+    max_cholmod_dim: jdc.Static[int] = 1_000_000
+    """Maximum linear subproblem dimension to solve with CHOLMOD."""
+
+    max_cholmod_factor_nnz: jdc.Static[int] = 50_000_000
+    """Maximum predicted Cholesky factor nonzeros to solve with CHOLMOD."""
+
+    predicted_factor_nnz: jdc.Static[Optional[int]] = None
+    """Predicted Cholesky factor nonzeros. Set by `make()`."""
+
+    @staticmethod
+    def make(graph: "StackedFactorGraph", **kwargs) -> "AutoLinearSolver":
+        """Create a solver, with Cholesky fill-in predicted from a graph's structure.
+
+        Args:
+            graph: Graph that will be solved.
+            **kwargs: Forwarded to the constructor.
+        """
+        from ..core._diagnostics import (
+            compute_block_sparsity,
+            estimate_cholesky_factor_nnz,
+        )
+
+        pattern, dims = compute_block_sparsity(
+            graph.jacobian_coords, graph.local_storage_layout
+        )
+        return AutoLinearSolver(
+            predicted_factor_nnz=estimate_cholesky_factor_nnz(pattern, dims), **kwargs
+        )
+
+    @jax.named_scope("linear_subproblem")
+    @overrides
+    def solve_subproblem(
+        self,
+        A: SparseCooMatrix,
+        ATb: hints.Array,
+        lambd: hints.Scalar,
+        iteration: hints.Scalar,
+    ) -> jnp.ndarray:
+        dim = A.shape[1]
+        if dim > self.max_cholmod_dim:
+            _logger.info(
+                "Using conjugate gradient: subproblem dimension %d exceeds %d.",
+                dim,
+                self.max_cholmod_dim,
+            )
+            return self.cg_solver.solve_subproblem(A, ATb, lambd, iteration)
+        if (
+            self.predicted_factor_nnz is not None
+            and self.predicted_factor_nnz > self.max_cholmod_factor_nnz
+        ):
+            _logger.info(
+                "Using conjugate gradient: predicted Cholesky factor nnz %d exceeds %d.",
+                self.predicted_factor_nnz,
+                self.max_cholmod_factor_nnz,
+            )
+            return self.cg_solver.solve_subproblem(A, ATb, lambd, iteration)
+
+        _logger.info(
+            "Using CHOLMOD: subproblem dimension %d, %d Jacobian entries, predicted"
+            " Cholesky factor nnz %s.",
+            dim,
+            A.values.shape[0],
+            self.predicted_factor_nnz,
+        )
+        utils.warn_if_host_callback_is_uncached(
+            "CHOLMOD, as chosen by `AutoLinearSolver`,"
+        )
+
+        return _auto_cholmod_solve(self, _LinearSolverArgs(A, ATb, lambd), iteration)
+
+
+# Host callbacks can't be batched or differentiated. For `AutoLinearSolver`, we intercept
+# both transformations and fall back to conjugate gradient.
+
+
+def _auto_cg_solve(
+    solver: AutoLinearSolver, args: _LinearSolverArgs, iteration: hints.Scalar
+) -> jnp.ndarray:
+    return solver.cg_solver.solve_subproblem(args.A, args.ATb, args.lambd, iteration)
+
+
+@jax.custom_batching.custom_vmap
+def _auto_cholmod_solve_unbatched(
+    solver: AutoLinearSolver, args: _LinearSolverArgs, iteration: hints.Scalar
+) -> jnp.ndarray:
+    result_shape = jax.ShapeDtypeStruct(args.ATb.shape, args.ATb.dtype)
+    return jax.pure_callback(
+        lambda args: onp.asarray(
+            solver.cholmod_solver._solve(args), dtype=result_shape.dtype
+        ),
+        result_shape,
+        args,
+    )
+
+
+@_auto_cholmod_solve_unbatched.def_vmap
+def _auto_cholmod_solve_vmap_rule(
+    axis_size: int, in_batched: List[Any], *args: Any
+) -> Tuple[jnp.ndarray, bool]:
+    _logger.info("Using conjugate gradient: CHOLMOD does not support vmap.")
+    in_axes = jax.tree_map(lambda batched: 0 if batched else None, in_batched)
+    return jax.vmap(_auto_cg_solve, in_axes=tuple(in_axes))(*args), True
+
+
+@jax.custom_jvp
+def _auto_cholmod_solve(
+    solver: AutoLinearSolver, args: _LinearSolverArgs, iteration: hints.Scalar
+) -> jnp.ndarray:
+    return _auto_cholmod_solve_unbatched(solver, args, iteration)
+
+
+@_auto_cholmod_solve.defjvp
+def _auto_cholmod_solve_jvp(
+    primals: Tuple[Any, ...], tangents: Tuple[Any, ...]
+) -> Tuple[jnp.ndarray, jnp.ndarray]:
+    _logger.info("Using conjugate gradient: CHOLMOD does not support autodiff.")
+
+    # Tangents of integer primals (sparsity coordinates, iteration counts) are zeros
+    # here, but need to be `float0` for `jax.jvp()`.
+    tangents = jax.tree_map(
+        lambda primal, tangent: (
+            tangent
+            if jnp.issubdtype(jnp.result_type(primal), jnp.inexact)
+            else onp.zeros(onp.shape(primal), dtype=jax.dtypes.float0)
+        ),
+        primals,
+        tangents,
+    )
+    return jax.jvp(_auto_cg_solve, primals, tangents)
@@ -1,11 +1,13 @@
-from typing import Tuple
+from typing import TYPE_CHECKING, Tuple
 
 import jax_dataclasses as jdc
-import scipy
 from jax import numpy as jnp
 
 from .. import hints
 
+if TYPE_CHECKING:
+    import scipy.sparse
+
 
 @jdc.pytree_dataclass
 class SparseCooCoordinates:
@@ -57,7 +59,7 @@ class SparseCooMatrix:
         )
 
     @staticmethod
-    def from_scipy_coo_matrix(matrix: scipy.sparse.coo_matrix) -> "SparseCooMatrix":
+    def from_scipy_coo_matrix(matrix: "scipy.sparse.coo_matrix") -> "SparseCooMatrix":
         """Build from a sparse scipy matrix."""
         return SparseCooMatrix(
             values=matrix.data,
@@ -68,8 +70,10 @@ class SparseCooMatrix:
             shape=matrix.shape,
         )
 
-    def as_scipy_coo_matrix(self) -> scipy.sparse.coo_matrix:
+    def as_scipy_coo_matrix(self) -> "scipy.sparse.coo_matrix":
         """Convert to a sparse scipy matrix."""
+        import scipy.sparse
+
         return scipy.sparse.coo_matrix(
             (self.values, (self.coords.rows, self.coords.cols)), shape=self.shape
         )
@@ -1,12 +1,21 @@
+import collections
 import contextlib
+import gzip
+import json
+import pathlib
+import re
 import time
 import warnings
-from typing import Generator, TypeVar
+from typing import TYPE_CHECKING, Dict, Generator, List, Optional, TypeVar, Union
 
 import jax
 import termcolor
 from jax import numpy as jnp
 
+if TYPE_CHECKING:
+    from .core import StackedFactorGraph, VariableAssignments
+    from .solvers import NonlinearSolverBase
+
 T = TypeVar("T")
 
 
@@ -31,3 +40,219 @@ def stopwatch(label: str = "unlabeled block") -> Generator[None, None, None]:
     yield
     print(f"{termcolor.colored(str(time.time() - start_time), attrs=['bold'])} seconds")
     print("========")
+
+
+def initialize_compilation_cache(
+    cache_dir: Union[str, pathlib.Path], min_compile_time_secs: float = 0.0
+) -> None:
+    """Enable JAX's persistent compilation cache, so compiled solves can be reused
+    across processes. Cache entries are keyed on the lowered XLA program; graphs and
+    solvers with the same `StackedFactorGraph.compute_structure_fingerprint()` will hit
+    the same entries.
+
+    Programs that contain host callbacks are never written to the cache. This
+    includes the default solver configuration: `CholmodSolver` (used directly or
+    chosen by `AutoLinearSolver`) and `verbose=True` both run on the host. For solves
+    to be cached, use `ConjugateGradientSolver` or `InexactStepConjugateGradientSolver`
+    with `verbose=False`. A warning is raised when a solve with a host callback is
+    compiled while the cache is enabled.
+
+    Some older JAX versions only support the cache on GPU and TPU backends, or, on
+    CPU, when `XLA_FLAGS=--xla_cpu_use_xla_runtime=true` is set.
+
+    Args:
+        cache_dir: Directory to read and write compiled executables from.
+        min_compile_time_secs: Only cache programs that take at least this long to
+            compile.
+    """
+    try:
+        jax.config.update("jax_compilation_cache_dir", str(cache_dir))
+    except AttributeError:
+        # Older JAX versions.
+        from jax.experimental.compilation_cache import compilation_cache
+
+        compilation_cache.initialize_cache(str(cache_dir))
+    jax.config.update(
+        "jax_persistent_cache_min_compile_time_secs", min_compile_time_secs
+    )
+
+
+def is_compilation_cache_enabled() -> bool:
+    """Check whether JAX's persistent compilation cache has been enabled, for example
+    via `initialize_compilation_cache()`."""
+    if getattr(jax.config, "jax_compilation_cache_dir", None):
+        return True
+
+    # Older JAX versions.
+    from jax.experimental.compilation_cache import compilation_cache
+
+    return compilation_cache.is_initialized()
+
+
+def warn_if_host_callback_is_uncached(source: str) -> None:
+    """Warn that a program being traced won't be written to the persistent compilation
+    cache, if the cache is enabled. Should be called when tracing host callbacks.
+
+    Args:
+        source: Description of what the host callback is used for.
+    """
+    if is_compilation_cache_enabled():
+        warnings.warn(
+            f"{source} runs via a host callback. Programs with host callbacks are never"
+            " written to the persistent compilation cache, so this solve will be"
+            " recompiled in every process. Use a conjugate gradient linear solver and"
+            " `verbose=False` for solves that can be cached.",
+            stacklevel=2,
+        )
+
+
+PROFILED_STAGES = (
+    "residuals",
+    "jacobians",
+    "linearize",
+    "whiten",
+    "assemble_jacobian",
+    "ATb",
+    "linear_subproblem",
+    "manifold_retract",
+    "convergence_check",
+)
+"""Names of `jax.named_scope` annotations placed around stages of the solve pipeline.
+Per-stack scopes inside of `residuals`, `jacobians`, and `linearize` are named
+`stack_{index}_{factor type}`. Solvers evaluate residuals and Jacobians together,
+under `linearize`."""
+
+
+def profile_solve(
+    graph: "StackedFactorGraph",
+    initial_assignments: "VariableAssignments",
+    solver: "NonlinearSolverBase",
+    log_dir: Union[str, pathlib.Path],
+) -> Dict[str, float]:
+    """Capture a profiler trace of a single solve, and summarize time spent in each
+    stage of the solve pipeline. The solve is run once before tracing, so compilation
+    is excluded. Traces are also written to `log_dir`, and can be opened with
+    TensorBoard or Perfetto.
+
+    On CPU, the solve is compiled with `xla_cpu_enable_xprof_traceme`, which emits a
+    trace event for each HLO instruction. These events only carry instruction names,
+    which are mapped back to `PROFILED_STAGES` scopes through the op name metadata of
+    the compiled module.
+
+    Raises:
+        RuntimeError: If no trace was written to `log_dir`, or if the trace contains no
+            per-op events, so stages can't be attributed.
+
+    Returns:
+        Seconds spent in each stage. See `summarize_trace()`.
+    """
+    compiler_options = (
+        {"xla_cpu_enable_xprof_traceme": True}
+        if jax.default_backend() == "cpu"
+        else None
+    )
+    compiled_solve = (
+        jax.jit(lambda solver, graph, assignments: solver.solve(graph, assignments))
+        .lower(solver, graph, initial_assignments)
+        .compile(compiler_options=compiler_options)
+    )
+    compiled_solve(solver, graph, initial_assignments).storage.block_until_ready()
+
+    log_dir = pathlib.Path(log_dir)
+    with jax.profiler.trace(str(log_dir), create_perfetto_trace=True):
+        compiled_solve(solver, graph, initial_assignments).storage.block_until_ready()
+
+    trace_paths = sorted(log_dir.glob("plugins/profile/*/perfetto_trace.json.gz"))
+    if len(trace_paths) == 0:
+        raise RuntimeError(f"No trace was written to {log_dir}.")
+    summary = summarize_trace(
+        trace_paths[-1],
+        op_name_from_hlo_name=get_op_names_from_hlo(compiled_solve.as_text()),
+    )
+    if summary["total"] == 0.0:
+        raise RuntimeError(
+            f"No per-op events were found in the trace in {log_dir}, so time can't be"
+            f" attributed to solve stages on the {jax.default_backend()} backend."
+        )
+    return summary
+
+
+def get_op_names_from_hlo(hlo_text: str) -> Dict[str, str]:
+    """Map HLO instruction names to their op name metadata, which contains the
+    `jax.named_scope` path of each instruction."""
+    return dict(_HLO_OP_NAME_PATTERN.findall(hlo_text))
+
+
+_HLO_OP_NAME_PATTERN = re.compile(
+    r"^\s*(?:ROOT\s+)?%?([\w.\-]+) = .*?metadata=\{[^}]*?op_name=\"([^\"]*)\"",
+    re.MULTILINE,
+)
+
+
+def summarize_trace(
+    trace_path: Union[str, pathlib.Path],
+    op_name_from_hlo_name: Optional[Dict[str, str]] = None,
+) -> Dict[str, float]:
+    """Summarize device time per solve stage from a Chrome/Perfetto JSON trace.
+
+    Each op event is attributed to the scope path made from the `PROFILED_STAGES` and
+    per-stack segments of its op name; for example, a whitening op for the first factor
+    stack is attributed to `jacobians/stack_0_BetweenFactor/whiten`. Time is counted
+    exclusively: outer stages exclude time from nested stages.
+
+    Args:
+        trace_path: Path to the trace.
+        op_name_from_hlo_name: Op names for events that are named after HLO
+            instructions, but don't carry op names in their args. This is the case
+            for CPU traces. See `get_op_names_from_hlo()`.
+
+    Returns:
+        Seconds spent in each stage, sorted from slowest to fastest. Op events outside
+        of any stage are reported as `other`, and the sum of all op events as `total`.
+    """
+    trace_path = pathlib.Path(trace_path)
+    open_fn = gzip.open if trace_path.suffix == ".gz" else open
+    with open_fn(trace_path, "rt") as f:  # type: ignore
+        trace = json.load(f)
+    events = trace["traceEvents"] if isinstance(trace, dict) else trace
+
+    seconds_from_stage: Dict[str, float] = collections.defaultdict(float)
+    for event in events:
+        if event.get("ph") != "X" or "dur" not in event:
+            continue
+        stage = _get_stage_from_trace_event(event, op_name_from_hlo_name or {})
+        if stage is None:
+            continue
+        seconds_from_stage[stage] += event["dur"] * 1e-6
+
+    out = dict(sorted(seconds_from_stage.items(), key=lambda item: -item[1]))
+    out["total"] = sum(seconds_from_stage.values(), 0.0)
+    return out
+
+
+def _get_stage_from_trace_event(
+    event: dict, op_name_from_hlo_name: Dict[str, str]
+) -> Optional[str]:
+    """Returns a stage for op events, `other` for op events outside of any stage, and
+    `None` for events that don't correspond to XLA ops."""
+    args = event.get("args", {})
+    name = event.get("name", "")
+    candidates = [name, op_name_from_hlo_name.get(name, "")] + [
+        value for value in args.values() if isinstance(value, str)
+    ]
+    for candidate in candidates:
+        segments = candidate.split("/")
+        stage_segments: List[str] = [
+            segment
+            for segment in segments
+            if segment in PROFILED_STAGES or segment.startswith("stack_")
+        ]
+        if len(stage_segments) > 0:
+            return "/".join(stage_segments)
+
+    # XLA op events carry their HLO op or scope path in args
+    if name in op_name_from_hlo_name or any(
+        key in args for key in ("hlo_op", "tf_op", "long_name")
+    ):
+        return "other"
+    return None
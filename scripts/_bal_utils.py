@@ -0,0 +1,261 @@
+"""Helpers for Bundle Adjustment in the Large (BAL) problems.
+
+File format reference: https://grail.cs.washington.edu/projects/bal/
+
+Each camera is parameterized by an angle-axis rotation, a translation, a focal length,
+and two radial distortion terms. A world point `X` is projected by computing
+`P = R @ X + t`, `p = -P[:2] / P[2]`, and `f * (1 + k1 * |p|^2 + k2 * |p|^4) * p`.
+"""
+
+import dataclasses
+import pathlib
+from typing import List, NamedTuple
+
+import jax
+import jax_dataclasses as jdc
+import jaxlie
+import numpy as onp
+from jax import numpy as jnp
+from overrides import overrides
+
+import jaxfg
+
+
+@jdc.pytree_dataclass
+class BalCamera:
+    T_camera_world: jaxlie.SE3
+    """Camera extrinsics."""
+
+    intrinsics: jnp.ndarray
+    """Focal length and radial distortion terms: `(f, k1, k2)`."""
+
+
+class BalCameraVariable(jaxfg.core.VariableBase[BalCamera]):
+    """Camera variable. Poses are updated on SE(3), intrinsics in Euclidean space."""
+
+    @classmethod
+    @overrides
+    def get_default_value(cls) -> BalCamera:
+        return BalCamera(
+            T_camera_world=jaxlie.SE3.identity(),
+            intrinsics=jnp.array([1.0, 0.0, 0.0]),
+        )
+
+    @classmethod
+    @overrides
+    def get_local_parameter_dim(cls) -> int:
+        return jaxlie.SE3.tangent_dim + 3
+
+    @classmethod
+    @overrides
+    def manifold_retract(
+        cls, x: BalCamera, local_delta: jaxfg.hints.LocalVariableValue
+    ) -> BalCamera:
+        return BalCamera(
+            T_camera_world=jaxlie.manifold.rplus(
+                x.T_camera_world, local_delta[: jaxlie.SE3.tangent_dim]
+            ),
+            intrinsics=x.intrinsics + local_delta[jaxlie.SE3.tangent_dim :],
+        )
+
+
+class PointVariable(jaxfg.core.RealVectorVariable[3]):
+    """World-frame landmark position."""
+
+
+class ReprojectionValueTuple(NamedTuple):
+    camera: BalCamera
+    point: jnp.ndarray
+
+
+@jdc.pytree_dataclass
+class ReprojectionFactor(jaxfg.core.FactorBase[ReprojectionValueTuple]):
+    """Difference between a projected point and its observed pixel coordinates."""
+
+    observation: jnp.ndarray
+    """Observed image coordinates. Shape should be `(2,)`."""
+
+    @overrides
+    def compute_residual_vector(
+        self, variable_values: ReprojectionValueTuple
+    ) -> jnp.ndarray:
+        camera = variable_values.camera
+        point_camera = camera.T_camera_world @ variable_values.point
+        p = -point_camera[:2] / point_camera[2]
+        f, k1, k2 = camera.intrinsics
+        squared_norm = jnp.sum(p**2)
+        distortion = 1.0 + k1 * squared_norm + k2 * squared_norm**2
+        return f * distortion * p - self.observation
+
+
+@dataclasses.dataclass
+class BalData:
+    camera_variables: List[BalCameraVariable]
+    """Camera variables, ordered by their BAL index."""
+
+    point_variables: List[PointVariable]
+    """Point variables, ordered by their BAL index."""
+
+    initial_cameras: BalCamera
+    """Initial camera values, stacked."""
+
+    initial_points: onp.ndarray
+    """Initial point positions. Shape should be `(num_points, 3)`."""
+
+    observation_indices: onp.ndarray
+    """Camera and point indices for each observation. Shape should be
+    `(num_observations, 2)`."""
+
+    observations: onp.ndarray
+    """Observed image coordinates. Shape should be `(num_observations, 2)`."""
+
+    def make_factors(self) -> List[jaxfg.core.FactorBatch]:
+        """Create a single pre-stacked batch of reprojection factors."""
+        return [
+            jaxfg.core.FactorBatch(
+                factor=ReprojectionFactor(
+                    variables=(
+                        BalCameraVariable.canonical_instance(),
+                        PointVariable.canonical_instance(),
+                    ),
+                    observation=self.observations,
+                    noise_model=jaxfg.noises.DiagonalGaussian(onp.ones(2)),
+                ),
+                variables=(
+                    [self.camera_variables[i] for i in self.observation_indices[:, 0]],
+                    [self.point_variables[i] for i in self.observation_indices[:, 1]],
+                ),
+                shared_fields=("noise_model",),
+            )
+        ]
+
+    def make_initial_assignments(self) -> jaxfg.core.VariableAssignments:
+        """Create initial assignments for camera and point variables."""
+        return jaxfg.core.VariableAssignments.make_from_stacked(
+            self.camera_variables + self.point_variables,
+            {
+                BalCameraVariable: self.initial_cameras,
+                PointVariable: self.initial_points,
+            },
+        )
+
+
+def parse_bal(path: pathlib.Path) -> BalData:
+    """Parse a BAL file. The whole file is read as one flat array of numbers, which is
+    then sliced into observations, cameras, and points."""
+    values = onp.fromfile(path, sep=" ")
+    num_cameras, num_points, num_observations = values[:3].astype(onp.int64)
+    offset = 3
+
+    observation_records = values[offset : offset + num_observations * 4].reshape(
+        (num_observations, 4)
+    )
+    offset += num_observations * 4
+
+    camera_records = values[offset : offset + num_cameras * 9].reshape((num_cameras, 9))
+    offset += num_cameras * 9
+
+    points = values[offset : offset + num_points * 3].reshape((num_points, 3))
+    offset += num_points * 3
+    assert offset == values.shape[0], "Unexpected BAL file length"
+
+    return BalData(
+        camera_variables=[BalCameraVariable() for _ in range(num_cameras)],
+        point_variables=[PointVariable() for _ in range(num_points)],
+        initial_cameras=BalCamera(
+            T_camera_world=_se3_from_angle_axis_translation(camera_records[:, 0:6]),
+            intrinsics=camera_records[:, 6:9],
+        ),
+        initial_points=points,
+        observation_indices=observation_records[:, 0:2].astype(onp.int64),
+        observations=observation_records[:, 2:4],
+    )
+
+
+def write_synthetic_bal(
+    path: pathlib.Path,
+    num_cameras: int,
+    num_points: int,
+    observations_per_point: int,
+    seed: int = 0,
+) -> None:
+    """Write a random BAL problem: cameras placed around the origin, looking at a cloud
+    of points. Observations are noisy projections of the ground-truth scene, while
+    camera and point values stored in the file are perturbed from it."""
+    assert observations_per_point <= num_cameras
+    rng = onp.random.default_rng(seed)
+
+    # Ground-truth scene. BAL cameras look down their negative z-axis, so we put
+    # points ~10 units in front of every camera.
+    angle_axis = rng.normal(scale=0.05, size=(num_cameras, 3))
+    translation = onp.array([0.0, 0.0, -10.0]) + rng.normal(
+        scale=0.5, size=(num_cameras, 3)
+    )
+    intrinsics = onp.tile(onp.array([500.0, 0.0, 0.0]), (num_cameras, 1))
+    points = rng.uniform(low=-1.0, high=1.0, size=(num_points, 3))
+
+    # Each point is seen by a random subset of cameras
+    camera_indices = onp.argsort(rng.uniform(size=(num_points, num_cameras)), axis=-1)[
+        :, :observations_per_point
+    ].reshape((-1,))
+    point_indices = onp.repeat(onp.arange(num_points), observations_per_point)
+    order = onp.lexsort((point_indices, camera_indices))
+    camera_indices = camera_indices[order]
+    point_indices = point_indices[order]
+
+    # Project
+    T_camera_world = _se3_from_angle_axis_translation(
+        onp.concatenate([angle_axis, translation], axis=-1)
+    )
+    rotation = onp.asarray(jax.vmap(lambda T: T.rotation().as_matrix())(T_camera_world))
+    point_camera = (
+        onp.einsum("nij,nj->ni", rotation[camera_indices], points[point_indices])
+        + translation[camera_indices]
+    )
+    observations = 500.0 * -point_camera[:, :2] / point_camera[:, 2:3]
+    observations += rng.normal(scale=0.5, size=observations.shape)
+
+    # Perturb initial values
+    cameras = onp.concatenate([angle_axis, translation, intrinsics], axis=-1)
+    cameras[:, :6] += rng.normal(scale=0.01, size=(num_cameras, 6))
+    points = points + rng.normal(scale=0.05, size=points.shape)
+
+    with open(path, "w") as file:
+        file.write(f"{num_cameras} {num_points} {len(observations)}\n")
+        onp.savetxt(
+            file,
+            onp.concatenate(
+                [camera_indices[:, None], point_indices[:, None], observations],
+                axis=-1,
+            ),
+            fmt="%d %d %.9g %.9g",
+        )
+        onp.savetxt(file, cameras.reshape((-1, 1)), fmt="%.9g")
+        onp.savetxt(file, points.reshape((-1, 1)), fmt="%.9g")
+
+
+def _se3_from_angle_axis_translation(records: onp.ndarray) -> jaxlie.SE3:
+    """Build SE(3) objects from stacked `(angle-axis, translation)` rows, in NumPy."""
+    angle_axis = records[:, 0:3]
+    translation = records[:, 3:6]
+    theta = onp.linalg.norm(angle_axis, axis=-1, keepdims=True)
+    safe_theta = onp.where(theta == 0.0, 1.0, theta)
+    xyz = onp.where(
+        theta == 0.0,
+        0.5 * angle_axis,
+        onp.sin(safe_theta / 2.0) / safe_theta * angle_axis,
+    )
+    return jaxlie.SE3(
+        wxyz_xyz=onp.concatenate([onp.cos(theta / 2.0), xyz, translation], axis=-1)
+    )
+
+
+__all__ = [
+    "BalCamera",
+    "BalCameraVariable",
+    "BalData",
+    "PointVariable",
+    "ReprojectionFactor",
+    "parse_bal",
+    "write_synthetic_bal",
+]
@@ -1,139 +1,393 @@
 import dataclasses
 import pathlib
-from typing import Dict, List
+from typing import List, Optional, TextIO, Type, Union
 
 import jaxlie
 import numpy as onp
-from jax import numpy as jnp
-from tqdm.auto import tqdm
 
 import jaxfg
 
+# Number of numerical columns for each supported record type, after the tag.
+_COLUMN_COUNT_FROM_TAG = {
+    "VERTEX_SE2": 4,  # index x y theta
+    "EDGE_SE2": 11,  # index_a index_b x y theta + 6 upper-triangular information terms
+    "VERTEX_SE3:QUAT": 8,  # index x y z qx qy qz qw
+    "EDGE_SE3:QUAT": 30,  # index_a index_b x y z qx qy qz qw + 21 information terms
+}
+
 
 @dataclasses.dataclass
 class G2OData:
-    factors: List[jaxfg.core.FactorBase]
-    initial_poses: Dict[jaxfg.geometry.LieVariableBase, jaxlie.MatrixLieGroup]
+    pose_variables: List[jaxfg.geometry.LieVariableBase]
+    """Pose variables, ordered by their g2o vertex index."""
 
+    initial_poses: jaxlie.MatrixLieGroup
+    """Initial pose values, stacked. One per pose variable."""
 
-def parse_g2o(path: pathlib.Path, pose_count_limit: int = 100000) -> G2OData:
-    """Parse a G2O file. Creates a list of factors and dictionary of initial poses."""
+    edge_indices: onp.ndarray
+    """Pose indices for each edge. Shape should be `(num_edges, 2)`."""
 
-    with open(path) as file:
-        lines = [line.strip() for line in file.readlines()]
-
-    pose_variables: List[jaxfg.geometry.LieVariableBase] = []
-    initial_poses: Dict[jaxfg.geometry.LieVariableBase, jaxlie.MatrixLieGroup] = {}
-
-    factors: List[jaxfg.core.FactorBase] = []
-
-    for line in tqdm(lines):
-        parts = [part for part in line.split(" ") if part != ""]
-
-        variable: jaxfg.geometry.LieVariableBase
-        between: jaxlie.MatrixLieGroup
-
-        if parts[0] == "VERTEX_SE2":
-            if len(pose_variables) > pose_count_limit:
-                continue
-
-            # Create SE(2) variable
-            _, index, x, y, theta = parts
-            index = int(index)
-            x, y, theta = map(float, [x, y, theta])
-            assert len(initial_poses) == index
-            variable = jaxfg.geometry.SE2Variable()
-            initial_poses[variable] = jaxlie.SE2.from_xy_theta(x, y, theta)
-            pose_variables.append(variable)
-
-        elif parts[0] == "EDGE_SE2":
-            # Create relative offset between pair of SE(2) variables
-            before_index = int(parts[1])
-            after_index = int(parts[2])
-
-            if before_index > pose_count_limit or after_index > pose_count_limit:
-                continue
-
-            between = jaxlie.SE2.from_xy_theta(*(float(p) for p in parts[3:6]))
-
-            precision_matrix_components = onp.array(list(map(float, parts[6:])))
-            precision_matrix = onp.zeros((3, 3))
-            precision_matrix[onp.triu_indices(3)] = precision_matrix_components
-            precision_matrix = precision_matrix.T
-            precision_matrix[onp.triu_indices(3)] = precision_matrix_components
-            sqrt_precision_matrix = onp.linalg.cholesky(precision_matrix).T
-
-            factors.append(
-                jaxfg.geometry.BetweenFactor.make(
-                    variable_T_world_a=pose_variables[before_index],
-                    variable_T_world_b=pose_variables[after_index],
-                    T_a_b=between,
-                    noise_model=jaxfg.noises.Gaussian(
-                        sqrt_precision_matrix=sqrt_precision_matrix
-                    ),
-                )
+    T_a_b: jaxlie.MatrixLieGroup
+    """Relative transforms for each edge, stacked."""
+
+    sqrt_precision_matrices: onp.ndarray
+    """Upper-triangular square root information matrices for each edge. Shape should
+    be `(num_edges, tangent_dim, tangent_dim)`."""
+
+    def make_factors(
+        self, huber_delta: Optional[float] = None
+    ) -> List[Union[jaxfg.core.FactorBase, jaxfg.core.FactorBatch]]:
+        """Create factors: one pre-stacked batch of between factors, plus a prior for
+        anchoring the first pose.
+
+        Args:
+            huber_delta: If set, a Huber loss is applied to all factors.
+        """
+        num_edges = self.edge_indices.shape[0]
+        noise_model: jaxfg.noises.NoiseModelBase = jaxfg.noises.Gaussian(
+            sqrt_precision_matrix=self.sqrt_precision_matrices
+        )
+        if huber_delta is not None:
+            noise_model = jaxfg.noises.HuberWrapper(
+                wrapped=noise_model, delta=onp.full(num_edges, huber_delta)
             )
 
-        elif parts[0] == "VERTEX_SE3:QUAT":
-            # Create SE(3) variable
-            _, index, x, y, z, qx, qy, qz, qw = parts
-            index = int(index)
-            assert len(initial_poses) == index
-            variable = jaxfg.geometry.SE3Variable()
-            initial_poses[variable] = jaxlie.SE3(
-                wxyz_xyz=onp.array(list(map(float, [qw, qx, qy, qz, x, y, z])))  # type: ignore
+        variable_type = type(self.pose_variables[0])
+        between_factors = jaxfg.core.FactorBatch(
+            factor=jaxfg.geometry.BetweenFactor(
+                variables=(variable_type.canonical_instance(),) * 2,
+                T_a_b=self.T_a_b,
+                noise_model=noise_model,
+            ),
+            variables=(
+                [self.pose_variables[i] for i in self.edge_indices[:, 0]],
+                [self.pose_variables[i] for i in self.edge_indices[:, 1]],
+            ),
+        )
+
+        # Anchor start pose
+        prior_noise_model: jaxfg.noises.NoiseModelBase = jaxfg.noises.DiagonalGaussian(
+            onp.ones(variable_type.get_local_parameter_dim()) * 100.0
+        )
+        if huber_delta is not None:
+            prior_noise_model = jaxfg.noises.HuberWrapper(
+                wrapped=prior_noise_model, delta=huber_delta
             )
-            pose_variables.append(variable)
+        prior_factor = jaxfg.geometry.PriorFactor.make(
+            variable=self.pose_variables[0],
+            mu=type(self.initial_poses)(self.initial_poses.parameters()[0]),
+            noise_model=prior_noise_model,
+        )
+        return [between_factors, prior_factor]
 
-        elif parts[0] == "EDGE_SE3:QUAT":
-            # Create relative offset between pair of SE(3) variables
-            before_index = int(parts[1])
-            after_index = int(parts[2])
+    def make_initial_assignments(self) -> jaxfg.core.VariableAssignments:
+        """Create initial assignments for our pose variables."""
+        return jaxfg.core.VariableAssignments.make_from_stacked(
+            self.pose_variables, {type(self.pose_variables[0]): self.initial_poses}
+        )
 
-            numerical_parts = list(map(float, parts[3:]))
-            assert len(numerical_parts) == 7 + 21
 
-            #  between = jaxlie.SE3.from_xy_theta(*(float(p) for p in parts[3:6]))
+def parse_g2o(path: pathlib.Path, pose_count_limit: int = 100000) -> G2OData:
+    """Parse a G2O file. Lines are classified by record type, and each type is parsed
+    in a single vectorized pass; no per-edge Python objects are created."""
 
-            xyz = numerical_parts[0:3]
-            quaternion = numerical_parts[3:7]
-            between = jaxlie.SE3.from_rotation_and_translation(
-                rotation=jaxlie.SO3.from_quaternion_xyzw(onp.array(quaternion)),
-                translation=onp.array(xyz),
-            )
+    with open(path) as file:
+        lines = onp.array([line.strip() for line in file.read().splitlines()])
+    lines = lines[lines != ""]
+    tags = onp.char.partition(lines, " ")[:, 0]
 
-            precision_matrix = onp.zeros((6, 6))
-            precision_matrix[onp.triu_indices(6)] = numerical_parts[7:]
-            precision_matrix = precision_matrix.T
-            precision_matrix[onp.triu_indices(6)] = numerical_parts[7:]
-
-            sqrt_precision_matrix = onp.linalg.cholesky(precision_matrix).T
-
-            factors.append(
-                jaxfg.geometry.BetweenFactor.make(
-                    variable_T_world_a=pose_variables[before_index],
-                    variable_T_world_b=pose_variables[after_index],
-                    T_a_b=between,
-                    noise_model=jaxfg.noises.Gaussian(
-                        sqrt_precision_matrix=sqrt_precision_matrix
-                    ),
-                )
-            )
-        else:
-            assert False, f"Unexpected line type: {parts[0]}"
-
-    # Anchor start pose
-    factors.append(
-        jaxfg.geometry.PriorFactor.make(
-            variable=pose_variables[0],
-            mu=initial_poses[pose_variables[0]],
-            noise_model=jaxfg.noises.DiagonalGaussian(
-                jnp.ones(pose_variables[0].get_local_parameter_dim()) * 100.0
+    unexpected_tags = set(onp.unique(tags)) - set(_COLUMN_COUNT_FROM_TAG.keys())
+    assert len(unexpected_tags) == 0, f"Unexpected line types: {unexpected_tags}"
+
+    def load_records(tag: str) -> onp.ndarray:
+        column_count = _COLUMN_COUNT_FROM_TAG[tag]
+        return onp.loadtxt(
+            lines[tags == tag],
+            usecols=range(1, column_count + 1),
+            ndmin=2,
+        ).reshape((-1, column_count))
+
+    # Parse vertices + edges
+    variable_type: Type[jaxfg.geometry.LieVariableBase]
+    initial_poses: jaxlie.MatrixLieGroup
+    T_a_b: jaxlie.MatrixLieGroup
+    if onp.any(tags == "VERTEX_SE2"):
+        assert not onp.any(tags == "VERTEX_SE3:QUAT"), "Mixed SE(2) and SE(3) poses"
+        variable_type = jaxfg.geometry.SE2Variable
+
+        vertices = load_records("VERTEX_SE2")
+        vertex_indices = vertices[:, 0].astype(onp.int64)
+        initial_poses = _se2_from_xy_theta(vertices[:, 1:4])
+
+        edges = load_records("EDGE_SE2")
+        edge_indices = edges[:, 0:2].astype(onp.int64)
+        T_a_b = _se2_from_xy_theta(edges[:, 2:5])
+        precision_components = edges[:, 5:]
+    else:
+        variable_type = jaxfg.geometry.SE3Variable
+
+        vertices = load_records("VERTEX_SE3:QUAT")
+        vertex_indices = vertices[:, 0].astype(onp.int64)
+        initial_poses = _se3_from_xyz_xyzw(vertices[:, 1:8])
+
+        edges = load_records("EDGE_SE3:QUAT")
+        edge_indices = edges[:, 0:2].astype(onp.int64)
+        T_a_b = _se3_from_xyz_xyzw(edges[:, 2:9])
+        precision_components = edges[:, 9:]
+
+    # Sort vertices and apply pose count limit
+    order = onp.argsort(vertex_indices, kind="stable")
+    vertex_indices = vertex_indices[order]
+    initial_poses = type(initial_poses)(initial_poses.parameters()[order])
+    assert onp.all(vertex_indices == onp.arange(len(vertex_indices)))
+
+    pose_mask = vertex_indices <= pose_count_limit
+    initial_poses = type(initial_poses)(initial_poses.parameters()[pose_mask])
+    edge_mask = onp.all(edge_indices <= pose_count_limit, axis=-1)
+    edge_indices = edge_indices[edge_mask]
+    T_a_b = type(T_a_b)(T_a_b.parameters()[edge_mask])
+    precision_components = precision_components[edge_mask]
+
+    # Build information matrices from upper-triangular terms, then take square roots
+    tangent_dim = variable_type.get_local_parameter_dim()
+    rows, cols = onp.triu_indices(tangent_dim)
+    precision_matrices = onp.zeros((len(edge_indices), tangent_dim, tangent_dim))
+    precision_matrices[:, rows, cols] = precision_components
+    precision_matrices[:, cols, rows] = precision_components
+    sqrt_precision_matrices = onp.swapaxes(
+        onp.linalg.cholesky(precision_matrices), -1, -2
+    )
+
+    return G2OData(
+        pose_variables=[variable_type() for _ in range(int(onp.sum(pose_mask)))],
+        initial_poses=initial_poses,
+        edge_indices=edge_indices,
+        T_a_b=T_a_b,
+        sqrt_precision_matrices=sqrt_precision_matrices,
+    )
+
+
+def write_g2o(
+    path: pathlib.Path,
+    graph: jaxfg.core.StackedFactorGraph,
+    assignments: jaxfg.core.VariableAssignments,
+) -> None:
+    """Write poses and between factors to a g2o file. Each record type is formatted in
+    a single bulk pass.
+
+    Vertex indices follow the order of `assignments.get_variables()`; for graphs built
+    from `parse_g2o()`, this matches the original file. Robust losses and priors are
+    not exported."""
+    pose_graph = _extract_pose_graph(graph, assignments)
+    upper_rows, upper_cols = onp.triu_indices(pose_graph.information_matrices.shape[-1])
+    information_terms = pose_graph.information_matrices[:, upper_rows, upper_cols]
+
+    if isinstance(pose_graph.poses, jaxlie.SE2):
+        vertex_tag, edge_tag = "VERTEX_SE2", "EDGE_SE2"
+        vertex_values = _xy_theta_from_se2(pose_graph.poses)
+        edge_values = _xy_theta_from_se2(pose_graph.T_a_b)
+    else:
+        assert isinstance(pose_graph.poses, jaxlie.SE3)
+        vertex_tag, edge_tag = "VERTEX_SE3:QUAT", "EDGE_SE3:QUAT"
+        vertex_values = _xyz_xyzw_from_se3(pose_graph.poses)
+        edge_values = _xyz_xyzw_from_se3(pose_graph.T_a_b)
+
+    with open(path, "w") as file:
+        _write_records(file, vertex_tag, pose_graph.vertex_ids[:, None], vertex_values)
+        _write_records(
+            file,
+            edge_tag,
+            pose_graph.edge_ids,
+            onp.concatenate([edge_values, information_terms], axis=-1),
+        )
+
+
+def write_toro(
+    path: pathlib.Path,
+    graph: jaxfg.core.StackedFactorGraph,
+    assignments: jaxfg.core.VariableAssignments,
+) -> None:
+    """Write poses and between factors to a TORO file. Same conventions as
+    `write_g2o()`; rotations are written as (roll, pitch, yaw) for SE(3)."""
+    pose_graph = _extract_pose_graph(graph, assignments)
+    information = pose_graph.information_matrices
+
+    if isinstance(pose_graph.poses, jaxlie.SE2):
+        vertex_tag, edge_tag = "VERTEX2", "EDGE2"
+        vertex_values = _xy_theta_from_se2(pose_graph.poses)
+        edge_values = _xy_theta_from_se2(pose_graph.T_a_b)
+
+        # TORO's 2D information ordering: I11 I12 I22 I33 I13 I23
+        information_terms = information[
+            :, onp.array([0, 0, 1, 2, 0, 1]), onp.array([0, 1, 1, 2, 2, 2])
+        ]
+    else:
+        assert isinstance(pose_graph.poses, jaxlie.SE3)
+        vertex_tag, edge_tag = "VERTEX3", "EDGE3"
+        vertex_values = _xyz_rpy_from_se3(pose_graph.poses)
+        edge_values = _xyz_rpy_from_se3(pose_graph.T_a_b)
+
+        upper_rows, upper_cols = onp.triu_indices(6)
+        information_terms = information[:, upper_rows, upper_cols]
+
+    with open(path, "w") as file:
+        _write_records(file, vertex_tag, pose_graph.vertex_ids[:, None], vertex_values)
+        _write_records(
+            file,
+            edge_tag,
+            pose_graph.edge_ids,
+            onp.concatenate([edge_values, information_terms], axis=-1),
+        )
+
+
+def _se2_from_xy_theta(xy_theta: onp.ndarray) -> jaxlie.SE2:
+    """Vectorized `jaxlie.SE2.from_xy_theta()`, in NumPy."""
+    x, y, theta = xy_theta.T
+    return jaxlie.SE2(
+        unit_complex_xy=onp.stack([onp.cos(theta), onp.sin(theta), x, y], axis=-1)
+    )
+
+
+def _se3_from_xyz_xyzw(xyz_xyzw: onp.ndarray) -> jaxlie.SE3:
+    """Build SE(3) objects from translations and xyzw quaternions, in NumPy."""
+    xyz = xyz_xyzw[:, 0:3]
+    xyzw = xyz_xyzw[:, 3:7]
+    return jaxlie.SE3(
+        wxyz_xyz=onp.concatenate([xyzw[:, 3:4], xyzw[:, 0:3], xyz], axis=-1)
+    )
+
+
+def _xy_theta_from_se2(T: jaxlie.SE2) -> onp.ndarray:
+    """Inverse of `_se2_from_xy_theta()`."""
+    cos, sin, x, y = onp.asarray(T.unit_complex_xy, dtype=onp.float64).T
+    return onp.stack([x, y, onp.arctan2(sin, cos)], axis=-1)
+
+
+def _xyz_xyzw_from_se3(T: jaxlie.SE3) -> onp.ndarray:
+    """Inverse of `_se3_from_xyz_xyzw()`."""
+    wxyz_xyz = onp.asarray(T.wxyz_xyz, dtype=onp.float64)
+    return onp.concatenate(
+        [wxyz_xyz[:, 4:7], wxyz_xyz[:, 1:4], wxyz_xyz[:, 0:1]], axis=-1
+    )
+
+
+def _xyz_rpy_from_se3(T: jaxlie.SE3) -> onp.ndarray:
+    """Translations and ZYX Euler angles from stacked SE(3) objects, in NumPy."""
+    wxyz_xyz = onp.asarray(T.wxyz_xyz, dtype=onp.float64)
+    w, x, y, z = wxyz_xyz[:, 0:4].T
+    roll = onp.arctan2(2.0 * (w * x + y * z), 1.0 - 2.0 * (x * x + y * y))
+    pitch = onp.arcsin(onp.clip(2.0 * (w * y - z * x), -1.0, 1.0))
+    yaw = onp.arctan2(2.0 * (w * z + x * y), 1.0 - 2.0 * (y * y + z * z))
+    return onp.concatenate(
+        [wxyz_xyz[:, 4:7], onp.stack([roll, pitch, yaw], axis=-1)], axis=-1
+    )
+
+
+def _write_records(
+    file: TextIO, tag: str, indices: onp.ndarray, values: onp.ndarray
+) -> None:
+    """Write one line per row: the tag, integer indices, then floating point values."""
+    assert indices.shape[0] == values.shape[0]
+    if indices.shape[0] == 0:
+        return
+    onp.savetxt(
+        file,
+        onp.concatenate([indices.astype(onp.float64), values], axis=-1),
+        fmt=" ".join([tag] + ["%d"] * indices.shape[-1] + ["%.9g"] * values.shape[-1]),
+    )
+
+
+@dataclasses.dataclass
+class _PoseGraphArrays:
+    """Vertices and edges pulled out of a pose graph, stacked."""
+
+    vertex_ids: onp.ndarray
+    poses: jaxlie.MatrixLieGroup
+    edge_ids: onp.ndarray
+    T_a_b: jaxlie.MatrixLieGroup
+    information_matrices: onp.ndarray
+
+
+def _extract_pose_graph(
+    graph: jaxfg.core.StackedFactorGraph,
+    assignments: jaxfg.core.VariableAssignments,
+) -> _PoseGraphArrays:
+    """Gather poses and between factors, with one array operation per variable type or
+    factor stack."""
+    variable_types = tuple(assignments.storage_layout.get_variable_types())
+    assert len(variable_types) == 1 and issubclass(
+        variable_types[0], jaxfg.geometry.LieVariableBase
+    ), "Only graphs with a single pose variable type can be exported"
+    (variable_type,) = variable_types
+    group_type = variable_type.get_group_type()
+    tangent_dim = variable_type.get_local_parameter_dim()
+
+    poses = assignments.get_stacked_value(variable_type)
+    vertex_count = assignments.storage_layout.count_from_variable_type[variable_type]
+    vertex_ids = onp.arange(vertex_count)
+
+    # Map storage indices in the graph's layout back to vertex IDs
+    id_from_storage_index = onp.full(graph.storage_layout.dim, -1, dtype=onp.int64)
+    id_from_storage_index[
+        onp.fromiter(
+            map(
+                graph.storage_layout.index_from_variable.__getitem__,
+                assignments.get_variables(),
             ),
+            dtype=onp.int64,
+            count=vertex_count,
+        )
+    ] = vertex_ids
+
+    edge_ids: List[onp.ndarray] = [onp.zeros((0, 2), dtype=onp.int64)]
+    T_a_b: List[onp.ndarray] = [onp.zeros((0, group_type.parameters_dim))]
+    information_matrices: List[onp.ndarray] = [onp.zeros((0, tangent_dim, tangent_dim))]
+    for stack in graph.factor_stacks:
+        if not isinstance(stack.factor, jaxfg.geometry.BetweenFactor):
+            continue
+        edge_ids.append(
+            onp.stack(
+                [
+                    id_from_storage_index[onp.asarray(value_indices)[:, 0]]
+                    for value_indices in stack.value_indices
+                ],
+                axis=-1,
+            )
         )
+
+        # Fields shared across the stack are stored without a factor axis.
+        factor = stack.get_unshared_factor()
+        T_a_b.append(onp.asarray(factor.T_a_b.parameters()))
+        information_matrices.append(
+            _information_matrices_from_noise_model(factor.noise_model)
+        )
+
+    return _PoseGraphArrays(
+        vertex_ids=vertex_ids,
+        poses=poses,
+        edge_ids=onp.concatenate(edge_ids, axis=0),
+        T_a_b=group_type(onp.concatenate(T_a_b, axis=0)),
+        information_matrices=onp.concatenate(information_matrices, axis=0),
     )
 
-    return G2OData(factors=factors, initial_poses=initial_poses)
+
+def _information_matrices_from_noise_model(
+    noise_model: jaxfg.noises.NoiseModelBase,
+) -> onp.ndarray:
+    """Stacked information matrices for a stacked noise model. Robust losses are
+    dropped."""
+    if isinstance(
+        noise_model, (jaxfg.noises.HuberWrapper, jaxfg.noises.GemanMcClureWrapper)
+    ):
+        return _information_matrices_from_noise_model(noise_model.wrapped)
+    elif isinstance(noise_model, jaxfg.noises.Gaussian):
+        sqrt_precision = onp.asarray(noise_model.sqrt_precision_matrix, onp.float64)
+        return onp.einsum("nji,njk->nik", sqrt_precision, sqrt_precision)
+    elif isinstance(noise_model, jaxfg.noises.DiagonalGaussian):
+        sqrt_precision = onp.asarray(noise_model.sqrt_precision_diagonal, onp.float64)
+        return sqrt_precision[:, :, None] ** 2 * onp.eye(sqrt_precision.shape[-1])
+    else:
+        assert False, f"Unsupported noise model: {type(noise_model)}"
 
 
-__all__ = ["G2OData", "parse_g2o"]
+__all__ = ["G2OData", "parse_g2o", "write_g2o", "write_toro"]
@@ -0,0 +1,170 @@
+"""Benchmark for bundle adjustment problems loaded from BAL files.
+
+If no BAL file is passed in, a small synthetic problem is generated. For a summary of
+options:
+
+    python bundle_adjustment_bal.py --help
+
+"""
+
+import dataclasses
+import enum
+import pathlib
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import jaxfg
+import tyro
+
+import _bal_utils
+
+
+class SolverType(enum.Enum):
+    GAUSS_NEWTON = enum.auto()
+    LEVENBERG_MARQUARDT = enum.auto()
+    DOGLEG = enum.auto()
+
+    def get_solver(
+        self, linear_solver: jaxfg.sparse.LinearSubproblemSolverBase
+    ) -> jaxfg.solvers.NonlinearSolverBase:
+        """Get solver corresponding to an enum."""
+        map: Dict[SolverType, jaxfg.solvers.NonlinearSolverBase] = {
+            SolverType.GAUSS_NEWTON: jaxfg.solvers.GaussNewtonSolver(
+                verbose=False, linear_solver=linear_solver
+            ),
+            SolverType.LEVENBERG_MARQUARDT: jaxfg.solvers.LevenbergMarquardtSolver(
+                verbose=False, linear_solver=linear_solver
+            ),
+            SolverType.DOGLEG: jaxfg.solvers.DoglegSolver(
+                verbose=False, linear_solver=linear_solver
+            ),
+        }
+        return map[self]
+
+
+class LinearSolverType(enum.Enum):
+    CHOLMOD = enum.auto()
+    CONJUGATE_GRADIENT = enum.auto()
+
+    def get_linear_solver(self) -> jaxfg.sparse.LinearSubproblemSolverBase:
+        """Get linear solver corresponding to an enum."""
+        map: Dict[LinearSolverType, jaxfg.sparse.LinearSubproblemSolverBase] = {
+            LinearSolverType.CHOLMOD: jaxfg.sparse.CholmodSolver(),
+            LinearSolverType.CONJUGATE_GRADIENT: jaxfg.sparse.ConjugateGradientSolver(),
+        }
+        return map[self]
+
+
+@dataclasses.dataclass
+class CliArgs:
+    bal_path: Optional[pathlib.Path] = None
+    """Path to BAL file. If not set, a synthetic problem is generated."""
+
+    solver_types: Tuple[SolverType, ...] = (SolverType.LEVENBERG_MARQUARDT,)
+    """Nonlinear solvers to benchmark."""
+
+    linear_solver_types: Tuple[LinearSolverType, ...] = (
+        LinearSolverType.CHOLMOD,
+        LinearSolverType.CONJUGATE_GRADIENT,
+    )
+    """Linear subproblem solvers to benchmark."""
+
+    synthetic_camera_count: int = 20
+    """Camera count for synthetic problems."""
+
+    synthetic_point_count: int = 500
+    """Point count for synthetic problems."""
+
+    synthetic_observations_per_point: int = 5
+    """Number of cameras that observe each synthetic point."""
+
+
+@dataclasses.dataclass(frozen=True)
+class BenchmarkResult:
+    solver_type: SolverType
+    linear_solver_type: LinearSolverType
+    compile_seconds: float
+    solve_seconds: float
+    final_cost: float
+
+
+def main() -> None:
+    # Parse CLI args
+    cli_args = tyro.cli(CliArgs)
+
+    # Read problem
+    with tempfile.TemporaryDirectory() as temp_dir:
+        bal_path = cli_args.bal_path
+        if bal_path is None:
+            bal_path = pathlib.Path(temp_dir) / "synthetic.bal"
+            with jaxfg.utils.stopwatch("Writing synthetic BAL file"):
+                _bal_utils.write_synthetic_bal(
+                    bal_path,
+                    num_cameras=cli_args.synthetic_camera_count,
+                    num_points=cli_args.synthetic_point_count,
+                    observations_per_point=cli_args.synthetic_observations_per_point,
+                )
+
+        with jaxfg.utils.stopwatch("Reading BAL file"):
+            bal: _bal_utils.BalData = _bal_utils.parse_bal(bal_path)
+            factors = bal.make_factors()
+
+    print(
+        f"{len(bal.camera_variables)} cameras, {len(bal.point_variables)} points,"
+        f" {len(bal.observations)} observations"
+    )
+
+    # Make factor graph
+    with jaxfg.utils.stopwatch("Making factor graph"):
+        graph = jaxfg.core.StackedFactorGraph.make(factors)
+
+    with jaxfg.utils.stopwatch("Making initial assignments"):
+        initial_assignments = bal.make_initial_assignments()
+    initial_cost = float(graph.compute_cost(initial_assignments)[0])
+
+    # Time each solver combination. Compilation and solving are measured separately.
+    results: List[BenchmarkResult] = []
+    for solver_type in cli_args.solver_types:
+        for linear_solver_type in cli_args.linear_solver_types:
+            solver = solver_type.get_solver(linear_solver_type.get_linear_solver())
+            name = f"{solver_type.name} + {linear_solver_type.name}"
+
+            start_time = time.time()
+            with jaxfg.utils.stopwatch(f"{name}: JIT compile"):
+                compiled_solver = graph.compile_solver(solver)
+            compile_seconds = time.time() - start_time
+
+            start_time = time.time()
+            with jaxfg.utils.stopwatch(f"{name}: solve (already compiled)"):
+                solution = compiled_solver.solve(initial_assignments)
+                solution.storage.block_until_ready()
+            solve_seconds = time.time() - start_time
+
+            results.append(
+                BenchmarkResult(
+                    solver_type=solver_type,
+                    linear_solver_type=linear_solver_type,
+                    compile_seconds=compile_seconds,
+                    solve_seconds=solve_seconds,
+                    final_cost=float(graph.compute_cost(solution)[0]),
+                )
+            )
+
+    # Summary
+    print()
+    print(f"Initial cost: {initial_cost:.6g}")
+    print(
+        f"{'Solver':<24} {'Linear solver':<24}"
+        f" {'Compile (s)':>12} {'Solve (s)':>12} {'Final cost':>12}"
+    )
+    for result in results:
+        print(
+            f"{result.solver_type.name:<24} {result.linear_solver_type.name:<24}"
+            f" {result.compile_seconds:>12.3f} {result.solve_seconds:>12.3f}"
+            f" {result.final_cost:>12.6g}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -48,35 +48,37 @@ class CliArgs:
     huber_delta: Optional[float] = None
     """Threshold for huber losses; if not set, a standard least-squares objective is used."""
 
+    compilation_cache_dir: Optional[pathlib.Path] = None
+    """If set, compiled solves are persisted here and reused across runs."""
+
+    output_path: Optional[pathlib.Path] = None
+    """If set, optimized poses are written here. Files ending in `.graph` are written in
+    TORO format; anything else is written as g2o."""
+
 
 def main() -> None:
     # Parse CLI args
     cli_args = tyro.cli(CliArgs)
+    if cli_args.compilation_cache_dir is not None:
+        jaxfg.utils.initialize_compilation_cache(cli_args.compilation_cache_dir)
 
     # Read graph
     with jaxfg.utils.stopwatch("Reading g2o file"):
         g2o: _g2o_utils.G2OData = _g2o_utils.parse_g2o(cli_args.g2o_path)
 
         # Use Huber loss if applicable.
-        if cli_args.huber_delta is not None:
-
-            def wrap_huber(factor: jaxfg.core.FactorBase) -> jaxfg.core.FactorBase:
-                """Apply a Huber loss to an existing factor."""
-                return dataclasses.replace(
-                    factor,
-                    noise_model=jaxfg.noises.HuberWrapper(
-                        wrapped=factor.noise_model, delta=cli_args.huber_delta
-                    ),
-                )
-
-            g2o = dataclasses.replace(g2o, factors=list(map(wrap_huber, g2o.factors)))
+        factors = g2o.make_factors(huber_delta=cli_args.huber_delta)
 
     # Make factor graph
     with jaxfg.utils.stopwatch("Making factor graph"):
-        graph = jaxfg.core.StackedFactorGraph.make(g2o.factors)
+        graph = jaxfg.core.StackedFactorGraph.make(factors)
+    print(
+        "Structure fingerprint:",
+        graph.compute_structure_fingerprint(cli_args.solver_type.get_solver()),
+    )
 
     with jaxfg.utils.stopwatch("Making initial poses"):
-        initial_poses = jaxfg.core.VariableAssignments.make_from_dict(g2o.initial_poses)
+        initial_poses = g2o.make_initial_assignments()
 
     # Time solver
     if not isinstance(
@@ -107,6 +109,14 @@ def main() -> None:
         )
         solution_poses.storage.block_until_ready()
 
+    # Export
+    if cli_args.output_path is not None:
+        with jaxfg.utils.stopwatch(f"Writing {cli_args.output_path}"):
+            if cli_args.output_path.suffix == ".graph":
+                _g2o_utils.write_toro(cli_args.output_path, graph, solution_poses)
+            else:
+                _g2o_utils.write_g2o(cli_args.output_path, graph, solution_poses)
+
     # Plot
     plt.figure()
 
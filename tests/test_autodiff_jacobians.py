@@ -0,0 +1,191 @@
+from typing import NamedTuple
+
+import jax
+import jax_dataclasses as jdc
+import jaxlie
+import numpy as onp
+import pytest
+from jax import numpy as jnp
+from overrides import overrides
+
+import jaxfg
+
+
+class _PointValueTuple(NamedTuple):
+    T_world_camera: jaxlie.SE3
+    point: jnp.ndarray
+
+
+@jdc.pytree_dataclass
+class _PointFactor(jaxfg.core.FactorBase[_PointValueTuple]):
+    """Factor without analytical Jacobians."""
+
+    observation: jnp.ndarray
+
+    @overrides
+    def compute_residual_vector(self, variable_values: _PointValueTuple) -> jnp.ndarray:
+        point_camera = variable_values.T_world_camera.inverse() @ variable_values.point
+        return point_camera[:2] / point_camera[2] - self.observation
+
+
+@jdc.pytree_dataclass
+class _ReversePointFactor(_PointFactor):
+    jacobian_mode = jaxfg.core.JacobianMode.REVERSE
+
+
+@jdc.pytree_dataclass
+class _ForwardPointFactor(_PointFactor):
+    jacobian_mode = jaxfg.core.JacobianMode.FORWARD
+
+
+def test_autodiff_jacobians() -> None:
+    """Default Jacobians should match differentiating through retractions."""
+    factor = _PointFactor(
+        variables=(
+            jaxfg.geometry.SE3Variable(),
+            jaxfg.core.RealVectorVariable[3](),
+        ),
+        observation=jnp.array([0.1, -0.2]),
+        noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(2)),
+    )
+    variable_values = factor.build_variable_value_tuple(
+        (
+            jaxlie.SE3.exp(onp.random.randn(6) * 0.1),
+            jnp.array([0.5, -0.3, 4.0]),
+        )
+    )
+
+    def compute_residual_from_local(local_deltas):
+        return factor.compute_residual_vector(
+            factor.build_variable_value_tuple(
+                tuple(
+                    type(variable).manifold_retract(value, local_delta)
+                    for variable, value, local_delta in zip(
+                        factor.variables, variable_values, local_deltas
+                    )
+                )
+            )
+        )
+
+    expected_jacobians = jax.jacfwd(compute_residual_from_local)(
+        tuple(jnp.zeros(v.get_local_parameter_dim()) for v in factor.variables)
+    )
+    jacobians = factor.compute_residual_jacobians(variable_values)
+
+    assert len(jacobians) == len(expected_jacobians)
+    for jacobian, expected, variable in zip(
+        jacobians, expected_jacobians, factor.variables
+    ):
+        assert jacobian.shape == (2, variable.get_local_parameter_dim())
+        onp.testing.assert_allclose(jacobian, expected, rtol=1e-5, atol=1e-5)
+
+
+def test_compute_whitened_residual_and_jacobian() -> None:
+    """Fused residual and Jacobian evaluation should match separate evaluation, in
+    both autodiff modes."""
+    pose_variables = [jaxfg.geometry.SE3Variable() for _ in range(3)]
+    point_variable = jaxfg.core.RealVectorVariable[3]()
+    factors = [
+        jaxfg.geometry.BetweenFactor.make(
+            variable_T_world_a=pose_variables[i],
+            variable_T_world_b=pose_variables[i + 1],
+            T_a_b=jaxlie.SE3.exp(onp.random.randn(6)),
+            noise_model=jaxfg.noises.HuberWrapper(
+                wrapped=jaxfg.noises.DiagonalGaussian(jnp.ones(6)), delta=0.5
+            ),
+        )
+        for i in range(len(pose_variables) - 1)
+    ] + [
+        factor_type(
+            variables=(pose_variable, point_variable),
+            observation=jnp.array(onp.random.randn(2)),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(2) * 2.0),
+        )
+        for factor_type in (_PointFactor, _ReversePointFactor)
+        for pose_variable in pose_variables
+    ]
+    graph = jaxfg.core.StackedFactorGraph.make(factors)
+    assignments = jaxfg.core.VariableAssignments.make_from_dict(
+        {
+            **{
+                variable: jaxlie.SE3.exp(onp.random.randn(6) * 0.1)
+                for variable in pose_variables
+            },
+            point_variable: jnp.array([0.1, 0.2, 5.0]),
+        }
+    )
+
+    residual_vector, A = graph.compute_whitened_residual_and_jacobian(assignments)
+    expected_residual_vector = graph.compute_whitened_residual_vector(assignments)
+    expected_A = graph.compute_whitened_residual_jacobian(
+        assignments, expected_residual_vector
+    )
+    onp.testing.assert_allclose(
+        residual_vector, expected_residual_vector, rtol=1e-5, atol=1e-5
+    )
+    onp.testing.assert_allclose(A.values, expected_A.values, rtol=1e-5, atol=1e-5)
+    onp.testing.assert_array_equal(A.coords.rows, expected_A.coords.rows)
+    onp.testing.assert_array_equal(A.coords.cols, expected_A.coords.cols)
+
+
+def test_jacobian_modes() -> None:
+    """Forward- and reverse-mode Jacobians should match."""
+    variables = (jaxfg.geometry.SE3Variable(), jaxfg.core.RealVectorVariable[3]())
+    observation = jnp.array([0.1, -0.2])
+    noise_model = jaxfg.noises.DiagonalGaussian(jnp.ones(2))
+    forward_factor = _ForwardPointFactor(
+        variables=variables, observation=observation, noise_model=noise_model
+    )
+    reverse_factor = _ReversePointFactor(
+        variables=variables, observation=observation, noise_model=noise_model
+    )
+
+    # Residual dimension is 2, total local dimension is 9.
+    assert (
+        _PointFactor(
+            variables=variables, observation=observation, noise_model=noise_model
+        ).get_jacobian_mode()
+        is jaxfg.core.JacobianMode.FORWARD
+    )
+    assert forward_factor.get_jacobian_mode() is jaxfg.core.JacobianMode.FORWARD
+    assert reverse_factor.get_jacobian_mode() is jaxfg.core.JacobianMode.REVERSE
+
+    variable_values = forward_factor.build_variable_value_tuple(
+        (
+            jaxlie.SE3.exp(onp.random.randn(6) * 0.1),
+            jnp.array([0.5, -0.3, 4.0]),
+        )
+    )
+    (
+        forward_residual,
+        forward_jacobians,
+    ) = forward_factor.compute_residual_vector_and_jacobians(variable_values)
+    (
+        reverse_residual,
+        reverse_jacobians,
+    ) = reverse_factor.compute_residual_vector_and_jacobians(variable_values)
+
+    onp.testing.assert_allclose(forward_residual, reverse_residual)
+    assert len(forward_jacobians) == len(reverse_jacobians)
+    for forward_jacobian, reverse_jacobian in zip(forward_jacobians, reverse_jacobians):
+        assert forward_jacobian.shape == reverse_jacobian.shape
+        onp.testing.assert_allclose(
+            forward_jacobian, reverse_jacobian, rtol=1e-5, atol=1e-5
+        )
+
+
+def test_build_variable_value_tuple() -> None:
+    """Value tuples should be built from cached type hints, and still be validated."""
+    factor = _PointFactor(
+        variables=(jaxfg.geometry.SE3Variable(), jaxfg.core.RealVectorVariable[3]()),
+        observation=jnp.array([0.1, -0.2]),
+        noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(2)),
+    )
+    for _ in range(2):
+        variable_values = factor.build_variable_value_tuple(
+            (jaxlie.SE3.identity(), jnp.zeros(3))
+        )
+        assert isinstance(variable_values, _PointValueTuple)
+
+    with pytest.raises(AssertionError):
+        factor.build_variable_value_tuple((jaxlie.SO3.identity(), jnp.zeros(3)))
@@ -0,0 +1,44 @@
+import json
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).absolute().parent.parent / "benchmarks"))
+import _benchmark_utils  # noqa: E402
+
+
+def test_read_results_without_problem_sizes(tmp_path: pathlib.Path) -> None:
+    """Baselines written before problem sizes were recorded should still load, and be
+    comparable against new results."""
+    old_result = {
+        "key": "sphere2500/GAUSS_NEWTON/CHOLMOD",
+        "problem_name": "sphere2500",
+        "solver": "GAUSS_NEWTON",
+        "linear_solver": "CHOLMOD",
+        "build_seconds": 1.0,
+        "compile_seconds": 2.0,
+        "first_iteration_seconds": 0.5,
+        "steady_state_seconds": 1.0,
+        "peak_rss_mb": 500.0,
+        "initial_cost": 100.0,
+        "final_cost": 1.0,
+    }
+    baseline_path = tmp_path / "baseline.json"
+    baseline_path.write_text(
+        json.dumps({"metadata": {}, "results": [old_result]}, indent=2)
+    )
+
+    (baseline_result,) = _benchmark_utils.read_results(baseline_path)
+    assert baseline_result.num_variables is None
+    assert baseline_result.num_factors is None
+
+    result = _benchmark_utils.BenchmarkResult(
+        **{**old_result, "build_seconds": 2.0}, num_variables=2500, num_factors=9799
+    )
+    result_path = tmp_path / "results.json"
+    _benchmark_utils.write_results(result_path, [result], metadata={})
+    assert _benchmark_utils.read_results(result_path) == [result]
+
+    regressions = _benchmark_utils.compare_results(
+        [result], [baseline_result], time_tolerance=0.2, cost_tolerance=0.01
+    )
+    assert len(regressions) == 1 and "build_seconds" in regressions[0]
@@ -0,0 +1,90 @@
+import inspect
+import os
+import pathlib
+import subprocess
+import sys
+
+import jax
+from jax._src import compiler
+
+_SOLVE_SCRIPT = """
+import logging
+import sys
+
+import jaxlie
+from jax import numpy as jnp
+
+import jaxfg
+
+logging.basicConfig()
+logging.getLogger("jax._src.compiler").setLevel(logging.INFO)
+jaxfg.utils.initialize_compilation_cache(sys.argv[1])
+
+pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(2)]
+graph = jaxfg.core.StackedFactorGraph.make(
+    [
+        jaxfg.geometry.PriorFactor.make(
+            variable=pose_variables[0],
+            mu=jaxlie.SE2.identity(),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+        ),
+        jaxfg.geometry.BetweenFactor.make(
+            variable_T_world_a=pose_variables[0],
+            variable_T_world_b=pose_variables[1],
+            T_a_b=jaxlie.SE2.from_xy_theta(1.0, 0.0, 0.2),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+        ),
+    ]
+)
+solver = jaxfg.solvers.GaussNewtonSolver(
+    verbose=sys.argv[2] == "verbose",
+    linear_solver=jaxfg.sparse.ConjugateGradientSolver(),
+)
+graph.solve(
+    jaxfg.core.VariableAssignments.make_from_defaults(graph.get_variables()),
+    solver=solver,
+).storage.block_until_ready()
+"""
+
+
+def _run_solve(cache_dir: pathlib.Path, mode: str) -> str:
+    """Solve a small graph in a fresh process. Returns stderr."""
+    env = dict(os.environ)
+
+    # Older JAX versions only support the persistent cache on CPU with XLA runtime.
+    if (
+        jax.default_backend() == "cpu"
+        and "xla_cpu_use_xla_runtime" in inspect.getsource(compiler)
+    ):
+        env["XLA_FLAGS"] = (
+            env.get("XLA_FLAGS", "") + " --xla_cpu_use_xla_runtime=true"
+        ).strip()
+    return subprocess.run(
+        [sys.executable, "-c", _SOLVE_SCRIPT, str(cache_dir), mode],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+
+
+def _count_solve_entries(cache_dir: pathlib.Path) -> int:
+    return len(list(cache_dir.glob("jit_solve*")))
+
+
+def test_compilation_cache(tmp_path: pathlib.Path) -> None:
+    """Solves without host callbacks should be reused across processes; solves with
+    them should warn."""
+    cache_dir = tmp_path / "cache"
+
+    # Conjugate gradient without printing: written once, then read back.
+    _run_solve(cache_dir, "quiet")
+    assert _count_solve_entries(cache_dir) == 1
+    stderr = _run_solve(cache_dir, "quiet")
+    assert "cache hit for 'jit_solve'" in stderr
+    assert _count_solve_entries(cache_dir) == 1
+
+    # Printing runs via a host callback: never cached.
+    stderr = _run_solve(cache_dir, "verbose")
+    assert "never written to the persistent compilation cache" in stderr
+    assert _count_solve_entries(cache_dir) == 1
@@ -0,0 +1,94 @@
+from typing import List
+
+import jax_dataclasses as jdc
+import jaxlie
+import numpy as onp
+from jax import numpy as jnp
+
+import jaxfg
+
+
+def test_compiled_solver() -> None:
+    """Compiled solves should match standard solves, including when factor parameters
+    are swapped out."""
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(3)]
+
+    def make_graph(prior_x: float) -> jaxfg.core.StackedFactorGraph:
+        factors: List[jaxfg.core.FactorBase] = [
+            jaxfg.geometry.PriorFactor.make(
+                variable=pose_variables[0],
+                mu=jaxlie.SE2.from_xy_theta(prior_x, 0.0, 0.0),
+                noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+            )
+        ] + [
+            jaxfg.geometry.BetweenFactor.make(
+                variable_T_world_a=pose_variables[i],
+                variable_T_world_b=pose_variables[i + 1],
+                T_a_b=jaxlie.SE2.from_xy_theta(1.0, 0.0, 0.2),
+                noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+            )
+            for i in range(len(pose_variables) - 1)
+        ]
+        return jaxfg.core.StackedFactorGraph.make(factors)
+
+    solver = jaxfg.solvers.GaussNewtonSolver(verbose=False)
+    graph = make_graph(prior_x=0.0)
+    initial_assignments = jaxfg.core.VariableAssignments.make_from_defaults(
+        pose_variables
+    )
+    compiled_solver = graph.compile_solver(solver)
+
+    onp.testing.assert_allclose(
+        compiled_solver(initial_assignments.storage),
+        graph.solve(initial_assignments, solver=solver).storage,
+        rtol=1e-5,
+        atol=1e-5,
+    )
+
+    # New factor parameters, same structure.
+    graph_shifted = make_graph(prior_x=5.0)
+    onp.testing.assert_allclose(
+        compiled_solver(
+            initial_assignments.storage,
+            compiled_solver.flatten_graph(graph_shifted),
+        ),
+        graph_shifted.solve(initial_assignments, solver=solver).storage,
+        rtol=1e-5,
+        atol=1e-5,
+    )
+
+    # Assignments with a shuffled layout.
+    shuffled_assignments = jaxfg.core.VariableAssignments.make_from_defaults(
+        pose_variables[::-1]
+    )
+    solution = compiled_solver.solve(shuffled_assignments)
+    assert solution.storage_layout == shuffled_assignments.storage_layout
+    for v in pose_variables:
+        onp.testing.assert_allclose(
+            solution.get_value(v).parameters(),
+            graph.solve(initial_assignments, solver=solver).get_value(v).parameters(),
+            rtol=1e-5,
+            atol=1e-5,
+        )
+
+    # Donated input buffers.
+    expected_storage = graph.solve(initial_assignments, solver=solver).storage
+    storage = jnp.array(initial_assignments.storage)
+    onp.testing.assert_allclose(
+        graph.compile_solver(solver, donate_storage=True)(storage),
+        expected_storage,
+        rtol=1e-5,
+        atol=1e-5,
+    )
+    assert storage.is_deleted()
+
+    assignments = jdc.replace(
+        initial_assignments, storage=jnp.array(initial_assignments.storage)
+    )
+    onp.testing.assert_allclose(
+        solver.solve_in_place(graph, assignments).storage,
+        expected_storage,
+        rtol=1e-5,
+        atol=1e-5,
+    )
+    assert assignments.storage.is_deleted()
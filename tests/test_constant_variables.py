@@ -0,0 +1,97 @@
+from typing import List, Sequence
+
+import jaxlie
+import numpy as onp
+from jax import numpy as jnp
+
+import jaxfg
+
+
+def _make_factors(
+    pose_variables: Sequence[jaxfg.geometry.SE2Variable],
+    prior_precision: float = 1.0,
+) -> List[jaxfg.core.FactorBase]:
+    factors: List[jaxfg.core.FactorBase] = [
+        jaxfg.geometry.PriorFactor.make(
+            variable=pose_variables[0],
+            mu=jaxlie.SE2.from_xy_theta(1.0, 2.0, 0.3),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3) * prior_precision),
+        ),
+        jaxfg.geometry.PriorFactor.make(
+            variable=pose_variables[2],
+            mu=jaxlie.SE2.from_xy_theta(2.0, 2.0, 0.5),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3) * prior_precision),
+        ),
+    ]
+    for i in range(len(pose_variables) - 1):
+        factors.append(
+            jaxfg.geometry.BetweenFactor.make(
+                variable_T_world_a=pose_variables[i],
+                variable_T_world_b=pose_variables[i + 1],
+                T_a_b=jaxlie.SE2.from_xy_theta(0.5, 0.1 * i, 0.2),
+                noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+            )
+        )
+    return factors
+
+
+def test_constant_variables() -> None:
+    """Constant variables should keep their values, and be excluded from the linear
+    system."""
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(5)]
+    constant_variables = [pose_variables[0], pose_variables[2]]
+    graph = jaxfg.core.StackedFactorGraph.make(
+        _make_factors(pose_variables), constant_variables=constant_variables
+    )
+
+    assert set(graph.get_variables()) == set(pose_variables)
+    assert set(graph.local_storage_layout.get_variables()) == set(pose_variables) - set(
+        constant_variables
+    )
+    assert graph.local_storage_layout.dim == 3 * 3
+
+    # Priors on constants contribute no Jacobian entries; each between factor has one
+    # or two non-constant variables.
+    assert len(graph.jacobian_coords.rows) == 3 * 3 * (1 + 1 + 1 + 2)
+    assert onp.max(graph.jacobian_coords.cols) < graph.local_storage_layout.dim
+
+    initial_assignments = jaxfg.core.VariableAssignments.make_from_dict(
+        {
+            variable: jaxlie.SE2.from_xy_theta(float(i), 0.0, 0.0)
+            for i, variable in enumerate(pose_variables)
+        }
+    )
+    solution = graph.solve(
+        initial_assignments, solver=jaxfg.solvers.GaussNewtonSolver(verbose=False)
+    )
+    for variable in constant_variables:
+        onp.testing.assert_allclose(
+            solution.get_value(variable).parameters(),
+            initial_assignments.get_value(variable).parameters(),
+        )
+
+    # Should match a graph where constants are pinned with very stiff priors.
+    stiff_graph = jaxfg.core.StackedFactorGraph.make(
+        _make_factors(pose_variables, prior_precision=1e4)
+    )
+    pinned_assignments = initial_assignments
+    for variable, mu in zip(
+        constant_variables,
+        (
+            jaxlie.SE2.from_xy_theta(1.0, 2.0, 0.3),
+            jaxlie.SE2.from_xy_theta(2.0, 2.0, 0.5),
+        ),
+    ):
+        pinned_assignments = pinned_assignments.set_value(variable, mu)
+    solution = graph.solve(
+        pinned_assignments, solver=jaxfg.solvers.GaussNewtonSolver(verbose=False)
+    )
+    stiff_solution = stiff_graph.solve(
+        pinned_assignments, solver=jaxfg.solvers.GaussNewtonSolver(verbose=False)
+    )
+    for variable in pose_variables:
+        onp.testing.assert_allclose(
+            solution.get_value(variable).parameters(),
+            stiff_solution.get_value(variable).parameters(),
+            atol=1e-3,
+        )
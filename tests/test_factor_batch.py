@@ -0,0 +1,151 @@
+from typing import List
+
+import jax_dataclasses as jdc
+import jaxlie
+import numpy as onp
+
+import jaxfg
+
+
+def test_factor_batch_matches_individual_factors() -> None:
+    """Graphs built from pre-stacked factor batches should match graphs built from
+    individual factors."""
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(4)]
+    edges = [(0, 1), (1, 2), (2, 3), (3, 0)]
+    T_a_b = jaxlie.SE2(
+        unit_complex_xy=onp.array(
+            [[1.0, 0.0, 1.0, 0.5]] * len(edges), dtype=onp.float32
+        )
+    )
+    sqrt_precision_diagonals = onp.arange(1, 1 + 3 * len(edges), dtype=onp.float32)
+    sqrt_precision_diagonals = sqrt_precision_diagonals.reshape((len(edges), 3))
+
+    prior_factor = jaxfg.geometry.PriorFactor.make(
+        variable=pose_variables[0],
+        mu=jaxlie.SE2.identity(),
+        noise_model=jaxfg.noises.DiagonalGaussian(onp.ones(3, dtype=onp.float32)),
+    )
+    individual_factors: List[jaxfg.core.FactorBase] = [prior_factor] + [
+        jaxfg.geometry.BetweenFactor.make(
+            variable_T_world_a=pose_variables[a],
+            variable_T_world_b=pose_variables[b],
+            T_a_b=jaxlie.SE2(T_a_b.parameters()[i]),
+            noise_model=jaxfg.noises.DiagonalGaussian(sqrt_precision_diagonals[i]),
+        )
+        for i, (a, b) in enumerate(edges)
+    ]
+    batch = jaxfg.core.FactorBatch(
+        factor=jaxfg.geometry.BetweenFactor(
+            variables=(jaxfg.geometry.SE2Variable.canonical_instance(),) * 2,
+            T_a_b=T_a_b,
+            noise_model=jaxfg.noises.DiagonalGaussian(sqrt_precision_diagonals),
+        ),
+        variables=(
+            [pose_variables[a] for a, b in edges],
+            [pose_variables[b] for a, b in edges],
+        ),
+    )
+    assert batch.num_factors == len(edges)
+
+    graph = jaxfg.core.StackedFactorGraph.make(individual_factors)
+    graph_batched = jaxfg.core.StackedFactorGraph.make([prior_factor, batch])
+    assert graph.storage_layout == graph_batched.storage_layout
+
+    assignments = jaxfg.core.VariableAssignments.make_from_dict(
+        {
+            v: jaxlie.SE2.from_xy_theta(float(i), 0.0, 0.1 * i)
+            for i, v in enumerate(pose_variables)
+        }
+    )
+    residual_vector = graph.compute_whitened_residual_vector(assignments)
+    onp.testing.assert_allclose(
+        residual_vector,
+        graph_batched.compute_whitened_residual_vector(assignments),
+        rtol=1e-5,
+        atol=1e-6,
+    )
+    onp.testing.assert_allclose(
+        graph.compute_whitened_residual_jacobian(
+            assignments, residual_vector
+        ).as_dense(),
+        graph_batched.compute_whitened_residual_jacobian(
+            assignments, residual_vector
+        ).as_dense(),
+        rtol=1e-5,
+        atol=1e-6,
+    )
+
+
+def test_shared_fields() -> None:
+    """Factor fields shared across a batch should be stored once, and produce the same
+    results as stacked copies."""
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(4)]
+    noise_model = jaxfg.noises.DiagonalGaussian(
+        onp.array([1.0, 2.0, 3.0], dtype=onp.float32)
+    )
+    prior_factor = jaxfg.geometry.PriorFactor.make(
+        variable=pose_variables[0],
+        mu=jaxlie.SE2.identity(),
+        noise_model=noise_model,
+    )
+    between_factors = [
+        jaxfg.geometry.BetweenFactor.make(
+            variable_T_world_a=pose_variables[i],
+            variable_T_world_b=pose_variables[i + 1],
+            T_a_b=jaxlie.SE2.from_xy_theta(1.0, 0.1 * i, 0.2),
+            noise_model=noise_model,
+        )
+        for i in range(len(pose_variables) - 1)
+    ]
+
+    # Identical noise models should be detected when stacking.
+    batch = jaxfg.core.FactorBatch.make(between_factors)
+    assert batch.shared_fields == ("noise_model",)
+    assert batch.factor.noise_model.sqrt_precision_diagonal.shape == (3,)
+    assert batch.factor.T_a_b.parameters().shape == (len(between_factors), 4)
+
+    # Batches can also be built directly, with stacked copies of the noise model.
+    unshared_batch = jaxfg.core.FactorBatch(
+        factor=jdc.replace(
+            batch.factor,
+            noise_model=jaxfg.noises.DiagonalGaussian(
+                onp.tile(noise_model.sqrt_precision_diagonal, (len(between_factors), 1))
+            ),
+        ),
+        variables=batch.variables,
+    )
+    assert unshared_batch.shared_fields == ()
+
+    graph = jaxfg.core.StackedFactorGraph.make([prior_factor] + between_factors)
+    graph_unshared = jaxfg.core.StackedFactorGraph.make([prior_factor, unshared_batch])
+    assert [stacked_factor.shared_fields for stacked_factor in graph.factor_stacks] == [
+        ("noise_model", "mu"),
+        ("noise_model",),
+    ]
+
+    assignments = jaxfg.core.VariableAssignments.make_from_dict(
+        {
+            v: jaxlie.SE2.from_xy_theta(float(i), 0.0, 0.1 * i)
+            for i, v in enumerate(pose_variables)
+        }
+    )
+    residual_vector, A = graph.compute_whitened_residual_and_jacobian(assignments)
+    (
+        residual_vector_unshared,
+        A_unshared,
+    ) = graph_unshared.compute_whitened_residual_and_jacobian(assignments)
+    onp.testing.assert_allclose(residual_vector, residual_vector_unshared, rtol=1e-5)
+    onp.testing.assert_allclose(A.as_dense(), A_unshared.as_dense(), rtol=1e-5)
+    onp.testing.assert_allclose(
+        graph.compute_joint_nll(assignments),
+        graph_unshared.compute_joint_nll(assignments),
+        rtol=1e-5,
+    )
+
+    # Shared fields can be broadcast back to one entry per factor.
+    onp.testing.assert_allclose(
+        graph.factor_stacks[1]
+        .get_unshared_factor()
+        .noise_model.sqrt_precision_diagonal,
+        graph_unshared.factor_stacks[1].factor.noise_model.sqrt_precision_diagonal,
+    )
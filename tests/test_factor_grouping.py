@@ -0,0 +1,112 @@
+from collections import Counter
+from typing import List
+
+import jax
+import jaxlie
+import numpy as onp
+
+import jaxfg
+
+
+def test_factor_grouping() -> None:
+    """Factors should be stacked together exactly when their treedefs, up to variable
+    instances, and leaf shapes match."""
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(6)]
+    shared_noise_model = jaxfg.noises.DiagonalGaussian(onp.ones(3))
+    noise_models: List[jaxfg.noises.NoiseModelBase] = [
+        # Stacked together: one shared noise model, and one equivalent copy.
+        shared_noise_model,
+        shared_noise_model,
+        jaxfg.noises.DiagonalGaussian(onp.ones(3) * 2.0),
+        # Different treedefs, with the same leaf shapes.
+        jaxfg.noises.HuberWrapper(wrapped=shared_noise_model, delta=onp.array(1.0)),
+        jaxfg.noises.GemanMcClureWrapper(
+            wrapped=shared_noise_model, c=onp.array(1.0), mu=onp.array(1.0)
+        ),
+        # Different leaf shapes.
+        jaxfg.noises.Gaussian(onp.eye(3)),
+    ]
+    factors = [
+        jaxfg.geometry.PriorFactor.make(
+            variable=variable,
+            mu=jaxlie.SE2.from_xy_theta(float(i), 0.0, 0.0),
+            noise_model=noise_model,
+        )
+        for i, (variable, noise_model) in enumerate(zip(pose_variables, noise_models))
+    ]
+    # Different variable types.
+    factors.append(
+        jaxfg.geometry.PriorFactor.make(
+            variable=jaxfg.geometry.SO2Variable(),
+            mu=jaxlie.SO2.identity(),
+            noise_model=jaxfg.noises.DiagonalGaussian(onp.ones(1)),
+        )
+    )
+
+    graph = jaxfg.core.StackedFactorGraph.make(factors)
+    assert sorted(
+        stacked_factor.num_factors for stacked_factor in graph.factor_stacks
+    ) == [1, 1, 1, 1, 3]
+    assert {
+        type(stacked_factor.factor.noise_model)
+        for stacked_factor in graph.factor_stacks
+        if stacked_factor.num_factors == 1
+    } == {
+        jaxfg.noises.HuberWrapper,
+        jaxfg.noises.GemanMcClureWrapper,
+        jaxfg.noises.Gaussian,
+        jaxfg.noises.DiagonalGaussian,
+    }
+
+
+def test_factor_grouping_unshared_fields() -> None:
+    """Grouping should match full treedef comparisons when field values aren't shared
+    between factors, including values that differ only in nested types or dtypes."""
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(6)]
+    noise_models: List[jaxfg.noises.NoiseModelBase] = [
+        jaxfg.noises.HuberWrapper(
+            wrapped=jaxfg.noises.DiagonalGaussian(onp.ones(3)), delta=onp.array(1.0)
+        ),
+        jaxfg.noises.HuberWrapper(
+            wrapped=jaxfg.noises.DiagonalGaussian(onp.ones(3) * 2.0),
+            delta=onp.array(2.0),
+        ),
+        # Different dtype.
+        jaxfg.noises.HuberWrapper(
+            wrapped=jaxfg.noises.DiagonalGaussian(onp.ones(3, dtype=onp.float32)),
+            delta=onp.array(1.0),
+        ),
+        # Different nested type.
+        jaxfg.noises.HuberWrapper(
+            wrapped=jaxfg.noises.Gaussian(onp.eye(3)), delta=onp.array(1.0)
+        ),
+        jaxfg.noises.HuberWrapper(
+            wrapped=jaxfg.noises.Gaussian(onp.eye(3) * 2.0), delta=onp.array(1.0)
+        ),
+        # Different leaf shape.
+        jaxfg.noises.HuberWrapper(
+            wrapped=jaxfg.noises.DiagonalGaussian(onp.ones(3)),
+            delta=onp.ones(1),
+        ),
+    ]
+    factors = [
+        jaxfg.geometry.PriorFactor.make(
+            variable=variable,
+            mu=jaxlie.SE2.from_xy_theta(float(i), 0.0, 0.0),
+            noise_model=noise_model,
+        )
+        for i, (variable, noise_model) in enumerate(zip(pose_variables, noise_models))
+    ]
+
+    expected_group_sizes = Counter(
+        (
+            jax.tree_util.tree_structure(factor.anonymize_variables()),
+            tuple(onp.shape(leaf) for leaf in jax.tree_util.tree_leaves(factor)),
+        )
+        for factor in factors
+    )
+    graph = jaxfg.core.StackedFactorGraph.make(factors)
+    assert sorted(
+        stacked_factor.num_factors for stacked_factor in graph.factor_stacks
+    ) == sorted(expected_group_sizes.values())
+    assert sorted(expected_group_sizes.values()) == [1, 2, 3]
@@ -0,0 +1,53 @@
+from typing import List
+
+import jaxlie
+import numpy as onp
+from jax import numpy as jnp
+
+import jaxfg
+
+
+def test_factor_stack_diagnostics() -> None:
+    """Per-stack costs should sum to the total cost."""
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(4)]
+    factors: List[jaxfg.core.FactorBase] = [
+        jaxfg.geometry.PriorFactor.make(
+            variable=pose_variables[0],
+            mu=jaxlie.SE2.from_xy_theta(0.5, 0.0, 0.0),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+        )
+    ] + [
+        jaxfg.geometry.BetweenFactor.make(
+            variable_T_world_a=pose_variables[i],
+            variable_T_world_b=pose_variables[i + 1],
+            T_a_b=jaxlie.SE2.from_xy_theta(1.0, 0.0, 0.2),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3) * 2.0),
+        )
+        for i in range(len(pose_variables) - 1)
+    ]
+    graph = jaxfg.core.StackedFactorGraph.make(factors)
+    assignments = jaxfg.core.VariableAssignments.make_from_defaults(pose_variables)
+
+    diagnostics = graph.compute_factor_stack_diagnostics(
+        assignments, measure_time=True, timing_repeats=2
+    )
+    diagnostics_from_type = {d.factor_type: d for d in diagnostics}
+
+    prior = diagnostics_from_type[jaxfg.geometry.PriorFactor]
+    assert prior.num_factors == 1
+    assert prior.residual_dim == 3
+    assert prior.jacobian_nnz == 3 * 3
+
+    between = diagnostics_from_type[jaxfg.geometry.BetweenFactor]
+    assert between.num_factors == 3
+    assert between.residual_dim == 9
+    assert between.jacobian_nnz == 3 * 3 * 6
+
+    total_cost = float(graph.compute_cost(assignments)[0])
+    onp.testing.assert_allclose(sum(d.cost for d in diagnostics), total_cost, rtol=1e-5)
+    onp.testing.assert_allclose(sum(d.cost_fraction for d in diagnostics), 1.0)
+    assert all(
+        d.evaluation_seconds is not None and d.evaluation_seconds > 0.0
+        for d in diagnostics
+    )
+    assert "BetweenFactor" in jaxfg.core.format_factor_stack_diagnostics(diagnostics)
@@ -0,0 +1,63 @@
+import pathlib
+import sys
+
+import jaxlie
+import numpy as onp
+from jax import numpy as jnp
+
+import jaxfg
+
+sys.path.insert(0, str(pathlib.Path(__file__).absolute().parent.parent / "scripts"))
+import _g2o_utils  # noqa: E402
+
+
+def test_export_shared_fields(tmp_path: pathlib.Path) -> None:
+    """Between factors that share a noise model and relative transform are stacked
+    with those fields stored once; exporting should still write one edge per
+    factor."""
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(5)]
+    noise_model = jaxfg.noises.DiagonalGaussian(jnp.array([1.0, 2.0, 3.0]))
+    T_a_b = jaxlie.SE2.from_xy_theta(1.0, 0.0, 0.1)
+    graph = jaxfg.core.StackedFactorGraph.make(
+        [
+            jaxfg.geometry.BetweenFactor.make(
+                variable_T_world_a=pose_variables[i],
+                variable_T_world_b=pose_variables[i + 1],
+                T_a_b=T_a_b,
+                noise_model=noise_model,
+            )
+            for i in range(len(pose_variables) - 1)
+        ]
+    )
+    (stack,) = graph.factor_stacks
+    assert set(stack.shared_fields) == {"T_a_b", "noise_model"}
+
+    assignments = jaxfg.core.VariableAssignments.make_from_dict(
+        {
+            v: jaxlie.SE2.from_xy_theta(float(i), 0.0, 0.1 * i)
+            for i, v in enumerate(pose_variables)
+        }
+    )
+
+    _g2o_utils.write_g2o(tmp_path / "graph.g2o", graph, assignments)
+    data = _g2o_utils.parse_g2o(tmp_path / "graph.g2o")
+    onp.testing.assert_array_equal(
+        data.edge_indices, onp.stack([onp.arange(4), onp.arange(1, 5)], axis=-1)
+    )
+    onp.testing.assert_allclose(
+        data.T_a_b.parameters(),
+        onp.tile(T_a_b.parameters(), (4, 1)),
+        rtol=1e-5,
+        atol=1e-5,
+    )
+    onp.testing.assert_allclose(
+        data.sqrt_precision_matrices,
+        onp.tile(onp.diag([1.0, 2.0, 3.0]), (4, 1, 1)),
+        rtol=1e-5,
+        atol=1e-5,
+    )
+
+    _g2o_utils.write_toro(tmp_path / "graph.graph", graph, assignments)
+    with open(tmp_path / "graph.graph") as file:
+        tags = [line.split()[0] for line in file.read().splitlines()]
+    assert tags == ["VERTEX2"] * 5 + ["EDGE2"] * 4
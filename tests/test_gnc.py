@@ -0,0 +1,86 @@
+from typing import List
+
+import jax
+import jaxlie
+import numpy as onp
+from jax import numpy as jnp
+
+import jaxfg
+
+
+def _compute_pose_error_with_outliers(use_gnc: bool) -> float:
+    pose_variables = [
+        jaxfg.geometry.SE2Variable(),
+    ]
+
+    gaussian_noise = jaxfg.noises.DiagonalGaussian.make_from_covariance(
+        diagonal=jnp.ones(3)
+    )
+    robust_noise = jaxfg.noises.GemanMcClureWrapper(wrapped=gaussian_noise, c=1.0)
+    factors: List[jaxfg.core.FactorBase] = [
+        jaxfg.geometry.PriorFactor.make(
+            variable=pose_variables[0],
+            mu=jaxlie.SE2.from_xy_theta(1.0, 1.0, 0.0),
+            noise_model=robust_noise if use_gnc else gaussian_noise,
+        )
+        for _ in range(3)
+    ] + [
+        # Outliers!!
+        jaxfg.geometry.PriorFactor.make(
+            variable=pose_variables[0],
+            mu=jaxlie.SE2.from_xy_theta(-20.0 + i, 40.0 * i, 0.0),
+            noise_model=robust_noise if use_gnc else gaussian_noise,
+        )
+        for i in range(2)
+    ]
+
+    graph = jaxfg.core.StackedFactorGraph.make(factors)
+    initial_assignments = jaxfg.core.VariableAssignments.make_from_defaults(
+        pose_variables
+    )
+
+    solution_assignments = graph.solve(
+        initial_assignments,
+        solver=(
+            jaxfg.solvers.GNCSolver(verbose=False)
+            if use_gnc
+            else jaxfg.solvers.GaussNewtonSolver(verbose=False)
+        ),
+    )
+    assert isinstance(solution_assignments.get_value(pose_variables[0]), jaxlie.SE2)
+
+    return float(
+        onp.linalg.norm(
+            (
+                solution_assignments.get_value(pose_variables[0]).inverse()
+                @ jaxlie.SE2.from_xy_theta(1.0, 1.0, 0.0)
+            ).log()
+        )
+    )
+
+
+def test_gnc():
+    """GNC should recover the inlier solution when multiple outliers are present."""
+    assert _compute_pose_error_with_outliers(use_gnc=True) < 1e-3
+    assert _compute_pose_error_with_outliers(use_gnc=False) > 1.0
+
+
+def test_geman_mcclure_jacobian():
+    """Whitened Jacobians should match autodiff through the whitened residual."""
+    noise_model = jaxfg.noises.GemanMcClureWrapper(
+        wrapped=jaxfg.noises.DiagonalGaussian(jnp.array([1.0, 2.0, 0.5])),
+        c=0.7,
+        mu=3.0,
+    )
+    jacobian = jnp.array(onp.random.randn(3, 4))
+
+    def whitened_residual(x: jnp.ndarray) -> jnp.ndarray:
+        return noise_model.whiten_residual_vector(jacobian @ x)
+
+    x = jnp.array(onp.random.randn(4))
+    onp.testing.assert_allclose(
+        noise_model.whiten_jacobian(jacobian, whitened_residual(x)),
+        jax.jacfwd(whitened_residual)(x),
+        rtol=1e-4,
+        atol=1e-6,
+    )
@@ -0,0 +1,66 @@
+import os
+import pathlib
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+# Generous budget for the self time of jaxfg's own modules; dependencies like JAX are
+# excluded. For reference, this is ~0.1 seconds on a typical laptop.
+_JAXFG_IMPORT_BUDGET_SECONDS = 1.0
+
+# Dependencies that should only be loaded when they're actually used.
+_DEFERRED_MODULES = ("scipy", "sksparse", "jax.experimental.host_callback")
+
+
+def _import_with_timing(statement: str) -> Tuple[Dict[str, int], str]:
+    """Run an import statement in a fresh interpreter with `-X importtime`. Returns self
+    times in microseconds for each imported module, and stdout."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(pathlib.Path(__file__).absolute().parent.parent)]
+        + ([env["PYTHONPATH"]] if "PYTHONPATH" in env else [])
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    self_time_from_module: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _cumulative_time, module = line[len("import time:") :].split("|")
+        self_time_from_module[module.strip()] = int(self_time)
+    return self_time_from_module, result.stdout
+
+
+def test_import_jaxfg_is_lazy() -> None:
+    """Importing the top-level package shouldn't load any subpackages, or JAX."""
+    self_time_from_module, _ = _import_with_timing("import jaxfg")
+    assert "jax" not in self_time_from_module
+    assert not any(module.startswith("jaxfg.") for module in self_time_from_module)
+
+
+def test_import_time() -> None:
+    """Importing subpackages should be cheap, and not load deferred dependencies."""
+    self_time_from_module, stdout = _import_with_timing(
+        "import jaxfg.core, jaxfg.geometry, jaxfg.noises, jaxfg.solvers, jaxfg.sparse\n"
+        "import sys\n"
+        "print(','.join(sys.modules.keys()))"
+    )
+    loaded_modules = stdout.strip().split(",")
+    for deferred in _DEFERRED_MODULES:
+        assert not any(
+            module == deferred or module.startswith(deferred + ".")
+            for module in loaded_modules
+        ), deferred
+
+    jaxfg_seconds = 1e-6 * sum(
+        self_time
+        for module, self_time in self_time_from_module.items()
+        if module == "jaxfg" or module.startswith("jaxfg.")
+    )
+    assert jaxfg_seconds < _JAXFG_IMPORT_BUDGET_SECONDS
@@ -0,0 +1,191 @@
+import contextlib
+import gzip
+import json
+import pathlib
+from typing import List
+
+import jax
+import jaxlie
+import pytest
+from jax import numpy as jnp
+
+import jaxfg
+
+
+def _make_graph() -> jaxfg.core.StackedFactorGraph:
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(3)]
+    factors: List[jaxfg.core.FactorBase] = [
+        jaxfg.geometry.PriorFactor.make(
+            variable=pose_variables[0],
+            mu=jaxlie.SE2.identity(),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+        )
+    ] + [
+        jaxfg.geometry.BetweenFactor.make(
+            variable_T_world_a=pose_variables[i],
+            variable_T_world_b=pose_variables[i + 1],
+            T_a_b=jaxlie.SE2.from_xy_theta(1.0, 0.0, 0.2),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+        )
+        for i in range(len(pose_variables) - 1)
+    ]
+    return jaxfg.core.StackedFactorGraph.make(factors)
+
+
+def test_named_scopes() -> None:
+    """Each stage of the solve pipeline should show up in op metadata."""
+    graph = _make_graph()
+    initial_assignments = jaxfg.core.VariableAssignments.make_from_defaults(
+        graph.get_variables()
+    )
+    solver = jaxfg.solvers.LevenbergMarquardtSolver(
+        verbose=False, linear_solver=jaxfg.sparse.ConjugateGradientSolver()
+    )
+    hlo_text = (
+        jax.jit(lambda graph, assignments: solver.solve(graph, assignments))
+        .lower(graph, initial_assignments)
+        .compile()
+        .as_text()
+    )
+
+    # Solvers evaluate residuals and Jacobians together. Standalone residual and
+    # Jacobian computations are checked separately.
+    residual_hlo_text = (
+        jax.jit(lambda graph, assignments: graph.compute_cost(assignments))
+        .lower(graph, initial_assignments)
+        .compile()
+        .as_text()
+    )
+    jacobian_hlo_text = (
+        jax.jit(
+            lambda graph, assignments: graph.compute_whitened_residual_jacobian(
+                assignments, graph.compute_whitened_residual_vector(assignments)
+            )
+        )
+        .lower(graph, initial_assignments)
+        .compile()
+        .as_text()
+    )
+
+    for stage in jaxfg.utils.PROFILED_STAGES:
+        if stage == "residuals":
+            assert f"/{stage}/" in residual_hlo_text, stage
+        elif stage == "jacobians":
+            assert f"/{stage}/" in jacobian_hlo_text, stage
+        else:
+            assert f"/{stage}/" in hlo_text, stage
+    assert "/linearize/stack_0_PriorFactor/" in hlo_text
+    assert "/linearize/stack_1_BetweenFactor/whiten/" in hlo_text
+    assert "/residuals/stack_0_PriorFactor/" in residual_hlo_text
+    assert "/jacobians/stack_1_BetweenFactor/whiten/" in jacobian_hlo_text
+
+
+def test_summarize_trace(tmp_path: pathlib.Path) -> None:
+    """Op events should be attributed to the innermost stage path."""
+    events = [
+        # Op events, with scope paths in their args
+        {
+            "ph": "X",
+            "name": "fusion.1",
+            "dur": 3.0,
+            "args": {"tf_op": "jit(solve)/while/body/jacobians/stack_1_X/whiten/mul"},
+        },
+        {
+            "ph": "X",
+            "name": "fusion.2",
+            "dur": 2.0,
+            "args": {"tf_op": "jit(solve)/while/body/jacobians/stack_1_X/sin"},
+        },
+        {
+            "ph": "X",
+            "name": "fusion.3",
+            "dur": 4.0,
+            "args": {"long_name": "jit(solve)/while/body/linear_subproblem/dot"},
+        },
+        {"ph": "X", "name": "copy.4", "dur": 1.0, "args": {"hlo_op": "copy.4"}},
+        # Not an op: should be ignored
+        {"ph": "X", "name": "PjitFunction(solve)", "dur": 100.0},
+        {"ph": "M", "name": "thread_name"},
+    ]
+    trace_path = tmp_path / "trace.json.gz"
+    with gzip.open(trace_path, "wt") as f:
+        json.dump({"traceEvents": events}, f)
+
+    summary = jaxfg.utils.summarize_trace(trace_path)
+    assert list(summary.keys()) == [
+        "linear_subproblem",
+        "jacobians/stack_1_X/whiten",
+        "jacobians/stack_1_X",
+        "other",
+        "total",
+    ]
+    assert abs(summary["total"] - 10e-6) < 1e-12
+
+
+def test_summarize_trace_from_hlo_names(tmp_path: pathlib.Path) -> None:
+    """Events named after HLO instructions, as on CPU, should be attributed through op
+    name metadata."""
+    hlo_text = "\n".join(
+        [
+            "%fusion.1 = f32[3]{0} fusion(f32[3]{0} %p), kind=kLoop,"
+            ' calls=%fused_computation, metadata={op_name="jit(solve)/while/body/ATb/dot"'
+            ' source_file="a.py" source_line=1}',
+            "ROOT %copy.2 = f32[3]{0} copy(f32[3]{0} %fusion.1),"
+            ' metadata={op_name="jit(solve)/copy"}',
+        ]
+    )
+    op_name_from_hlo_name = jaxfg.utils.get_op_names_from_hlo(hlo_text)
+    assert op_name_from_hlo_name == {
+        "fusion.1": "jit(solve)/while/body/ATb/dot",
+        "copy.2": "jit(solve)/copy",
+    }
+
+    events = [
+        {"ph": "X", "name": "fusion.1", "dur": 3.0},
+        {"ph": "X", "name": "copy.2", "dur": 1.0},
+        {"ph": "X", "name": "TfrtCpuExecutable::Execute", "dur": 100.0},
+    ]
+    trace_path = tmp_path / "trace.json"
+    with open(trace_path, "w") as f:
+        json.dump(events, f)
+
+    summary = jaxfg.utils.summarize_trace(
+        trace_path, op_name_from_hlo_name=op_name_from_hlo_name
+    )
+    assert list(summary.keys()) == ["ATb", "other", "total"]
+    assert abs(summary["total"] - 4e-6) < 1e-12
+
+
+def test_profile_solve(tmp_path: pathlib.Path) -> None:
+    """Solves should be broken down by stage on every backend, including CPU."""
+    graph = _make_graph()
+    summary = jaxfg.utils.profile_solve(
+        graph,
+        jaxfg.core.VariableAssignments.make_from_defaults(graph.get_variables()),
+        jaxfg.solvers.GaussNewtonSolver(
+            verbose=False, linear_solver=jaxfg.sparse.ConjugateGradientSolver()
+        ),
+        log_dir=tmp_path,
+    )
+    assert summary["total"] > 0.0
+    assert any(stage.startswith("linearize/stack_") for stage in summary)
+    assert "linear_subproblem" in summary
+
+
+def test_profile_solve_without_trace(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Missing traces should raise, even when assertions are disabled."""
+    monkeypatch.setattr(
+        jax.profiler, "trace", lambda *args, **kwargs: contextlib.nullcontext()
+    )
+    graph = _make_graph()
+    with pytest.raises(RuntimeError, match="No trace was written"):
+        jaxfg.utils.profile_solve(
+            graph,
+            jaxfg.core.VariableAssignments.make_from_defaults(graph.get_variables()),
+            jaxfg.solvers.GaussNewtonSolver(
+                verbose=False, linear_solver=jaxfg.sparse.ConjugateGradientSolver()
+            ),
+            log_dir=tmp_path,
+        )
@@ -0,0 +1,114 @@
+from typing import List
+
+import jaxlie
+import numpy as onp
+import scipy.sparse
+import scipy.sparse.csgraph
+from jax import numpy as jnp
+
+import jaxfg
+from jaxfg.core._diagnostics import compute_block_sparsity
+
+
+def _count_cholesky_nnz(ATA: onp.ndarray, permutation: onp.ndarray) -> int:
+    # Random values, so numerical cancellation doesn't hide structural nonzeros.
+    pattern = ATA != 0.0
+    values = onp.random.default_rng(0).uniform(size=ATA.shape) * pattern
+    values = values + values.T + onp.eye(len(ATA)) * len(ATA) * 2.0
+    values = values[permutation, :][:, permutation]
+    return int(onp.count_nonzero(onp.abs(onp.linalg.cholesky(values)) > 1e-12))
+
+
+def test_estimate_resources() -> None:
+    """Sparsity estimates should match dense computations."""
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(8)]
+    factors: List[jaxfg.core.FactorBase] = [
+        jaxfg.geometry.PriorFactor.make(
+            variable=pose_variables[0],
+            mu=jaxlie.SE2.identity(),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+        )
+    ] + [
+        jaxfg.geometry.BetweenFactor.make(
+            variable_T_world_a=pose_variables[i],
+            variable_T_world_b=pose_variables[j],
+            T_a_b=jaxlie.SE2.from_xy_theta(1.0, 0.0, 0.2),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+        )
+        for i, j in [(i, i + 1) for i in range(7)] + [(0, 5), (2, 7)]
+    ]
+    graph = jaxfg.core.StackedFactorGraph.make(factors)
+    estimate = graph.estimate_resources(
+        jaxfg.solvers.GaussNewtonSolver(
+            verbose=False, linear_solver=jaxfg.sparse.ConjugateGradientSolver()
+        )
+    )
+
+    # Structural sparsity pattern.
+    A = scipy.sparse.coo_matrix(
+        (
+            onp.ones(len(graph.jacobian_coords.rows)),
+            (graph.jacobian_coords.rows, graph.jacobian_coords.cols),
+        )
+    ).toarray()
+    ATA = A.T @ A
+
+    assert estimate.num_variables == 8
+    assert estimate.local_dim == 24
+    assert estimate.jacobian_nnz == len(graph.jacobian_coords.rows)
+    assert estimate.normal_matrix_nnz == onp.count_nonzero(ATA)
+
+    # Variables are 3-dimensional, so scalar and block orderings are interchangeable.
+    natural = onp.arange(24)
+    rcm = onp.repeat(
+        scipy.sparse.csgraph.reverse_cuthill_mckee(
+            scipy.sparse.csr_matrix(ATA[::3, ::3] != 0.0), symmetric_mode=True
+        )
+        * 3,
+        3,
+    ) + onp.tile(onp.arange(3), 8)
+    assert estimate.cholesky_factor_nnz == min(
+        _count_cholesky_nnz(ATA, natural), _count_cholesky_nnz(ATA, rcm)
+    )
+    assert (
+        estimate.cholesky_fill_in
+        == estimate.cholesky_factor_nnz - onp.count_nonzero(onp.tril(ATA))
+    )
+
+    assert estimate.jacobian_peak_bytes >= estimate.jacobian_bytes
+    assert estimate.step_flops is not None and estimate.step_flops > 0
+
+
+def test_block_sparsity_counts_do_not_overflow() -> None:
+    """Variables touched by many residual rows should keep nonzero block counts."""
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(2)]
+    # 255 priors and one between factor: 768 residual rows touch the first pose.
+    factors: List[jaxfg.core.FactorBase] = [
+        jaxfg.geometry.PriorFactor.make(
+            variable=pose_variables[0],
+            mu=jaxlie.SE2.identity(),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+        )
+        for _ in range(255)
+    ] + [
+        jaxfg.geometry.BetweenFactor.make(
+            variable_T_world_a=pose_variables[0],
+            variable_T_world_b=pose_variables[1],
+            T_a_b=jaxlie.SE2.identity(),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+        )
+    ]
+    graph = jaxfg.core.StackedFactorGraph.make(factors)
+
+    pattern, dims = compute_block_sparsity(
+        graph.jacobian_coords, graph.local_storage_layout
+    )
+    assert onp.all(pattern.toarray() != 0)
+    assert onp.all(dims == 3)
+
+    estimate = graph.estimate_resources(
+        jaxfg.solvers.GaussNewtonSolver(
+            verbose=False, linear_solver=jaxfg.sparse.ConjugateGradientSolver()
+        )
+    )
+    assert estimate.normal_matrix_nnz == 36
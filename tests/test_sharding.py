@@ -0,0 +1,120 @@
+import os
+import subprocess
+import sys
+from typing import List
+
+import jaxlie
+import numpy as onp
+
+import jaxfg
+
+
+def test_sharded_graph_matches_unsharded() -> None:
+    """Sharded factor evaluation should not change residuals, Jacobians, or solutions."""
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(5)]
+    factors: List[jaxfg.core.FactorBase] = [
+        jaxfg.geometry.PriorFactor.make(
+            variable=pose_variables[0],
+            mu=jaxlie.SE2.identity(),
+            noise_model=jaxfg.noises.DiagonalGaussian(onp.ones(3)),
+        )
+    ] + [
+        jaxfg.geometry.BetweenFactor.make(
+            variable_T_world_a=pose_variables[i],
+            variable_T_world_b=pose_variables[i + 1],
+            T_a_b=jaxlie.SE2.from_xy_theta(1.0, 0.0, 0.1),
+            noise_model=jaxfg.noises.DiagonalGaussian(onp.ones(3)),
+        )
+        for i in range(len(pose_variables) - 1)
+    ]
+
+    graph = jaxfg.core.StackedFactorGraph.make(factors)
+    graph_sharded = graph.shard_factor_evaluation()
+    assignments = jaxfg.core.VariableAssignments.make_from_defaults(pose_variables)
+
+    residual_vector = graph.compute_whitened_residual_vector(assignments)
+    onp.testing.assert_allclose(
+        residual_vector, graph_sharded.compute_whitened_residual_vector(assignments)
+    )
+    onp.testing.assert_allclose(
+        graph.compute_whitened_residual_jacobian(
+            assignments, residual_vector
+        ).as_dense(),
+        graph_sharded.compute_whitened_residual_jacobian(
+            assignments, residual_vector
+        ).as_dense(),
+    )
+
+    solver = jaxfg.solvers.GaussNewtonSolver(
+        verbose=False, linear_solver=jaxfg.sparse.ConjugateGradientSolver()
+    )
+    onp.testing.assert_allclose(
+        graph.solve(assignments, solver=solver).storage,
+        graph_sharded.solve(assignments, solver=solver).storage,
+        rtol=1e-5,
+        atol=1e-5,
+    )
+
+
+_SHARDING_SCRIPT = """
+import jax
+import jaxlie
+from jax import numpy as jnp
+
+import jaxfg
+
+assert len(jax.devices()) == 2
+
+pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(9)]
+graph = jaxfg.core.StackedFactorGraph.make(
+    [
+        jaxfg.geometry.PriorFactor.make(
+            variable=pose_variables[0],
+            mu=jaxlie.SE2.identity(),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+        )
+    ]
+    + [
+        jaxfg.geometry.BetweenFactor.make(
+            variable_T_world_a=pose_variables[i],
+            variable_T_world_b=pose_variables[i + 1],
+            T_a_b=jaxlie.SE2.from_xy_theta(1.0, 0.0, 0.1),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+        )
+        for i in range(len(pose_variables) - 1)
+    ]
+).shard_factor_evaluation()
+assignments = jaxfg.core.VariableAssignments.make_from_defaults(pose_variables)
+
+# Per-stack residuals and Jacobians are split along the factor axis.
+def linearize_factor_stacks(assignments):
+    stacked_residual_vectors, compute_A_values_list = graph._linearize_factor_stacks(
+        assignments
+    )
+    return stacked_residual_vectors, compute_A_values_list()
+
+
+stacked_residual_vectors, A_values_list = jax.jit(linearize_factor_stacks)(assignments)
+factor_sharding = jax.sharding.NamedSharding(
+    graph.factor_mesh, jax.sharding.PartitionSpec("factors")
+)
+for array in stacked_residual_vectors + A_values_list:
+    assert array.sharding.is_equivalent_to(factor_sharding, array.ndim), array.sharding
+    assert not array.sharding.is_fully_replicated
+
+# Gathered outputs are replicated.
+residual_vector, A = graph.compute_whitened_residual_and_jacobian(assignments)
+assert residual_vector.sharding.is_fully_replicated, residual_vector.sharding
+assert A.values.sharding.is_fully_replicated, A.values.sharding
+"""
+
+
+def test_sharded_intermediates() -> None:
+    """Per-stack residuals and Jacobians should be partitioned across devices, and
+    gathered outputs replicated."""
+    env = dict(os.environ)
+    env["XLA_FLAGS"] = (
+        env.get("XLA_FLAGS", "") + " --xla_force_host_platform_device_count=2"
+    ).strip()
+    env["JAX_PLATFORMS"] = "cpu"
+    subprocess.run([sys.executable, "-c", _SHARDING_SCRIPT], env=env, check=True)
@@ -12,6 +12,7 @@ import jaxfg
         jaxfg.sparse.CholmodSolver(),
         jaxfg.sparse.ConjugateGradientSolver(tolerance=1e-8),
         jaxfg.sparse.InexactStepConjugateGradientSolver(inexact_step_eta=1e-8),
+        jaxfg.sparse.AutoLinearSolver(),
     ],
 )
 def test_solver_no_jit(solver: jaxfg.sparse.LinearSubproblemSolverBase):
@@ -42,6 +43,7 @@ def test_solver_no_jit(solver: jaxfg.sparse.LinearSubproblemSolverBase):
         jaxfg.sparse.CholmodSolver(),
         jaxfg.sparse.ConjugateGradientSolver(tolerance=1e-8),
         jaxfg.sparse.InexactStepConjugateGradientSolver(inexact_step_eta=1e-8),
+        jaxfg.sparse.AutoLinearSolver(),
     ],
 )
 def test_solver_jit(solver: jaxfg.sparse.LinearSubproblemSolverBase):
@@ -69,3 +71,23 @@ def test_solver_jit(solver: jaxfg.sparse.LinearSubproblemSolverBase):
 
     # Validate
     onp.testing.assert_allclose(x_ours, x_onp, atol=1e-5, rtol=1e-5)
+
+
+def test_auto_solver_vmap():
+    """CHOLMOD doesn't support vmap, so the auto solver should fall back to CG."""
+    A_shape = (20, 5)
+    A_onp = onp.random.randn(*A_shape)
+    A = jaxfg.sparse.SparseCooMatrix.from_scipy_coo_matrix(
+        scipy.sparse.coo_matrix(A_onp)
+    )
+    ATb = onp.random.randn(3, A_shape[1])
+
+    solver = jaxfg.sparse.AutoLinearSolver(
+        cg_solver=jaxfg.sparse.ConjugateGradientSolver(tolerance=1e-8)
+    )
+    x_ours = jax.vmap(
+        lambda ATb: solver.solve_subproblem(A=A, ATb=ATb, lambd=0.0, iteration=0)
+    )(ATb)
+    x_onp = onp.linalg.solve(A_onp.T @ A_onp, ATb.T).T
+
+    onp.testing.assert_allclose(x_ours, x_onp, atol=1e-4, rtol=1e-4)
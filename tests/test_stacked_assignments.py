@@ -0,0 +1,71 @@
+import jax
+import jaxlie
+import numpy as onp
+
+import jaxfg
+
+
+def test_make_from_stacked() -> None:
+    """Stacked construction should match per-variable construction, and round trip
+    through `as_stacked_dict()`."""
+    num_poses = 5
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(num_poses)]
+    point_variables = [jaxfg.core.RealVectorVariable[2]() for _ in range(3)]
+    # Interleave types, so that storage order differs from argument order
+    variables = pose_variables[:2] + point_variables + pose_variables[2:]
+
+    poses = jax.vmap(jaxlie.SE2.from_xy_theta)(*onp.random.randn(3, num_poses))
+    points = onp.random.randn(3, 2)
+
+    assignments = jaxfg.core.VariableAssignments.make_from_stacked(
+        variables,
+        {
+            jaxfg.geometry.SE2Variable: poses,
+            jaxfg.core.RealVectorVariable[2]: points,
+        },
+    )
+    reference = jaxfg.core.VariableAssignments.make_from_dict(
+        {
+            **{
+                variable: jaxlie.SE2(poses.unit_complex_xy[i])
+                for i, variable in enumerate(pose_variables)
+            },
+            **{variable: points[i] for i, variable in enumerate(point_variables)},
+        }
+    ).update_storage_layout(assignments.storage_layout)
+    onp.testing.assert_allclose(assignments.storage, reference.storage)
+
+    # Flattened parameters are also accepted
+    onp.testing.assert_allclose(
+        jaxfg.core.VariableAssignments.make_from_stacked(
+            variables,
+            {
+                jaxfg.geometry.SE2Variable: onp.asarray(poses.parameters()),
+                jaxfg.core.RealVectorVariable[2]: points,
+            },
+        ).storage,
+        assignments.storage,
+    )
+
+    # Round trip
+    stacked_dict = assignments.as_stacked_dict()
+    onp.testing.assert_allclose(
+        stacked_dict[jaxfg.geometry.SE2Variable].parameters(), poses.parameters()
+    )
+    onp.testing.assert_allclose(stacked_dict[jaxfg.core.RealVectorVariable[2]], points)
+    onp.testing.assert_allclose(
+        jaxfg.core.VariableAssignments.make_from_stacked(
+            assignments.get_variables(), stacked_dict
+        ).storage,
+        assignments.storage,
+    )
+
+
+def test_make_from_stacked_defaults() -> None:
+    """Missing types should be assigned default values."""
+    variables = [jaxfg.geometry.SO2Variable() for _ in range(4)]
+    assignments = jaxfg.core.VariableAssignments.make_from_stacked(variables, {})
+    onp.testing.assert_allclose(
+        assignments.storage,
+        jaxfg.core.VariableAssignments.make_from_defaults(variables).storage,
+    )
@@ -0,0 +1,69 @@
+import dataclasses
+
+import numpy as onp
+
+import jaxfg
+
+
+def test_storage_layout_interning() -> None:
+    """Layouts built from the same variables should be interned, and layouts built
+    separately should still compare by value."""
+    variables = [jaxfg.geometry.SE2Variable() for _ in range(3)]
+
+    layout = jaxfg.core.StorageLayout.make(variables)
+    assert jaxfg.core.StorageLayout.make(variables) is layout
+    assert jaxfg.core.StorageLayout.make(variables, local=True) is not layout
+
+    layout_copy = dataclasses.replace(layout)
+    assert layout_copy is not layout
+    assert layout_copy == layout
+    assert hash(layout_copy) == hash(layout)
+
+    shuffled_layout = jaxfg.core.StorageLayout.make(variables[::-1])
+    assert shuffled_layout != layout
+    assert set(shuffled_layout.get_variables()) == set(layout.get_variables())
+
+
+def test_update_storage_layout() -> None:
+    """Values should be preserved when converting between shuffled layouts."""
+    variables = [jaxfg.geometry.SE2Variable() for _ in range(3)] + [
+        jaxfg.geometry.SO3Variable() for _ in range(2)
+    ]
+    assignments = jaxfg.core.VariableAssignments.make_from_dict(
+        {
+            variable: variable.get_group_type().exp(
+                onp.random.randn(variable.get_local_parameter_dim())
+            )
+            for variable in variables
+        }
+    )
+
+    for local in (False, True):
+        layout = jaxfg.core.StorageLayout.make(variables, local=local)
+        shuffled_layout = jaxfg.core.StorageLayout.make(variables[::-1], local=local)
+        storage = onp.random.randn(layout.dim)
+        shuffled = jaxfg.core.VariableAssignments(
+            storage=storage, storage_layout=layout
+        ).update_storage_layout(shuffled_layout)
+        for variable in variables:
+            dim = (
+                variable.get_local_parameter_dim()
+                if local
+                else variable.get_parameter_dim()
+            )
+            source_index = layout.index_from_variable[variable]
+            target_index = shuffled_layout.index_from_variable[variable]
+            onp.testing.assert_allclose(
+                shuffled.storage[target_index : target_index + dim],
+                storage[source_index : source_index + dim],
+                rtol=1e-6,
+            )
+
+    # Round trip
+    shuffled = assignments.update_storage_layout(
+        jaxfg.core.StorageLayout.make(variables[::-1])
+    )
+    onp.testing.assert_allclose(
+        shuffled.update_storage_layout(assignments.storage_layout).storage,
+        assignments.storage,
+    )
@@ -0,0 +1,89 @@
+from typing import List
+
+import jaxlie
+import numpy as onp
+from jax import numpy as jnp
+
+import jaxfg
+
+
+def _make_graph(num_poses: int) -> jaxfg.core.StackedFactorGraph:
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(num_poses)]
+    factors: List[jaxfg.core.FactorBase] = [
+        jaxfg.geometry.PriorFactor.make(
+            variable=pose_variables[0],
+            mu=jaxlie.SE2.identity(),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+        )
+    ] + [
+        jaxfg.geometry.BetweenFactor.make(
+            variable_T_world_a=pose_variables[i],
+            variable_T_world_b=pose_variables[i + 1],
+            T_a_b=jaxlie.SE2.from_xy_theta(1.0, 0.0, 0.0),
+            noise_model=jaxfg.noises.DiagonalGaussian(jnp.ones(3)),
+        )
+        for i in range(num_poses - 1)
+    ]
+    return jaxfg.core.StackedFactorGraph.make(factors)
+
+
+def test_structure_fingerprint() -> None:
+    """Fingerprints should depend on graph structure and solver configuration, but not
+    on variable instances."""
+    solver = jaxfg.solvers.GaussNewtonSolver(verbose=False)
+
+    fingerprint = _make_graph(3).compute_structure_fingerprint(solver)
+    assert fingerprint == _make_graph(3).compute_structure_fingerprint(solver)
+    assert fingerprint != _make_graph(4).compute_structure_fingerprint(solver)
+    assert fingerprint != _make_graph(3).compute_structure_fingerprint()
+    assert fingerprint != _make_graph(3).compute_structure_fingerprint(
+        jaxfg.solvers.GaussNewtonSolver(verbose=True)
+    )
+    assert fingerprint != _make_graph(3).compute_structure_fingerprint(
+        jaxfg.solvers.LevenbergMarquardtSolver(verbose=False)
+    )
+
+
+def test_structure_fingerprint_ignores_measurements() -> None:
+    """Graphs with the same topology should share a structure, and a compiled solve,
+    even if measurements happen to be equal across factors in only one of them."""
+    pose_variables = [jaxfg.geometry.SE2Variable() for _ in range(4)]
+    noise_model = jaxfg.noises.DiagonalGaussian(jnp.ones(3))
+
+    def make_graph(thetas: List[float]) -> jaxfg.core.StackedFactorGraph:
+        factors: List[jaxfg.core.FactorBase] = [
+            jaxfg.geometry.PriorFactor.make(
+                variable=pose_variables[0],
+                mu=jaxlie.SE2.identity(),
+                noise_model=noise_model,
+            )
+        ] + [
+            jaxfg.geometry.BetweenFactor.make(
+                variable_T_world_a=pose_variables[i],
+                variable_T_world_b=pose_variables[i + 1],
+                T_a_b=jaxlie.SE2.from_xy_theta(1.0, 0.0, theta),
+                noise_model=noise_model,
+            )
+            for i, theta in enumerate(thetas)
+        ]
+        return jaxfg.core.StackedFactorGraph.make(factors)
+
+    solver = jaxfg.solvers.GaussNewtonSolver(verbose=False)
+    graph = make_graph([0.1, 0.1, 0.1])
+    graph_varied = make_graph([0.1, 0.2, 0.3])
+    assert graph.compute_structure_fingerprint(
+        solver
+    ) == graph_varied.compute_structure_fingerprint(solver)
+
+    initial_assignments = jaxfg.core.VariableAssignments.make_from_defaults(
+        pose_variables
+    )
+    compiled_solver = graph.compile_solver(solver)
+    onp.testing.assert_allclose(
+        compiled_solver(
+            initial_assignments.storage, compiled_solver.flatten_graph(graph_varied)
+        ),
+        graph_varied.solve(initial_assignments, solver=solver).storage,
+        rtol=1e-5,
+        atol=1e-5,
+    )